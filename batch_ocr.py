@@ -0,0 +1,212 @@
+"""Traitement OCR par lots en ligne de commande (sans Streamlit).
+
+Exemples :
+    python batch_ocr.py scans/ -o resultats.jsonl
+    python batch_ocr.py "archives/2023/**/*.pdf" --workers 32 --no-text
+    python batch_ocr.py scans/ -o resultats.jsonl --db data/results.sqlite3
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+
+# Tesseract est lancé en parallèle par le pool : on évite la sursouscription OpenMP.
+# Avant l'import d'ocr_processor, qui charge Tesseract (OpenMP lit la variable au chargement);
+# les workers héritent de l'environnement ou réimportent ce module
+if "OMP_THREAD_LIMIT" not in os.environ:
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+from ocr_cache import DEFAULT_CACHE_DIR, OCRResultCache, content_digest, make_cache_key
+from ocr_processor import OCRProcessor
+from pipeline_events import log_progress
+from result_store import ResultStore, make_record
+
+# État propre à chaque processus worker, initialisé une seule fois
+_processor: Optional[OCRProcessor] = None
+_cache: Optional[OCRResultCache] = None
+_include_text = True
+
+
+def _init_worker(cache_dir: Optional[str], include_text: bool, page_workers: int, ocr_dpi: int,
+                 early_stop: bool, ocr_backend: str, preprocessing: str, log_level: int):
+    """Initialise le processeur (et le cache) d'un worker"""
+    global _processor, _cache, _include_text
+    logging.basicConfig(format="%(asctime)s %(process)d %(message)s")
+    logging.getLogger("ocr_processor").setLevel(log_level)
+    _processor = OCRProcessor(ocr_dpi=ocr_dpi, page_workers=page_workers, early_stop=early_stop,
+                              ocr_backend=ocr_backend, preprocessing=preprocessing)
+    _cache = OCRResultCache(cache_dir) if cache_dir else None
+    _include_text = include_text
+
+
+def _process_path(path: str) -> Dict:
+    """Traite un document et retourne l'enregistrement JSONL correspondant"""
+    start = time.perf_counter()
+    record = {'path': path, 'pid': os.getpid()}
+    try:
+        with open(path, 'rb') as f:
+            file_bytes = f.read()
+        read_done = time.perf_counter()
+        digest = content_digest(file_bytes)
+        record['sha256'] = digest
+        record['size_bytes'] = len(file_bytes)
+
+        cache_key = make_cache_key(digest, _processor.cache_signature, _processor.RULES_VERSION)
+        cached = _cache.get(cache_key) if _cache else None
+        if cached is not None:
+            result = {'text': cached['text'], 'data': cached['data'], 'confidence': cached.get('confidence'),
+                      'document_type': cached.get('document_type'), 'located': cached.get('located'),
+                      'timings': {}}
+        else:
+            result = _processor.process_document(file_bytes, path, on_progress=log_progress)
+            if _cache and result['text']:
+                _cache.put(cache_key, result['text'], result['data'],
+                           {'confidence': result['confidence'], 'document_type': result['document_type'],
+                            'located': result['located']})
+
+        record['status'] = 'ok'
+        record['cached'] = cached is not None
+        record['data'] = result['data']
+        record['confidence'] = result['confidence']
+        record['document_type'] = result.get('document_type')
+        record['located'] = result.get('located') or {}
+        record['ocr_signature'] = _processor.cache_signature
+        if 'preprocessing' in result:
+            record['preprocessing'] = result['preprocessing']
+        if 'pages_read' in result:
+            record['pages_read'] = result['pages_read']
+        if _include_text:
+            record['text'] = result['text']
+        record['timings'] = dict(result['timings'], read_ms=round((read_done - start) * 1000, 3))
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+        record['timings'] = {}
+    record['timings']['total_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return record
+
+
+def iter_input_files(inputs: List[str]) -> Iterator[str]:
+    """Développe les dossiers et motifs glob en une liste de fichiers supportés"""
+    seen = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            candidates = (
+                os.path.join(root, name)
+                for root, _, files in os.walk(entry)
+                for name in sorted(files)
+            )
+        else:
+            candidates = sorted(glob.iglob(entry, recursive=True))
+        for path in candidates:
+            if os.path.isfile(path) and OCRProcessor.is_supported(path) and path not in seen:
+                seen.add(path)
+                yield path
+
+
+def run_batch(paths: Iterator[str], out, workers: int, cache_dir: Optional[str],
+              include_text: bool, page_workers: int = 1, ocr_dpi: int = 300,
+              early_stop: bool = True, ocr_backend: str = "auto", preprocessing: str = "all",
+              log_level: int = logging.WARNING, store: Optional[ResultStore] = None) -> Dict:
+    """Répartit les documents sur un pool de processus et écrit un JSON par ligne.
+
+    Avec ``store``, les extractions réussies sont aussi enregistrées dans la base,
+    par lots de ``store.batch_size`` documents.
+    """
+    stats = {'documents': 0, 'errors': 0, 'cached': 0}
+    pending_rows: List[Dict] = []
+    start = time.perf_counter()
+    # Fenêtre bornée de tâches en vol : la liste des fichiers n'est jamais matérialisée
+    max_in_flight = workers * 4
+    in_flight = set()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_dir, include_text or store is not None, page_workers, ocr_dpi,
+                                       early_stop, ocr_backend, preprocessing, log_level)) as executor:
+        def drain(return_when):
+            nonlocal in_flight
+            done, in_flight = wait(in_flight, return_when=return_when)
+            for future in done:
+                record = future.result()
+                stats['documents'] += 1
+                stats['errors'] += record['status'] == 'error'
+                stats['cached'] += bool(record.get('cached'))
+                if store is not None and record['status'] == 'ok':
+                    # Le texte est nécessaire à la recherche plein texte, même s'il n'est pas exporté
+                    text = record.get('text', '') if include_text else record.pop('text', '')
+                    pending_rows.append(make_record(record['sha256'], os.path.basename(record['path']), text,
+                                                    record['data'], confidence=(record['confidence'] or {}).get('document'),
+                                                    located=record['located'],
+                                                    ocr_signature=record['ocr_signature'],
+                                                    document_type=(record['document_type'] or {}).get('type')))
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if store is not None and len(pending_rows) >= store.batch_size:
+                stats['stored'] = stats.get('stored', 0) + store.save_many(pending_rows)
+                pending_rows.clear()
+
+        for path in paths:
+            if len(in_flight) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+            in_flight.add(executor.submit(_process_path, path))
+        while in_flight:
+            drain(FIRST_COMPLETED)
+    if store is not None:
+        stats['stored'] = stats.get('stored', 0) + store.save_many(pending_rows)
+
+    elapsed = time.perf_counter() - start
+    stats['elapsed_s'] = round(elapsed, 3)
+    stats['docs_per_s'] = round(stats['documents'] / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="OCR et extraction de données par lots")
+    parser.add_argument('inputs', nargs='+', help="Dossiers ou motifs glob (PDF, PNG, JPG, TIFF, BMP)")
+    parser.add_argument('-o', '--output', help="Fichier JSONL de sortie (défaut : sortie standard)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help="Pages scannées OCR en parallèle par document (défaut : 1, le pool occupe déjà les cœurs)")
+    parser.add_argument('--dpi', type=int, default=300, help="Résolution de rendu des pages scannées")
+    parser.add_argument('--full-text', action='store_true',
+                        help="Lit toutes les pages des PDF même si tous les champs sont déjà trouvés")
+    parser.add_argument('--ocr-backend', choices=['auto', 'tesserocr', 'pytesseract'], default='auto',
+                        help="Moteur OCR (auto : moteurs persistants tesserocr si installé)")
+    parser.add_argument('--preprocessing', default='all',
+                        help="Étapes de prétraitement : all, none ou liste parmi resample,grayscale,deskew,binarize")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Dossier du cache de résultats")
+    parser.add_argument('--no-cache', action='store_true', help="Désactive le cache de résultats")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="Journalise l'avancement de chaque document (étapes, pages)")
+    parser.add_argument('--no-text', action='store_true', help="N'inclut pas le texte brut dans la sortie")
+    parser.add_argument('--db', metavar='CHEMIN',
+                        help="Enregistre aussi les extractions dans la base SQLite (ex. data/results.sqlite3)")
+    args = parser.parse_args(argv)
+
+    paths = iter_input_files(args.inputs)
+    cache_dir = None if args.no_cache else args.cache_dir
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    store = ResultStore(args.db) if args.db else None
+    try:
+        stats = run_batch(paths, out, max(1, args.workers), cache_dir, not args.no_text,
+                          max(1, args.page_workers), args.dpi, not args.full_text, args.ocr_backend,
+                          args.preprocessing, logging.DEBUG if args.verbose else logging.WARNING, store)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if store is not None:
+            store.close()
+
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Compare la latence OCR par image : pytesseract (un processus par appel) vs pool tesserocr.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_ocr_backends --images 30
+"""
+
+import argparse
+import statistics
+import time
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr_engines import available_backends, create_ocr_backend
+
+LINES = [
+    "DIRECTION GÉNÉRALE DES FINANCES PUBLIQUES",
+    "Référence : AV-2023-004512",
+    "Nom : Dupont    Prénom : Marie",
+    "SIRET : 12345678901234",
+    "Montant : 1 250,00 €",
+    "Tél : 01 23 45 67 89",
+]
+
+
+def make_image(width: int = 1240, height: int = 600) -> Image.Image:
+    """Image synthétique d'un en-tête de formulaire"""
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 32)
+    except OSError:
+        font = ImageFont.load_default()
+    for i, line in enumerate(LINES):
+        draw.text((60, 40 + i * 80), line, fill=0, font=font)
+    return image
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=20, help="Nombre d'images par moteur")
+    args = parser.parse_args()
+
+    image = make_image()
+    for name in available_backends():
+        backend = create_ocr_backend(name)
+        start = time.perf_counter()
+        backend.image_to_string(image)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for _ in range(args.images):
+            start = time.perf_counter()
+            backend.image_to_string(image)
+            latencies.append((time.perf_counter() - start) * 1000)
+        backend.close()
+
+        print(f"{name:12s} premier appel : {cold_ms:7.1f} ms   "
+              f"moyenne : {statistics.mean(latencies):7.1f} ms   "
+              f"p50 : {percentile(latencies, 50):7.1f} ms   "
+              f"p95 : {percentile(latencies, 95):7.1f} ms")
+    if "tesserocr" not in available_backends():
+        print("tesserocr non installé : seul pytesseract a été mesuré")
+
+
+if __name__ == "__main__":
+    main()
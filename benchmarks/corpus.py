@@ -0,0 +1,233 @@
+"""Corpus synthétique de documents administratifs français, avec vérité terrain.
+
+Chaque document est un formulaire dont les valeurs (référence, nom, SIRET,
+montant, téléphone, adresse...) sont connues. Variantes générées :
+
+- ``digital`` : PDF avec couche texte;
+- ``digital_columns`` : PDF avec couche texte en tableau (libellés et valeurs en
+  colonnes écrites l'une après l'autre, montant sous son libellé);
+- ``scanned_pdf`` : PDF ne contenant qu'une image de la page;
+- ``scan_png`` / ``scan_tiff`` : scans bruités et légèrement inclinés;
+- ``bundle`` : PDF de plusieurs pages (courrier, formulaire scanné, annexe).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.corpus --per-kind 5 --output data/bench_corpus
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+from typing import Dict, List
+
+import numpy as np
+import pymupdf as fitz
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+KINDS = ("digital", "scanned_pdf", "scan_png", "scan_tiff", "bundle", "digital_columns")
+
+# Résolution des scans simulés
+SCAN_DPI = 300
+A4_POINTS = (595, 842)
+
+NOMS = ["Dupont", "Martin", "Bernard", "Moreau", "Laurent", "Lefebvre", "Garnier", "Fontaine", "Rousseau", "Mercier"]
+PRENOMS = ["Marie", "Jean", "Camille", "Louis", "Claire", "Antoine", "Sophie", "Hugo", "Julie", "Paul"]
+VOIES = ["rue de la Paix", "avenue Victor Hugo", "boulevard Voltaire", "place de la Mairie", "chemin des Vignes"]
+VILLES = ["75002 Paris", "69003 Lyon", "13001 Marseille", "31000 Toulouse", "44000 Nantes"]
+SERVICES = ["DIRECTION GÉNÉRALE DES FINANCES PUBLIQUES", "SERVICE DES IMPÔTS DES ENTREPRISES",
+            "CAISSE D'ALLOCATIONS FAMILIALES", "URSSAF ÎLE-DE-FRANCE"]
+
+LETTER = [
+    "Madame, Monsieur,",
+    "Nous vous prions de trouver ci-joint le formulaire relatif à votre dossier.",
+    "Les pièces justificatives doivent être transmises dans un délai de trente jours.",
+    "Veuillez agréer l'expression de nos salutations distinguées.",
+]
+ANNEX = [
+    "Annexe : détail des sommes dues au titre de l'exercice.",
+    "Les majorations éventuelles sont calculées conformément au code général des impôts.",
+    "Ce document ne constitue pas un titre de paiement.",
+]
+
+
+def make_record(rng: random.Random) -> Dict[str, str]:
+    """Valeurs de vérité terrain d'un formulaire"""
+    nom, prenom = rng.choice(NOMS), rng.choice(PRENOMS)
+    euros = rng.randint(100, 99999)
+    return {
+        'numero_reference': f"AV-{rng.randint(2019, 2024)}-{rng.randint(0, 999999):06d}",
+        'nom': nom,
+        'prenom': prenom,
+        'date': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2019, 2024)}",
+        'montant': f"{euros:,}".replace(",", " ") + f",{rng.randint(0, 99):02d}",
+        'numero_siret': "".join(str(rng.randint(0, 9)) for _ in range(14)),
+        'adresse': f"{rng.randint(1, 150)} {rng.choice(VOIES)}",
+        'telephone': f"0{rng.randint(1, 9)} " + " ".join(f"{rng.randint(0, 99):02d}" for _ in range(4)),
+        'email': f"{prenom.lower()}.{nom.lower()}@example.fr",
+    }
+
+
+def form_lines(record: Dict[str, str], rng: random.Random) -> List[str]:
+    """Lignes du formulaire, dans l'ordre de mise en page"""
+    return [
+        rng.choice(SERVICES),
+        "AVIS DE SITUATION",
+        "",
+        f"Référence : {record['numero_reference']}",
+        f"Date : {record['date']}",
+        f"Nom : {record['nom']}",
+        f"Prénom : {record['prenom']}",
+        f"SIRET : {record['numero_siret']}",
+        f"Adresse : {record['adresse']}",
+        rng.choice(VILLES),
+        f"Téléphone : {record['telephone']}",
+        f"Email : {record['email']}",
+        f"Montant dû : {record['montant']} €",
+    ]
+
+
+def _font(size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def render_lines(lines: List[str], dpi: int = SCAN_DPI) -> Image.Image:
+    """Page A4 blanche en niveaux de gris avec les lignes de texte"""
+    width, height = (round(side / 72 * dpi) for side in A4_POINTS)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    font = _font(round(dpi / 7))
+    margin, step = round(dpi * 0.8), round(dpi / 3.5)
+    for i, line in enumerate(lines):
+        draw.text((margin, margin + i * step), line, fill=0, font=font)
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+
+def degrade(image: Image.Image, rng: random.Random) -> Image.Image:
+    """Simule un scan : inclinaison, flou léger, bruit et fond grisé"""
+    image = image.rotate(rng.uniform(-3, 3), resample=Image.BILINEAR, expand=True, fillcolor=255)
+    image = image.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 1.0)))
+    noise = np.random.default_rng(rng.randint(0, 2 ** 32 - 1)).normal(0, rng.uniform(8, 20), (image.height, image.width))
+    array = np.asarray(image, dtype=np.float32) * rng.uniform(0.85, 0.95) + noise + 10
+    output = Image.fromarray(np.clip(array, 0, 255).astype(np.uint8))
+    output.info["dpi"] = (SCAN_DPI, SCAN_DPI)
+    return output
+
+
+def _insert_text_page(doc: "fitz.Document", lines: List[str]):
+    page = doc.new_page(width=A4_POINTS[0], height=A4_POINTS[1])
+    for i, line in enumerate(lines):
+        page.insert_text((58, 72 + i * 20), line, fontsize=11)
+
+
+def _insert_columns_page(doc: "fitz.Document", record: Dict[str, str], rng: random.Random):
+    """Formulaire en tableau, écrit colonne par colonne comme le font de nombreux générateurs de PDF :
+    dans le texte à plat, les libellés et les valeurs sont séparés"""
+    page = doc.new_page(width=A4_POINTS[0], height=A4_POINTS[1])
+    page.insert_text((58, 60), rng.choice(SERVICES), fontsize=11)
+    page.insert_text((58, 80), "AVIS DE SITUATION", fontsize=11)
+    rows = [
+        ("Référence", record['numero_reference']),
+        ("Date d'émission", record['date']),
+        ("Nom", record['nom']),
+        ("Prénom", record['prenom']),
+        ("N° SIRET", record['numero_siret']),
+        ("Adresse", record['adresse']),
+        ("Téléphone", record['telephone']),
+        ("Courriel", record['email']),
+    ]
+    for i, (label, _) in enumerate(rows):
+        page.insert_text((58, 130 + i * 22), label, fontsize=11)
+    for i, (_, value) in enumerate(rows):
+        page.insert_text((190, 130 + i * 22), value, fontsize=11)
+    # Ligne de ville sous l'adresse, dans la colonne des valeurs
+    page.insert_text((190, 130 + 5 * 22 + 13), rng.choice(VILLES), fontsize=9)
+    # Encadré du montant, valeur sous le libellé
+    page.insert_text((400, 130), "Montant à payer", fontsize=11)
+    page.insert_text((400, 148), f"{record['montant']} €", fontsize=13)
+
+
+def _insert_image_page(doc: "fitz.Document", image: Image.Image):
+    page = doc.new_page(width=A4_POINTS[0], height=A4_POINTS[1])
+    buffer = io.BytesIO()
+    # JPEG, comme la plupart des numériseurs
+    image.save(buffer, format="JPEG", quality=85)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+
+
+def make_document(kind: str, record: Dict[str, str], rng: random.Random) -> bytes:
+    """Contenu du fichier pour une variante de document"""
+    lines = form_lines(record, rng)
+    if kind == "digital":
+        doc = fitz.open()
+        _insert_text_page(doc, lines)
+        return doc.tobytes()
+    if kind == "digital_columns":
+        doc = fitz.open()
+        _insert_columns_page(doc, record, rng)
+        return doc.tobytes()
+    if kind in ("scanned_pdf", "bundle"):
+        doc = fitz.open()
+        if kind == "bundle":
+            _insert_text_page(doc, LETTER)
+        _insert_image_page(doc, degrade(render_lines(lines), rng))
+        if kind == "bundle":
+            _insert_text_page(doc, ANNEX)
+        return doc.tobytes()
+    buffer = io.BytesIO()
+    scan = degrade(render_lines(lines), rng)
+    if kind == "scan_png":
+        scan.save(buffer, format="PNG", dpi=(SCAN_DPI, SCAN_DPI))
+    else:
+        scan.save(buffer, format="TIFF", compression="tiff_lzw", dpi=(SCAN_DPI, SCAN_DPI))
+    return buffer.getvalue()
+
+
+EXTENSIONS = {"digital": ".pdf", "digital_columns": ".pdf", "scanned_pdf": ".pdf", "bundle": ".pdf", "scan_png": ".png", "scan_tiff": ".tiff"}
+
+
+def generate_corpus(output_dir: str, per_kind: int = 5, seed: int = 0) -> List[Dict]:
+    """Écrit le corpus et son manifeste (``manifest.json``); retourne les entrées du manifeste"""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for kind in KINDS:
+        for i in range(per_kind):
+            record = make_record(rng)
+            filename = f"{kind}_{i:03d}{EXTENSIONS[kind]}"
+            with open(os.path.join(output_dir, filename), "wb") as f:
+                f.write(make_document(kind, record, rng))
+            manifest.append({'file': filename, 'kind': kind, 'truth': record})
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({'seed': seed, 'per_kind': per_kind, 'kinds': list(KINDS), 'documents': manifest}, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_corpus(output_dir: str, per_kind: int = 5, seed: int = 0) -> List[Dict]:
+    """Manifeste du corpus, régénéré si absent ou produit avec d'autres paramètres"""
+    try:
+        with open(os.path.join(output_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest['seed'] == seed and manifest['per_kind'] == per_kind and manifest.get('kinds') == list(KINDS):
+            return manifest['documents']
+    except (OSError, ValueError, KeyError):
+        pass
+    return generate_corpus(output_dir, per_kind, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=os.path.join("data", "bench_corpus"), help="Dossier du corpus")
+    parser.add_argument("--per-kind", type=int, default=5, help="Nombre de documents par variante")
+    parser.add_argument("--seed", type=int, default=0, help="Graine aléatoire (corpus reproductible)")
+    args = parser.parse_args()
+    manifest = generate_corpus(args.output, args.per_kind, args.seed)
+    print(f"{len(manifest)} documents écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
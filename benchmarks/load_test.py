@@ -0,0 +1,133 @@
+"""Test de charge du service HTTP d'extraction : latence p50/p95/p99, débit et refus.
+
+Usage (depuis la racine du dépôt, service lancé avec ``python ocr_service.py``) :
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 8 --requests 200
+    python -m benchmarks.load_test --file scan.pdf --concurrency 16 --duration 60
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.bench_ocr_backends import percentile
+
+
+def load_payloads(paths: List[str], variants: int) -> List[Tuple[str, bytes]]:
+    """Documents envoyés : fichiers fournis, ou PDF synthétiques générés à la volée"""
+    if paths:
+        payloads = []
+        for path in paths:
+            with open(path, "rb") as f:
+                payloads.append((os.path.basename(path), f.read()))
+        return payloads
+    from benchmarks.corpus import make_document, make_record
+    rng = random.Random(0)
+    return [(f"synthetique_{i}.pdf", make_document("digital", make_record(rng), rng)) for i in range(variants)]
+
+
+def send(url: str, filename: str, payload: bytes, timeout: float) -> Tuple[int, float]:
+    """Envoie un document; retourne le statut HTTP et la latence (s)"""
+    request = urllib.request.Request(f"{url}/v1/extract?filename={filename}&text=0", data=payload,
+                                     headers={'Content-Type': "application/octet-stream"}, method="POST")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_load(url: str, payloads: List[Tuple[str, bytes]], concurrency: int, requests: Optional[int],
+             duration: Optional[float], timeout: float) -> Dict:
+    """Envoie les requêtes avec ``concurrency`` clients simultanés"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    counter = iter(range(requests if requests else 10 ** 12))
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client(index: int):
+        rng = random.Random(index)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            if deadline and time.perf_counter() >= deadline:
+                return
+            filename, payload = rng.choice(payloads)
+            status, seconds = send(url, filename, payload, timeout)
+            with lock:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(seconds)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(concurrency):
+            executor.submit(client, i)
+    elapsed = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    report = {
+        'concurrency': concurrency,
+        'requests': total,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(total / elapsed, 2) if elapsed else None,
+        'ok_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    }
+    if latencies:
+        report['latency_ms'] = {
+            'mean': round(statistics.mean(latencies) * 1000, 1),
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Adresse du service")
+    parser.add_argument("--file", action="append", default=[], help="Document à envoyer (répétable)")
+    parser.add_argument("--variants", type=int, default=20, help="Nombre de PDF synthétiques si aucun --file")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Clients simultanés")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Nombre total de requêtes")
+    parser.add_argument("--duration", type=float, help="Durée du test en secondes (remplace --requests)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Délai maximal d'une requête (s)")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.file, args.variants)
+    report = run_load(args.url.rstrip("/"), payloads, max(1, args.concurrency),
+                      None if args.duration else args.requests, args.duration, args.timeout)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['requests']} requêtes en {report['elapsed_s']:.1f} s, {args.concurrency} clients : "
+          f"{report['rps']:.1f} req/s ({report['ok_rps']:.1f} réussies/s)")
+    print("Statuts : " + ", ".join(f"{code}={count}" for code, count in report['statuses'].items()))
+    if 'latency_ms' in report:
+        latency = report['latency_ms']
+        print(f"Latence (ms) : p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+              f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
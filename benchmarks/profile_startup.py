@@ -0,0 +1,83 @@
+"""Profil du démarrage de l'application : coût d'import des modules lourds et durée des reruns Streamlit.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.profile_startup --reruns 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = [
+    "streamlit",
+    "plotly.graph_objects",
+    "pandas",
+    "numpy",
+    "PIL.Image",
+    "pymupdf",
+    "pytesseract",
+    "ocr_processor",
+]
+
+# Exécuté dans un interpréteur neuf pour mesurer un démarrage à froid
+APP_PROFILE = """
+import json, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("j_alt.py", default_timeout=120)
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+reruns = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({{"first_render_s": first, "reruns_s": reruns, "exceptions": [str(e) for e in at.exception]}}))
+"""
+
+
+def import_time(module: str) -> float:
+    """Durée d'import d'un module dans un interpréteur neuf (secondes)"""
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return float("nan")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=5, help="Nombre de reruns mesurés après le premier rendu")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args()
+
+    imports = {module: import_time(module) for module in HEAVY_MODULES}
+    result = subprocess.run([sys.executable, "-c", APP_PROFILE.format(reruns=args.reruns)],
+                            capture_output=True, text=True)
+    if result.returncode == 0:
+        app = json.loads(result.stdout.strip().splitlines()[-1])
+    else:
+        app = {"error": (result.stderr.strip().splitlines() or ["?"])[-1]}
+
+    if args.json:
+        print(json.dumps({"imports_s": imports, "app": app}, indent=2))
+        return
+
+    print("Import à froid :")
+    for module, seconds in imports.items():
+        print(f"  {module:22s} {seconds * 1000:8.1f} ms")
+    if "error" in app:
+        print(f"Profil Streamlit indisponible : {app['error']}")
+        return
+    print(f"Premier rendu (time-to-first-render) : {app['first_render_s'] * 1000:8.1f} ms")
+    if app["reruns_s"]:
+        print(f"Rerun (interaction) : moyenne {statistics.mean(app['reruns_s']) * 1000:8.1f} ms, "
+              f"max {max(app['reruns_s']) * 1000:8.1f} ms")
+    for error in app["exceptions"]:
+        print(f"Exception : {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Suite de benchmark du pipeline : latence et débit par étape, précision des champs.
+
+Les documents du corpus synthétique (voir ``benchmarks/corpus.py``) passent par
+la lecture des pages PDF (``extract_from_pdf_streaming``, mise en page comprise)
+ou ``recognize_page`` (zones d'un gabarit, ou page entière) puis par ``extract_structured_data``; les champs
+obtenus sont comparés à la vérité terrain. Le résultat est écrit en JSON et peut être comparé à un run précédent.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.run_suite --per-kind 5 -o data/benchmarks/run.json
+    python -m benchmarks.run_suite --compare data/benchmarks/base.json -o data/benchmarks/run.json
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from benchmarks.bench_ocr_backends import percentile
+from benchmarks.corpus import load_corpus
+from field_extraction import FIELDS
+from ocr_processor import OCRError, OCRProcessor
+from zone_templates import load_templates
+
+STAGES = ("extract_text_from_pdf", "extract_text_from_image", "extract_structured_data")
+# Gabarit du formulaire du corpus (le registre livré à la racine est vide)
+CORPUS_TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "form_templates.json")
+
+
+def normalize(value: Optional[str]) -> str:
+    """Forme comparable d'une valeur : espaces regroupés, casse ignorée"""
+    return re.sub(r"\s+", " ", value or "").strip().casefold()
+
+
+def run_document(processor: OCRProcessor, path: str) -> Dict:
+    """Traite un document étape par étape; retourne durées (s), texte et champs"""
+    with open(path, "rb") as f:
+        file_bytes = f.read()
+    timings = {}
+    if path.lower().endswith(".pdf"):
+        # Chemin de l'application : toutes les pages sont lues, et les champs des pages à couche
+        # texte sont appariés par la mise en page pendant la lecture (temps compté avec le texte)
+        # Le type de document (classement compris dans le temps de lecture) choisit champs et réglages OCR
+        start = time.perf_counter()
+        doc = processor.open_pdf(file_bytes)
+        try:
+            routing, first_page = processor.route_pdf(doc)
+            streamed = processor.extract_from_pdf_streaming(file_bytes, stop_when_complete=False, document=doc,
+                                                            pipeline=routing.pipeline, first_page=first_page)
+        finally:
+            doc.close()
+        timings["extract_text_from_pdf"] = time.perf_counter() - start - streamed['extraction_s']
+        timings["extract_structured_data"] = streamed['extraction_s']
+        return {'timings': timings, 'text': streamed['text'], 'data': streamed['data'],
+                'document_type': routing.pipeline.name}
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(file_bytes))
+    if processor.preprocessor:
+        image, _ = processor.preprocessor.process(image)
+    # Formulaires connus : seules les zones du gabarit sont lues (voir zone_templates.py);
+    # le type de document est deviné sur le texte de la page lue
+    routing, (text, _, _, fields, _) = processor.route_image(image, False)
+    timings["extract_text_from_image"] = time.perf_counter() - start
+    start = time.perf_counter()
+    data = processor.extract_structured_data(text, fields, routing.pipeline)
+    timings["extract_structured_data"] = time.perf_counter() - start
+    return {'timings': timings, 'text': text, 'data': data, 'document_type': routing.pipeline.name}
+
+
+def stage_summary(latencies: List[float], units: float, unit: str) -> Dict:
+    """Latence (ms) et débit d'une étape"""
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+        'docs_per_s': round(len(latencies) / total, 3) if total else None,
+        f'{unit}_per_s': round(units / total, 3) if total else None,
+    }
+
+
+def run_suite(corpus_dir: str, per_kind: int, seed: int, processor: OCRProcessor) -> Dict:
+    """Exécute la suite sur le corpus et retourne le rapport complet"""
+    documents = load_corpus(corpus_dir, per_kind, seed)
+    warm_up = getattr(processor.ocr_backend, "warm_up", None)
+    if warm_up:
+        warm_up()
+
+    latencies = defaultdict(list)
+    volumes = defaultdict(float)
+    correct = defaultdict(lambda: defaultdict(int))
+    totals = defaultdict(int)
+    records = []
+    for entry in documents:
+        path = os.path.join(corpus_dir, entry['file'])
+        record = {'file': entry['file'], 'kind': entry['kind']}
+        try:
+            result = run_document(processor, path)
+        except OCRError as e:
+            record['error'] = str(e)
+            records.append(record)
+            continue
+
+        for stage, seconds in result['timings'].items():
+            latencies[stage].append(seconds)
+        text_stage = "extract_text_from_pdf" if "extract_text_from_pdf" in result['timings'] else "extract_text_from_image"
+        volumes[text_stage] += os.path.getsize(path)
+        volumes["extract_structured_data"] += len(result['text'].encode("utf-8"))
+
+        matches = {field: normalize(result['data'].get(field)) == normalize(entry['truth'][field])
+                   for field in FIELDS if field in entry['truth']}
+        for field, ok in matches.items():
+            correct[entry['kind']][field] += ok
+        totals[entry['kind']] += 1
+        record['document_type'] = result['document_type']
+        record['timings_ms'] = {stage: round(s * 1000, 3) for stage, s in result['timings'].items()}
+        record['fields_ok'] = sum(matches.values())
+        record['fields_total'] = len(matches)
+        record['mismatches'] = {field: {'expected': entry['truth'][field], 'found': result['data'].get(field)}
+                                for field, ok in matches.items() if not ok}
+        records.append(record)
+
+    stages = {stage: stage_summary(latencies[stage], volumes[stage] / 2 ** 20, "mb")
+              for stage in STAGES if latencies[stage]}
+    by_kind = {kind: {field: round(count / totals[kind], 4) for field, count in fields.items()}
+               for kind, fields in correct.items()}
+    by_field = {}
+    for field in FIELDS:
+        hits = sum(correct[kind][field] for kind in totals)
+        count = sum(totals.values())
+        if count:
+            by_field[field] = round(hits / count, 4)
+    overall = round(statistics.mean(by_field.values()), 4) if by_field else None
+
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec="seconds"),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'ocr_backend': processor.ocr_backend.name,
+            'cache_signature': processor.cache_signature,
+            'rules_version': processor.RULES_VERSION,
+            'corpus': {'seed': seed, 'per_kind': per_kind, 'documents': len(documents)},
+        },
+        'stages': stages,
+        'accuracy': {'overall': overall, 'fields': by_field, 'by_kind': by_kind},
+        'errors': sum(1 for record in records if 'error' in record),
+        'documents': records,
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_slowdown: float, max_accuracy_drop: float) -> List[str]:
+    """Affiche les écarts avec un run précédent; retourne les régressions au-delà des seuils"""
+    regressions = []
+    print(f"Comparaison avec le run du {baseline['meta'].get('date', '?')} :")
+    for stage, stats in current['stages'].items():
+        before = baseline['stages'].get(stage)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            change = stats[metric] / before[metric] - 1 if before[metric] else 0.0
+            print(f"  {stage:26s} {metric:6s} {before[metric]:10.1f} -> {stats[metric]:10.1f} ms ({change:+.1%})")
+            if change > max_slowdown:
+                regressions.append(f"{stage} {metric} +{change:.1%}")
+    for field, accuracy in current['accuracy']['fields'].items():
+        before = baseline['accuracy']['fields'].get(field)
+        if before is None:
+            continue
+        drop = before - accuracy
+        if drop:
+            print(f"  précision {field:16s} {before:.1%} -> {accuracy:.1%}")
+        if drop > max_accuracy_drop:
+            regressions.append(f"précision {field} -{drop:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus-dir", default=os.path.join("data", "bench_corpus"), help="Dossier du corpus")
+    parser.add_argument("--per-kind", type=int, default=5, help="Nombre de documents par variante")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du corpus")
+    parser.add_argument("-o", "--output", help="Fichier JSON de résultats")
+    parser.add_argument("--compare", help="Résultats JSON d'un run précédent")
+    parser.add_argument("--max-slowdown", type=float, default=0.2,
+                        help="Hausse de latence tolérée avant d'échouer (0.2 = +20 %%)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0,
+                        help="Baisse de précision tolérée par champ (0.05 = 5 points)")
+    parser.add_argument("--ocr-backend", default="auto", choices=["auto", "tesserocr", "pytesseract"])
+    parser.add_argument("--preprocessing", default="all", help="Étapes de prétraitement (all, none ou liste)")
+    parser.add_argument("--templates", default=CORPUS_TEMPLATES, help="Gabarits de formulaires (JSON)")
+    args = parser.parse_args()
+
+    processor = OCRProcessor(ocr_backend=args.ocr_backend, preprocessing=args.preprocessing,
+                             templates=load_templates(args.templates))
+    report = run_suite(args.corpus_dir, args.per_kind, args.seed, processor)
+
+    for stage, stats in report['stages'].items():
+        print(f"{stage:26s} n={stats['count']:3d}  p50 {stats['p50_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms  "
+              f"{stats['docs_per_s']:8.2f} doc/s  {stats['mb_per_s']:8.2f} Mo/s")
+    accuracy = report['accuracy']
+    if accuracy['overall'] is not None:
+        print(f"Précision globale : {accuracy['overall']:.1%}")
+        for field, value in accuracy['fields'].items():
+            print(f"  {field:16s} {value:.1%}")
+    if report['errors']:
+        first = next(record['error'] for record in report['documents'] if 'error' in record)
+        print(f"{report['errors']} document(s) en erreur (ex. : {first})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Résultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_slowdown, args.max_accuracy_drop)
+        if regressions:
+            print("Régressions : " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Lot de documents téléversés ensemble : soumission bornée à la file de traitements et grille des résultats.
+
+Chaque document du lot est servi par le cache OCR s'il a déjà été traité, sinon
+confié à la file de traitements (``JobQueue``). Au plus ``max_in_flight`` jobs du
+lot sont en cours à la fois : une session ne monopolise pas les workers partagés
+par le serveur, et les documents suivants sont soumis au fil des fins de
+traitement. La grille compte une ligne par document, triable et paginée; les
+valeurs corrigées et la case « Validé » sont gardées dans le lot jusqu'à
+l'enregistrement groupé.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from field_extraction import FIELDS
+from job_queue import FINISHED_STATES, JOB_DONE, QueueFullError
+from result_store import make_record
+
+ITEM_WAITING = "en attente"
+ITEM_RUNNING = "en cours"
+ITEM_DONE = "terminé"
+ITEM_FAILED = "échec"
+ITEM_SAVED = "enregistré"
+
+# Numéro du document dans le lot (ordre de téléversement) : identifiant stable d'une ligne
+COLUMN_ID = "N°"
+COLUMN_FILE = "Fichier"
+COLUMN_STATE = "État"
+COLUMN_TYPE = "Type"
+COLUMN_CONFIDENCE = "Confiance"
+COLUMN_VALIDATED = "Validé"
+
+# Colonne de la grille de chaque champ
+FIELD_COLUMNS: Dict[str, str] = {
+    'numero_reference': "Référence",
+    'nom': "Nom",
+    'prenom': "Prénom",
+    'date': "Date",
+    'montant': "Montant",
+    'numero_siret': "SIRET",
+    'adresse': "Adresse",
+    'telephone': "Téléphone",
+    'email': "Email",
+}
+COLUMNS = [COLUMN_ID, COLUMN_FILE, COLUMN_STATE, COLUMN_TYPE, *(FIELD_COLUMNS[field] for field in FIELDS),
+           COLUMN_CONFIDENCE, COLUMN_VALIDATED]
+# Colonnes que l'opérateur peut modifier
+EDITABLE_COLUMNS = [*(FIELD_COLUMNS[field] for field in FIELDS), COLUMN_VALIDATED]
+
+
+class BatchItem:
+    """Document du lot : son état de traitement, son résultat et les corrections de l'opérateur"""
+
+    def __init__(self, index: int, upload, cache_key: str):
+        self.index = index
+        self.filename = upload.filename
+        self.digest = upload.digest
+        self.cache_key = cache_key
+        # Tampon gardé jusqu'à la soumission du job (le worker en reçoit une vue)
+        self.upload = upload
+        self.state = ITEM_WAITING
+        self.job_id: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cached = False
+        self.text = ""
+        self.extracted: Dict = dict.fromkeys(FIELDS)
+        self.data: Dict = dict.fromkeys(FIELDS)
+        self.confidence: Optional[Dict] = None
+        self.located: Optional[Dict] = None
+        self.document_type: Optional[Dict] = None
+        self.validated = False
+
+    def row(self) -> Dict:
+        """Ligne de la grille"""
+        return {
+            COLUMN_ID: self.index + 1,
+            COLUMN_FILE: self.filename,
+            COLUMN_STATE: f"{self.state} (cache)" if self.cached and self.state == ITEM_DONE else self.state,
+            COLUMN_TYPE: self.document_type['label'] if self.document_type else None,
+            **{FIELD_COLUMNS[field]: self.data.get(field) for field in FIELDS},
+            COLUMN_CONFIDENCE: (self.confidence or {}).get('document'),
+            COLUMN_VALIDATED: self.validated,
+        }
+
+
+def _sort_key(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class DocumentBatch:
+    """Documents d'un téléversement multiple, traités en parallèle borné"""
+
+    def __init__(self, max_in_flight: int = 2):
+        self.max_in_flight = max(1, max_in_flight)
+        self.items: List[BatchItem] = []
+
+    def add(self, upload, cache_key: str, cached: Optional[Dict] = None) -> BatchItem:
+        """Ajoute un document (``UploadBuffer``); ``cached`` : son résultat déjà en cache OCR"""
+        item = BatchItem(len(self.items), upload, cache_key)
+        self.items.append(item)
+        if cached is not None:
+            item.cached = True
+            self.finish(item, cached)
+        return item
+
+    def finish(self, item: BatchItem, result: Dict):
+        """Résultat d'un document (job terminé ou entrée du cache OCR)"""
+        item.upload = None
+        item.state = ITEM_DONE
+        item.text = result['text']
+        item.extracted = dict(result['data'])
+        item.data = dict(result['data'])
+        item.confidence = result.get('confidence')
+        item.located = result.get('located')
+        item.document_type = result.get('document_type')
+
+    def fail(self, item: BatchItem, error: str):
+        item.upload = None
+        item.state = ITEM_FAILED
+        item.error = error
+
+    def advance(self, job_queue) -> bool:
+        """Relève les jobs terminés et soumet les documents en attente; True tant que le lot n'est pas fini"""
+        for item in self.items:
+            if item.state != ITEM_RUNNING:
+                continue
+            job = job_queue.get(item.job_id)
+            if job is None:
+                self.fail(item, "Traitement introuvable (expiré ou supprimé)")
+            elif job['state'] == JOB_DONE:
+                self.finish(item, job['result'])
+            elif job['state'] in FINISHED_STATES:
+                self.fail(item, job.get('error') or "Traitement en échec")
+
+        in_flight = sum(item.state == ITEM_RUNNING for item in self.items)
+        for item in self.items:
+            if in_flight >= self.max_in_flight:
+                break
+            if item.state != ITEM_WAITING:
+                continue
+            try:
+                item.job_id = job_queue.submit(item.upload.view, item.filename, item.cache_key)
+            except QueueFullError:
+                # File partagée pleine : nouvel essai au prochain relevé
+                break
+            item.state = ITEM_RUNNING
+            in_flight += 1
+        return any(item.state in (ITEM_WAITING, ITEM_RUNNING) for item in self.items)
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de documents par état"""
+        counts = dict.fromkeys((ITEM_WAITING, ITEM_RUNNING, ITEM_DONE, ITEM_FAILED, ITEM_SAVED), 0)
+        for item in self.items:
+            counts[item.state] += 1
+        return counts
+
+    def rows(self, sort_by: Optional[str] = None, descending: bool = False) -> List[Dict]:
+        """Lignes de la grille, triées sur ``sort_by``; cases vides en dernier"""
+        rows = [item.row() for item in self.items]
+        if sort_by:
+            filled = [row for row in rows if row[sort_by] not in (None, "")]
+            empty = [row for row in rows if row[sort_by] in (None, "")]
+            filled.sort(key=lambda row: _sort_key(row[sort_by]), reverse=descending)
+            rows = filled + empty
+        return rows
+
+    def apply_edits(self, rows: Iterable[Dict]):
+        """Reporte les lignes de la grille sur les documents terminés, retrouvés par leur numéro (``COLUMN_ID``)"""
+        for row in rows:
+            item = self.items[int(row[COLUMN_ID]) - 1]
+            if item.state != ITEM_DONE:
+                continue
+            for field in FIELDS:
+                value = row.get(FIELD_COLUMNS[field])
+                item.data[field] = (value.strip() or None) if isinstance(value, str) else None
+            item.validated = bool(row.get(COLUMN_VALIDATED))
+
+    def validated_items(self) -> List[BatchItem]:
+        """Documents terminés cochés « Validé » et pas encore enregistrés"""
+        return [item for item in self.items if item.state == ITEM_DONE and item.validated]
+
+    def save(self, store, ocr_signature: Optional[str] = None) -> int:
+        """Enregistre les documents validés en une opération groupée (``ResultStore.save_many``);
+        retourne le nombre de lignes écrites"""
+        items = self.validated_items()
+        written = store.save_many(
+            make_record(item.digest, item.filename, item.text, item.data, extracted=item.extracted,
+                        validated=True, confidence=(item.confidence or {}).get('document'),
+                        located=item.located, ocr_signature=ocr_signature,
+                        document_type=(item.document_type or {}).get('type'))
+            for item in items
+        )
+        for item in items:
+            item.state = ITEM_SAVED
+        return written
+
+
+def page_count(total: int, page_size: int) -> int:
+    return max(1, -(-total // page_size))
+
+
+def page_rows(rows: List, page: int, page_size: int) -> List:
+    """Lignes de la page ``page`` (numérotée à partir de 1)"""
+    start = (page - 1) * page_size
+    return rows[start:start + page_size]
@@ -0,0 +1,127 @@
+"""Miniatures d'aperçu des documents : rendu basse résolution borné en pixels, mis en cache par empreinte.
+
+Une miniature est rendue directement à la taille voulue (PyMuPDF avec une
+matrice de réduction, Pillow par réductions successives) puis encodée une
+fois en JPEG : les reruns ne refont ni le rendu ni l'encodage, et le
+navigateur reçoit quelques dizaines de Ko au lieu de la page en pleine taille.
+"""
+
+import io
+import math
+import threading
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Tuple
+
+# Pixels au plus par miniature, et pour l'ensemble d'une bande de pages
+PAGE_PIXEL_BUDGET = 500_000
+STRIP_PIXEL_BUDGET = 1_200_000
+MAX_STRIP_PAGES = 4
+# Agrandissement maximal d'une page PDF (2 = 144 dpi)
+MAX_PDF_ZOOM = 2.0
+JPEG_QUALITY = 80
+
+
+class Thumbnail(NamedTuple):
+    """Miniature encodée d'une page (ou d'une image)"""
+    data: bytes
+    width: int
+    height: int
+    page: int
+
+
+class Preview(NamedTuple):
+    """Miniatures des premières pages et nombre total de pages du document"""
+    thumbnails: Tuple[Thumbnail, ...]
+    page_count: int
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(thumbnail.data) for thumbnail in self.thumbnails)
+
+
+def scale_for_budget(width: float, height: float, budget: int, max_scale: float = 1.0) -> float:
+    """Facteur d'échelle (au plus ``max_scale``) pour que ``width x height`` tienne dans ``budget`` pixels"""
+    if width <= 0 or height <= 0:
+        return max_scale
+    return min(max_scale, math.sqrt(budget / (width * height)))
+
+
+def page_budget(page_count: int, max_pages: int = MAX_STRIP_PAGES) -> int:
+    """Budget de pixels d'une miniature selon le nombre de pages affichées"""
+    shown = max(1, min(page_count, max_pages))
+    return min(PAGE_PIXEL_BUDGET, STRIP_PIXEL_BUDGET // shown)
+
+
+def pdf_preview(doc, max_pages: int = MAX_STRIP_PAGES) -> Preview:
+    """Miniatures des premières pages d'un ``fitz.Document``"""
+    import pymupdf as fitz
+
+    budget = page_budget(doc.page_count, max_pages)
+    thumbnails = []
+    for number in range(min(doc.page_count, max_pages)):
+        page = doc[number]
+        zoom = scale_for_budget(page.rect.width, page.rect.height, budget, MAX_PDF_ZOOM)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        thumbnails.append(Thumbnail(pix.tobytes("jpg", jpg_quality=JPEG_QUALITY), pix.width, pix.height, number + 1))
+    return Preview(tuple(thumbnails), doc.page_count)
+
+
+def image_preview(image, max_pages: int = MAX_STRIP_PAGES) -> Preview:
+    """Miniatures d'une image PIL (les premières trames d'un TIFF multipage), ouverte dans les
+    budgets du processeur (``input_limits.open_image`` contrôle déjà chaque trame)"""
+    from PIL import Image
+
+    page_count = getattr(image, "n_frames", 1)
+    budget = page_budget(page_count, max_pages)
+    thumbnails = []
+    for number in range(min(page_count, max_pages)):
+        if page_count > 1:
+            image.seek(number)
+        scale = scale_for_budget(image.width, image.height, budget)
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        # Réduction par étapes (reducing_gap) : rapide et sans copie pleine taille
+        frame = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+        if frame.mode not in ("RGB", "L"):
+            frame = frame.convert("RGB")
+        output = io.BytesIO()
+        frame.save(output, "JPEG", quality=JPEG_QUALITY)
+        thumbnails.append(Thumbnail(output.getvalue(), frame.width, frame.height, number + 1))
+    if page_count > 1:
+        image.seek(0)
+    return Preview(tuple(thumbnails), page_count)
+
+
+class PreviewCache:
+    """Aperçus déjà rendus, par empreinte de contenu (LRU borné en octets), partagés entre sessions"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Preview]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, digest: str, render: Callable[[], Preview]) -> Preview:
+        """Aperçu en cache, ou rendu par ``render()`` puis mis en cache"""
+        with self._lock:
+            preview = self._entries.get(digest)
+            if preview is not None:
+                self._entries.move_to_end(digest)
+                return preview
+        preview = render()
+        with self._lock:
+            if digest not in self._entries:
+                self._entries[digest] = preview
+                self._bytes += preview.nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return preview
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def render_preview(document, is_pdf: bool, max_pages: int = MAX_STRIP_PAGES) -> Preview:
+    """Aperçu d'un document déjà ouvert (``fitz.Document`` ou image PIL)"""
+    return pdf_preview(document, max_pages) if is_pdf else image_preview(document, max_pages)
+
@@ -0,0 +1,194 @@
+"""Classement rapide des documents par type, et traitement propre à chaque type.
+
+Le type est deviné à partir des premiers caractères du document (couche texte
+de la première page d'un PDF, ou texte OCR de la première page scannée, lue avec
+les réglages génériques et sans lecture supplémentaire) par des mots-clés
+pondérés : quelques dizaines de tests de sous-chaînes, soit moins d'une
+milliseconde. Chaque type a ses champs, ses patterns et ses réglages OCR (pour
+un document scanné, à partir de la deuxième page); le travail qui ne sert pas ce
+type (gabarits, champs absents de ce type de document) est évité. Un document
+non reconnu suit le traitement générique.
+"""
+
+import re
+import time
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from field_extraction import FIELD_KEYWORDS, FIELD_PATTERNS, FIELDS, FieldExtractor
+
+GENERIC = "generique"
+
+# Caractères examinés par le classement
+CLASSIFY_CHARS = 2000
+# Score minimal pour retenir un type (sinon traitement générique)
+MIN_SCORE = 3
+
+SOURCE_TEXT_LAYER = "texte_natif"
+SOURCE_FIRST_PAGE_OCR = "ocr_page_1"
+SOURCE_TEXT = "texte"
+SOURCE_DEFAULT = "defaut"
+
+# Mots-clés de chaque type (minuscules, sans accents) et leur poids
+TYPE_KEYWORDS: Dict[str, Dict[str, int]] = {
+    'facture': {
+        'facture': 3, 'total ttc': 3, 'total ht': 3, 'tva': 2, 'net a payer': 1, 'echeance': 1,
+        'bon de commande': 1, 'conditions de paiement': 1,
+    },
+    'avis': {
+        'avis de situation': 4, "avis d'imposition": 4, 'avis de non-imposition': 4, 'finances publiques': 2,
+        'impots': 2, 'urssaf': 2, 'allocations familiales': 2, 'montant du': 1, 'reste a payer': 1,
+    },
+    'identite': {
+        "carte nationale d'identite": 4, 'passeport': 3, 'titre de sejour': 3, 'nationalite': 2,
+        'lieu de naissance': 2, 'date de naissance': 2, 'ne le': 1, 'nee le': 1,
+    },
+}
+
+_FLAGS = re.IGNORECASE | re.MULTILINE
+_NAME = r"[A-ZÀ-Þ][A-Za-zÀ-ÖØ-öø-ÿ'\-]+"
+_AMOUNT = r"(\d{1,3}(?:[  .]\d{3})+(?:,\d{2})?|\d+(?:[,.]\d{2})?)"
+_DATE = r"(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4})"
+
+
+class DocumentPipeline(NamedTuple):
+    """Traitement d'un type de document : champs recherchés, patterns et réglages OCR"""
+    name: str
+    label: str
+    fields: Tuple[str, ...]
+    extractor: FieldExtractor
+    psm: int = 6
+    templates: bool = True
+    reocr: bool = True
+
+
+def _pipeline(name: str, label: str, fields: Tuple[str, ...] = FIELDS,
+              patterns: Optional[Dict[str, Tuple[str, Tuple[str, ...]]]] = None, **ocr) -> DocumentPipeline:
+    """Pipeline dont les patterns génériques sont remplacés par ``patterns`` (regex, libellés requis)"""
+    compiled = {field: FIELD_PATTERNS[field] for field in fields}
+    keywords = {field: FIELD_KEYWORDS[field] for field in fields if field in FIELD_KEYWORDS}
+    for field, (pattern, labels) in (patterns or {}).items():
+        compiled[field] = re.compile(pattern, _FLAGS)
+        keywords[field] = labels
+    return DocumentPipeline(name, label, fields, FieldExtractor(compiled, keywords), **ocr)
+
+
+PIPELINES: Dict[str, DocumentPipeline] = {
+    pipeline.name: pipeline for pipeline in (
+        _pipeline(GENERIC, "Document"),
+        # Factures : pas de nom/prénom de personne, montant lu sur le total; tableaux en colonnes (PSM 4)
+        _pipeline(
+            'facture', "Facture",
+            fields=('numero_reference', 'date', 'montant', 'numero_siret', 'adresse', 'telephone', 'email'),
+            patterns={
+                'numero_reference': (r"facture\s*(?:n°|no|num[ée]ro)?\s*:?\s*([A-Z0-9][A-Z0-9\-/]*\d[A-Z0-9\-/]*)",
+                                     ('facture',)),
+                'montant': (rf"(?:total\s+ttc|net\s+[àa]\s+payer|montant\s+ttc|total\s+[àa]\s+payer)\s*:?\s*{_AMOUNT}",
+                            ('ttc', 'payer')),
+            },
+            psm=4, templates=False,
+        ),
+        # Avis administratifs : formulaires à gabarit, montant dû plutôt que le premier nombre venu
+        _pipeline(
+            'avis', "Avis administratif",
+            patterns={
+                'nom': (rf"\bnom\s*:?[ \t]*({_NAME}(?:[ \t]+{_NAME})*)", ('nom',)),
+                'montant': (rf"(?:montant(?:\s+d[uû])?|(?:reste|somme)\s+[àa]\s+payer)\s*:?\s*{_AMOUNT}",
+                            ('montant', 'payer')),
+            },
+        ),
+        # Pièces d'identité : personne, date de naissance, adresse et numéro du document
+        _pipeline(
+            'identite', "Pièce d'identité",
+            fields=('numero_reference', 'nom', 'prenom', 'date', 'adresse'),
+            patterns={
+                'numero_reference': (r"(?:n°\s*(?:du\s+)?document|num[ée]ro\s+de\s+(?:la\s+)?carte|carte\s+n°)"
+                                     r"\s*:?\s*([A-Z0-9]{6,})", ('document', 'carte')),
+                'nom': (rf"\bnom(?:\s+de\s+naissance|\s+d'usage)?\s*:?[ \t]*({_NAME}(?:[ \t]+{_NAME})*)", ('nom',)),
+                'prenom': (rf"pr[ée]noms?\s*:?[ \t]*({_NAME}(?:[ \t,]+{_NAME})*)", ('prénom', 'prenom')),
+                'date': (rf"n[ée]\(?e?\)?\s+le\s*:?\s*{_DATE}", ('le',)),
+            },
+            templates=False,
+        ),
+    )
+}
+
+
+def normalize_text(text: str) -> str:
+    """Texte comparable aux mots-clés : minuscules, sans accents, apostrophes droites"""
+    # Les mots-clés sont en ASCII : les accents décomposés (NFKD) et autres caractères sont écartés
+    text = unicodedata.normalize("NFKD", text.lower().replace("’", "'"))
+    return text.encode("ascii", "ignore").decode("ascii")
+
+
+class Classification(NamedTuple):
+    """Type retenu, son score et les scores de tous les types"""
+    type: str
+    score: int
+    scores: Dict[str, int]
+
+
+class DocumentClassifier:
+    """Classement par mots-clés pondérés sur le début du document"""
+
+    def __init__(self, keywords: Optional[Dict[str, Dict[str, int]]] = None, min_score: int = MIN_SCORE,
+                 max_chars: int = CLASSIFY_CHARS):
+        self.keywords = TYPE_KEYWORDS if keywords is None else keywords
+        self.min_score = min_score
+        self.max_chars = max_chars
+
+    def classify(self, text: str) -> Classification:
+        sample = normalize_text(text[:self.max_chars])
+        scores = {name: sum(weight for keyword, weight in keywords.items() if keyword in sample)
+                  for name, keywords in self.keywords.items()}
+        best = max(scores, key=scores.get, default=None)
+        if best is None or scores[best] < self.min_score:
+            return Classification(GENERIC, 0, scores)
+        return Classification(best, scores[best], scores)
+
+
+class Routing(NamedTuple):
+    """Décision d'aiguillage d'un document, restituée dans le résultat"""
+    pipeline: DocumentPipeline
+    classification: Classification
+    source: str
+    seconds: float
+    # Durée d'obtention du texte classé (lecture de la couche texte), en plus du classement lui-même;
+    # nulle quand le texte est celui de l'OCR de la première page, lue de toute façon
+    sample_seconds: float = 0.0
+
+    def report(self) -> Dict:
+        """Type retenu, origine du texte classé, coût du classement et travail évité"""
+        pipeline = self.pipeline
+        skipped: List[str] = [f"champ {field}" for field in FIELDS if field not in pipeline.fields]
+        # Page scannée classée d'après son OCR : elle a été lue avec les réglages génériques
+        pages = " (pages suivantes)" if self.source == SOURCE_FIRST_PAGE_OCR else ""
+        if not pipeline.templates:
+            skipped.append(f"gabarits{pages}")
+        if not pipeline.reocr:
+            skipped.append(f"relecture{pages}")
+        return {
+            'type': pipeline.name,
+            'label': pipeline.label,
+            'score': self.classification.score,
+            'scores': self.classification.scores,
+            'source': self.source,
+            'classify_ms': round(self.seconds * 1000, 3),
+            'sample_ms': round(self.sample_seconds * 1000, 3),
+            'routing_ms': round((self.seconds + self.sample_seconds) * 1000, 3),
+            'psm': pipeline.psm,
+            'skipped': skipped,
+        }
+
+
+def route(classifier: DocumentClassifier, text: str, source: str, sample_seconds: float = 0.0) -> Routing:
+    """Classe ``text`` et retourne le pipeline du type retenu"""
+    start = time.perf_counter()
+    classification = classifier.classify(text)
+    return Routing(PIPELINES[classification.type], classification, source, time.perf_counter() - start,
+                   sample_seconds)
+
+
+def default_routing(source: str = SOURCE_DEFAULT) -> Routing:
+    """Aiguillage vers le traitement générique (classement désactivé ou impossible)"""
+    return Routing(PIPELINES[GENERIC], Classification(GENERIC, 0, {}), source, 0.0)
@@ -0,0 +1,117 @@
+"""Moteur d'extraction des champs structurés à partir du texte OCR"""
+
+import re
+from typing import Dict, Optional, Pattern, Tuple
+
+# À incrémenter à chaque modification des patterns d'extraction (ici, dans layout_extraction.py ou document_types.py)
+RULES_VERSION = "4"
+
+# Ordre des champs dans les données retournées
+FIELDS = (
+    'numero_reference',
+    'nom',
+    'prenom',
+    'date',
+    'montant',
+    'numero_siret',
+    'adresse',
+    'telephone',
+    'email',
+)
+
+# Patterns de reconnaissance, compilés une seule fois au chargement du module
+_FLAGS = re.IGNORECASE | re.MULTILINE
+FIELD_PATTERNS: Dict[str, Pattern] = {
+    'numero_reference': re.compile(r'(?:ref|référence|numéro|n°)\s*:?\s*([A-Z0-9\-]+)', _FLAGS),
+    'nom': re.compile(r'(?:nom|famille)\s*:?\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', _FLAGS),
+    'prenom': re.compile(r'(?:prénom|prenom)\s*:?\s*([A-Z][a-z]+)', _FLAGS),
+    'date': re.compile(r'(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})', _FLAGS),
+    'montant': re.compile(r'(\d+(?:\s?\d{3})*(?:[,\.]\d{2})?)\s*€?', _FLAGS),
+    'numero_siret': re.compile(r'(?:siret|siren)\s*:?\s*(\d{14})', _FLAGS),
+    'telephone': re.compile(r'(?:tél|téléphone|tel)\s*:?\s*(\d{2}(?:\s?\d{2}){4})', _FLAGS),
+    'email': re.compile(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', _FLAGS),
+    'adresse': re.compile(r'(?:adresse)\s*:?\s*([0-9]+[^0-9\n]+(?:\n[^0-9\n]+)*)', _FLAGS),
+}
+
+# Libellés dont au moins un doit apparaître (en minuscules) pour qu'un champ puisse correspondre.
+# Un simple test de sous-chaîne évite de parcourir le texte avec la regex quand le libellé est absent.
+FIELD_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'numero_reference': ('ref', 'référence', 'numéro', 'n°'),
+    'nom': ('nom', 'famille'),
+    'prenom': ('prénom', 'prenom'),
+    'numero_siret': ('siret', 'siren'),
+    'telephone': ('tél', 'tel'),
+    'email': ('@',),
+    'adresse': ('adresse',),
+}
+
+
+class FieldExtractor:
+    """Extraction des champs avec patterns précompilés et arrêt à la première occurrence"""
+
+    def __init__(self, patterns: Optional[Dict[str, Pattern]] = None,
+                 keywords: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.patterns = FIELD_PATTERNS if patterns is None else patterns
+        self.keywords = FIELD_KEYWORDS if keywords is None else keywords
+
+    def empty_result(self) -> Dict:
+        """Dictionnaire de résultat avec tous les champs à None"""
+        return dict.fromkeys(FIELDS)
+
+    def extract(self, text: str, data: Optional[Dict] = None) -> Dict:
+        """Extrait les champs du texte; les champs déjà renseignés dans ``data`` sont ignorés"""
+        if data is None:
+            data = self.empty_result()
+        lowered = None
+        for field, pattern in self.patterns.items():
+            if data.get(field):
+                continue
+            labels = self.keywords.get(field)
+            if labels:
+                if lowered is None:
+                    lowered = text.lower()
+                if not any(label in lowered for label in labels):
+                    continue
+            # search() s'arrête à la première occurrence, seule utilisée
+            match = pattern.search(text)
+            if match:
+                data[field] = match.group(1).strip()
+        return data
+
+    def incremental(self, overlap: int = 256) -> "IncrementalExtraction":
+        """Crée une extraction alimentée page par page"""
+        return IncrementalExtraction(self, overlap)
+
+
+class IncrementalExtraction:
+    """Extraction incrémentale : chaque page ne complète que les champs encore manquants.
+
+    La fin de la page précédente (``overlap`` caractères) est rejouée avec la
+    page suivante pour ne pas perdre une valeur coupée par un saut de page.
+    """
+
+    def __init__(self, extractor: FieldExtractor, overlap: int = 256):
+        self.extractor = extractor
+        self.overlap = overlap
+        self.data = extractor.empty_result()
+        self._tail = ""
+
+    @property
+    def complete(self) -> bool:
+        """Vrai lorsque tous les champs du schéma sont renseignés"""
+        return all(self.data.get(field) for field in self.extractor.patterns)
+
+    def feed(self, text: str, found: Optional[Dict] = None) -> Dict:
+        """Ajoute le texte d'une page et retourne les données à jour.
+
+        ``found`` : champs déjà identifiés sur la page (par la mise en page), prioritaires
+        sur les patterns pour les champs encore manquants.
+        """
+        if found:
+            for field, value in found.items():
+                if value and not self.data.get(field):
+                    self.data[field] = value
+        chunk = self._tail + text
+        self.extractor.extract(chunk, self.data)
+        self._tail = chunk[-self.overlap:] if self.overlap else ""
+        return self.data
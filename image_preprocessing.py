@@ -0,0 +1,211 @@
+"""Prétraitement des images avant OCR (NumPy) : niveaux de gris, résolution, redressement, binarisation"""
+
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Largeur d'une page A4 en pouces, pour estimer la résolution d'une image sans métadonnées DPI
+A4_LONG_SIDE_INCHES = 11.69
+
+# Poids ITU-R BT.601 pour la conversion en niveaux de gris, en 1/256 (uint16)
+_LUMA = (77, 150, 29)
+
+
+def source_dpi(image: Image.Image) -> float:
+    """Résolution déclarée dans les métadonnées, ou estimée pour une page A4"""
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > 1:
+        return float(dpi[0])
+    return max(image.size) / A4_LONG_SIDE_INCHES
+
+
+class ImagePreprocessor:
+    """Chaîne de prétraitement configurable; chaque étape peut être désactivée.
+
+    Ordre : normalisation de la résolution (pour réduire tôt le nombre de
+    pixels), niveaux de gris, redressement, puis binarisation adaptative.
+    Sans niveaux de gris, l'image garde ses couleurs : l'inclinaison est estimée
+    sur une copie en niveaux de gris. La binarisation produit une image à un
+    seul canal : elle implique la conversion en niveaux de gris.
+    """
+
+    STEPS = ('resample', 'grayscale', 'deskew', 'binarize')
+
+    def __init__(self, grayscale: bool = True, resample: bool = True, deskew: bool = True,
+                 binarize: bool = True, target_dpi: int = 300, max_upscale: float = 2.0,
+                 max_skew_degrees: float = 5.0, skew_step_degrees: float = 0.25,
+                 block_size: int = 31, threshold_ratio: float = 0.15, max_pixels: Optional[int] = None):
+        self.grayscale = grayscale
+        self.resample = resample
+        self.deskew = deskew
+        self.binarize = binarize
+        self.target_dpi = target_dpi
+        self.max_upscale = max_upscale
+        self.max_skew_degrees = max_skew_degrees
+        self.skew_step_degrees = skew_step_degrees
+        self.block_size = block_size
+        self.threshold_ratio = threshold_ratio
+        # Pas d'agrandissement au-delà de ce nombre de pixels (None : pas de plafond)
+        self.max_pixels = max_pixels
+
+    @classmethod
+    def from_steps(cls, steps, **kwargs) -> "ImagePreprocessor":
+        """Construit un préprocesseur n'activant que les étapes listées"""
+        enabled = set(steps)
+        unknown = enabled - set(cls.STEPS)
+        if unknown:
+            raise ValueError(f"Étapes de prétraitement inconnues : {', '.join(sorted(unknown))}")
+        return cls(**{step: step in enabled for step in cls.STEPS}, **kwargs)
+
+    @property
+    def signature(self) -> str:
+        """Paramètres qui influent sur l'image produite (utilisés dans la clé de cache)"""
+        steps = "+".join(step for step in self.STEPS if getattr(self, step)
+                         or (step == 'grayscale' and self.binarize)) or "none"
+        return f"{steps}@{self.target_dpi}dpi"
+
+    def to_grayscale(self, image: Image.Image) -> np.ndarray:
+        """Convertit l'image en tableau uint8 niveaux de gris (luminance en arithmétique entière)"""
+        if image.mode == "L":
+            return np.asarray(image)
+        if image.mode not in ("RGB", "RGBA", "RGBX", "P", "CMYK", "YCbCr"):
+            return np.asarray(image.convert("L"))
+        rgb = np.asarray(image.convert("RGB"))
+        luma = rgb[..., 0].astype(np.uint16) * _LUMA[0]
+        luma += rgb[..., 1].astype(np.uint16) * _LUMA[1]
+        luma += rgb[..., 2].astype(np.uint16) * _LUMA[2]
+        return (luma >> 8).astype(np.uint8)
+
+    def resample_to_dpi(self, image: Image.Image, source_dpi: float) -> Image.Image:
+        """Ramène l'image à la résolution cible (agrandissement limité à ``max_upscale``)"""
+        scale = min(self.target_dpi / source_dpi, self.max_upscale)
+        if self.max_pixels and scale > 1:
+            scale = max(1.0, min(scale, math.sqrt(self.max_pixels / (image.width * image.height))))
+        if abs(scale - 1.0) < 0.05:
+            return image
+        if image.mode in ("1", "P"):
+            image = image.convert("L" if image.mode == "1" else "RGB")
+        width, height = image.size
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        resample = Image.BOX if scale < 1 else Image.BICUBIC
+        return image.resize(size, resample)
+
+    def estimate_skew(self, gray: np.ndarray) -> float:
+        """Estime l'inclinaison (en degrés) par maximisation du profil de projection horizontal"""
+        # Sous-échantillonnage : quelques centaines de milliers de pixels suffisent
+        stride = max(1, int(math.ceil(max(gray.shape) / 1000)))
+        small = gray[::stride, ::stride]
+        ys, xs = np.nonzero(small < small.mean() - small.std())
+        if len(xs) < 100:
+            return 0.0
+        xs = xs.astype(np.float32)
+        ys = ys.astype(np.float32)
+        angles = np.arange(-self.max_skew_degrees, self.max_skew_degrees + 1e-9, self.skew_step_degrees)
+        best_angle, best_score = 0.0, -1.0
+        for angle in angles:
+            rows = np.round(ys - xs * math.tan(math.radians(angle))).astype(np.int64)
+            profile = np.bincount(rows - rows.min()).astype(np.float64)
+            # Des lignes de texte alignées donnent un profil très contrasté
+            score = float(np.square(np.diff(profile)).sum())
+            if score > best_score:
+                best_angle, best_score = float(angle), score
+        return best_angle
+
+    def rotate(self, gray: np.ndarray, angle: float) -> np.ndarray:
+        """Applique la rotation de redressement sur fond blanc"""
+        if abs(angle) < self.skew_step_degrees / 2:
+            return gray
+        rotated = Image.fromarray(gray).rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+        return np.asarray(rotated)
+
+    def rotate_image(self, image: Image.Image, angle: float) -> Image.Image:
+        """Rotation de redressement d'une image en couleurs, sur fond blanc"""
+        if abs(angle) < self.skew_step_degrees / 2:
+            return image
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        white = 255 if image.mode == "L" else (255, 255, 255)
+        return image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=white)
+
+    def adaptive_threshold(self, gray: np.ndarray) -> np.ndarray:
+        """Binarisation par moyenne locale (Bradley-Roth), somme de fenêtre séparable par cumuls"""
+        height, width = gray.shape
+        half = self.block_size // 2
+        span = 2 * half + 1
+
+        # Somme verticale puis horizontale; le remplissage par bord tronque les fenêtres aux limites
+        cumulative = np.zeros((height + 1, width), dtype=np.int32)
+        np.cumsum(gray, axis=0, dtype=np.int32, out=cumulative[1:])
+        cumulative = np.pad(cumulative, ((half, half), (0, 0)), mode="edge")
+        rows = cumulative[span:span + height] - cumulative[:height]
+        cumulative = np.zeros((height, width + 1), dtype=np.int32)
+        np.cumsum(rows, axis=1, dtype=np.int32, out=cumulative[:, 1:])
+        del rows
+        cumulative = np.pad(cumulative, ((0, 0), (half, half)), mode="edge")
+        sums = cumulative[:, span:span + width] - cumulative[:, :width]
+        del cumulative
+
+        # Nombre de pixels de chaque fenêtre (plus petit près des bords)
+        rows_in = np.minimum(np.arange(height) + half + 1, height) - np.maximum(np.arange(height) - half, 0)
+        cols_in = np.minimum(np.arange(width) + half + 1, width) - np.maximum(np.arange(width) - half, 0)
+        counts = rows_in.astype(np.int32)[:, None] * cols_in.astype(np.int32)[None, :]
+        # Pixel blanc sauf s'il est nettement plus sombre que la moyenne de son voisinage
+        light = gray * counts * 100 > sums * int(100 * (1 - self.threshold_ratio))
+        return light.astype(np.uint8) * 255
+
+    def process(self, image: Image.Image) -> Tuple[Image.Image, Dict[str, float]]:
+        """Applique les étapes actives; retourne l'image, les durées par étape (ms) et l'angle corrigé"""
+        timings: Dict[str, float] = {}
+
+        def timed(step, func, *args):
+            start = time.perf_counter()
+            result = func(*args)
+            timings[f"{step}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return result
+
+        if not any(getattr(self, step) for step in self.STEPS):
+            return image, timings
+
+        original_dpi = source_dpi(image)
+        dpi = original_dpi
+        # Rééchantillonnage en premier : les étapes suivantes traitent moins de pixels
+        if self.resample:
+            resampled = timed('resample', self.resample_to_dpi, image, original_dpi)
+            # Résolution obtenue : la cible (à la tolérance près), sauf agrandissement plafonné
+            dpi = original_dpi * resampled.width / image.width
+            if abs(dpi / self.target_dpi - 1.0) < 0.05:
+                dpi = self.target_dpi
+            image = resampled
+        if self.grayscale or self.binarize:
+            # Les étapes NumPy travaillent sur un seul canal
+            array = timed('grayscale', self.to_grayscale, image)
+            if self.deskew:
+                angle = timed('deskew_estimate', self.estimate_skew, array)
+                array = timed('deskew', self.rotate, array, angle)
+                timings['skew_degrees'] = angle
+            if self.binarize:
+                array = timed('binarize', self.adaptive_threshold, array)
+            output = Image.fromarray(array)
+        else:
+            output = image
+            if self.deskew:
+                angle = timed('deskew_estimate', self.estimate_skew, self.to_grayscale(image))
+                output = timed('deskew', self.rotate_image, image, angle)
+                timings['skew_degrees'] = angle
+            if output is image:
+                output = image.copy()
+        output.info["dpi"] = (dpi, dpi)
+        return output, timings
+
+
+def create_preprocessor(steps: Optional[str] = "all", **kwargs) -> Optional[ImagePreprocessor]:
+    """Préprocesseur à partir d'une liste d'étapes séparées par des virgules (``none`` pour aucun);
+    ``kwargs`` sont passés au constructeur"""
+    if steps in (None, "", "none"):
+        return None
+    if steps == "all":
+        return ImagePreprocessor(**kwargs)
+    return ImagePreprocessor.from_steps((step.strip() for step in steps.split(",")), **kwargs)
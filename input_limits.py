@@ -0,0 +1,123 @@
+"""Budgets des documents reçus : octets, pages et pixels, contrôlés avant le décodage complet.
+
+Les dimensions d'une image et le nombre de trames d'un TIFF sont lus dans les
+en-têtes (``Image.open`` ne décode pas les pixels), le nombre de pages d'un PDF
+sans rendu. Un document hors budget est refusé aussitôt (``InputRejected``)
+avec un message explicite. Une image plus résolue que nécessaire est décodée
+en mode brouillon (JPEG : réduction pendant la décompression) puis ramenée à la
+résolution de l'OCR; une page PDF trop grande est rendue à une résolution
+abaissée. Mémoire et durée de traitement d'un document restent ainsi bornées.
+
+Budgets par défaut, modifiables par variables d'environnement :
+    OCR_MAX_INPUT_BYTES   taille du fichier (50 Mo)
+    OCR_MAX_PAGES         pages d'un PDF ou trames d'un TIFF (300)
+    OCR_MAX_PIXELS        pixels décodés d'une page (40 millions, soit un A4 à 600 DPI)
+"""
+
+import math
+import os
+import warnings
+from typing import BinaryIO, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+from image_preprocessing import source_dpi
+
+MAX_INPUT_BYTES = int(os.environ.get("OCR_MAX_INPUT_BYTES", str(50 * 1024 * 1024)))
+MAX_PAGES = int(os.environ.get("OCR_MAX_PAGES", "300"))
+MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", str(40_000_000)))
+# Résolution de l'OCR, vers laquelle les images plus résolues sont réduites
+TARGET_DPI = 300
+# Écart de résolution en dessous duquel une image est gardée telle quelle
+DOWNSAMPLE_TOLERANCE = 0.05
+
+
+class InputRejected(Exception):
+    """Document refusé avant traitement : hors des budgets d'octets, de pages ou de pixels"""
+
+
+class InputLimits(NamedTuple):
+    """Budgets d'un document : taille du fichier, pages (ou trames) et pixels décodés par page"""
+    max_bytes: int = MAX_INPUT_BYTES
+    max_pages: int = MAX_PAGES
+    max_pixels: int = MAX_PIXELS
+
+    def check_bytes(self, size: int):
+        if size > self.max_bytes:
+            raise InputRejected(f"Fichier trop volumineux : {size / 2 ** 20:.1f} Mo "
+                                f"(limite : {self.max_bytes / 2 ** 20:.0f} Mo)")
+
+    def check_pages(self, count: int):
+        if count > self.max_pages:
+            raise InputRejected(f"Document trop long : {count} pages (limite : {self.max_pages})")
+
+    def check_pixels(self, size: Tuple[int, int], page: Optional[int] = None):
+        width, height = size
+        if width * height > self.max_pixels:
+            where = f" (page {page})" if page is not None else ""
+            raise InputRejected(f"Image trop grande{where} : {width} x {height} pixels, soit "
+                                f"{width * height / 1e6:.0f} Mpx (limite : {self.max_pixels / 1e6:.0f} Mpx). "
+                                "Numérisez le document à une résolution plus basse")
+
+    def fit_dpi(self, width_in: float, height_in: float, dpi: int) -> int:
+        """Résolution de rendu d'une page de ``width_in`` x ``height_in`` pouces, abaissée
+        si la page rendue à ``dpi`` dépasserait le budget de pixels"""
+        pixels = width_in * height_in * dpi * dpi
+        if pixels <= self.max_pixels:
+            return dpi
+        return max(1, math.floor(dpi * math.sqrt(self.max_pixels / pixels)))
+
+
+DEFAULT_LIMITS = InputLimits()
+
+
+def downsample(image: Image.Image, target_dpi: float = TARGET_DPI) -> Image.Image:
+    """Ramène une image décodée à ``target_dpi`` si elle est plus résolue (jamais d'agrandissement)"""
+    scale = target_dpi / source_dpi(image)
+    if scale >= 1 - DOWNSAMPLE_TOLERANCE:
+        return image
+    if image.mode in ("1", "P"):
+        image = image.convert("L" if image.mode == "1" else "RGB")
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    # reducing_gap : réduction entière rapide (reduce) avant le rééchantillonnage final
+    resized = image.resize(size, Image.BOX, reducing_gap=2.0)
+    resized.info["dpi"] = (target_dpi, target_dpi)
+    return resized
+
+
+def open_image(source: Union[str, BinaryIO], limits: InputLimits = DEFAULT_LIMITS,
+               target_dpi: float = TARGET_DPI) -> Image.Image:
+    """Ouvre une image dans les budgets ``limits``.
+
+    Image simple : décodée (en mode brouillon si possible) puis ramenée à ``target_dpi``.
+    Image multipage : les dimensions de toutes les trames sont contrôlées sur leurs
+    en-têtes, sans décodage; les trames sont décodées une à une par l'OCR (voir
+    ``OCRProcessor.decode_frame``).
+    """
+    try:
+        with warnings.catch_warnings():
+            # Le budget de pixels remplace l'avertissement de Pillow au-delà de 89 Mpx; son refus
+            # au-delà de 179 Mpx (DecompressionBombError) reste une dernière protection
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            image = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise InputRejected(f"Image trop grande, refusée avant décodage : {e}") from e
+    frames = getattr(image, "n_frames", 1)
+    limits.check_pages(frames)
+    if frames > 1:
+        for number in range(frames):
+            image.seek(number)
+            limits.check_pixels(image.size, number + 1)
+        image.seek(0)
+        return image
+
+    width = image.width
+    dpi = source_dpi(image)
+    scale = target_dpi / dpi
+    if scale < 1 - DOWNSAMPLE_TOLERANCE:
+        # JPEG : décompression directement à 1/2, 1/4 ou 1/8 de la taille (au moins la taille visée)
+        if image.draft(image.mode, (math.ceil(image.width * scale), math.ceil(image.height * scale))):
+            image.info["dpi"] = (dpi * image.width / width,) * 2
+    limits.check_pixels(image.size)
+    image.load()
+    return downsample(image, target_dpi)
@@ -1,18 +1,24 @@
 import streamlit as st
-import pytesseract
-from PIL import Image
-import pandas as pd
 import json
-import re
 from datetime import datetime
-import io
-import base64
-import pymupdf as fitz
-import numpy as np
-from typing import Dict, List, Optional, Tuple
+import os
 import time
-import plotly.graph_objects as go
-import plotly.express as px
+from typing import Dict, List, Optional
+from ocr_cache import OCRResultCache, make_cache_key
+from result_store import ResultStore, make_record
+from result_export import FORMAT_JSONL, FORMAT_PARQUET, export_documents
+from upload_buffer import UploadBuffer
+from document_preview import PreviewCache, render_preview
+from pipeline_metrics import (
+    METRICS, STAGE_UI_PREVIEW, STAGE_UI_QUALITY, STAGE_UI_RUN, STAGE_UI_WORKFLOW,
+    create_profiler, start_metrics_server
+)
+from pipeline_events import (
+    STAGE_DONE, STAGE_EXTRACTION, STAGE_LOAD, STAGE_PAGE, STAGE_PREPROCESSING
+)
+
+# Les modules lourds (PyMuPDF, Tesseract, NumPy, Pillow, Plotly, Pandas) sont importés
+# à la demande, uniquement sur les chemins qui en ont besoin.
 
 # Configuration de la page
 st.set_page_config(
@@ -171,73 +177,354 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class OCRProcessor:
-    """Classe pour traiter l'OCR et l'extraction de données"""
+@st.cache_resource
+def get_ocr_processor():
+    """Processeur OCR (moteurs Tesseract compris) partagé par toutes les sessions du serveur"""
+    from ocr_processor import OCRProcessor
+    return OCRProcessor(profiler=get_profiler())
+
+@st.cache_resource
+def get_job_queue():
+    """File de traitements en arrière-plan partagée par toutes les sessions du serveur"""
+    from job_queue import JobQueue
+    return JobQueue(get_ocr_processor(), workers=int(os.environ.get("OCR_JOB_WORKERS", "2")),
+                    max_pending=int(os.environ.get("OCR_JOB_MAX_PENDING", "8")),
+                    result_cache=get_result_cache())
+
+@st.cache_resource
+def get_preview_cache() -> PreviewCache:
+    """Miniatures d'aperçu par empreinte de contenu, partagées par toutes les sessions du serveur"""
+    return PreviewCache()
+
+def show_preview(upload: UploadBuffer):
+    """Aperçu en miniatures (première page, ou premières pages d'un document multipage)"""
+    def render():
+        # Budgets et résolution du processeur : l'aperçu accepte et réduit le document comme l'OCR
+        ocr_processor = get_ocr_processor()
+        return render_preview(upload.document(ocr_processor.limits, ocr_processor.ocr_dpi), upload.is_pdf)
     
-    def __init__(self):
-        self.supported_formats = ['.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp']
-        
-    def extract_text_from_pdf(self, pdf_bytes: bytes) -> str:
-        """Extrait le texte d'un PDF"""
-        try:
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            return text
-        except Exception as e:
-            st.error(f"Erreur lors de l'extraction PDF: {str(e)}")
-            return ""
-    
-    def extract_text_from_image(self, image: Image.Image) -> str:
-        """Extrait le texte d'une image avec Tesseract"""
-        try:
-            # Configuration OCR pour le français
-            config = r'--oem 3 --psm 6 -l fra'
-            text = pytesseract.image_to_string(image, config=config)
-            return text
-        except Exception as e:
-            st.error(f"Erreur OCR: {str(e)}")
-            return ""
-    
-    def extract_structured_data(self, text: str) -> Dict:
-        """Extrait les données structurées du texte"""
-        data = {
-            'numero_reference': None,
-            'nom': None,
-            'prenom': None,
-            'date': None,
-            'montant': None,
-            'numero_siret': None,
-            'adresse': None,
-            'telephone': None,
-            'email': None
-        }
-        
-        # Patterns de reconnaissance
-        patterns = {
-            'numero_reference': r'(?:ref|référence|numéro|n°)\s*:?\s*([A-Z0-9\-]+)',
-            'nom': r'(?:nom|famille)\s*:?\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-            'prenom': r'(?:prénom|prenom)\s*:?\s*([A-Z][a-z]+)',
-            'date': r'(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-            'montant': r'(\d+(?:\s?\d{3})*(?:[,\.]\d{2})?)\s*€?',
-            'numero_siret': r'(?:siret|siren)\s*:?\s*(\d{14})',
-            'telephone': r'(?:tél|téléphone|tel)\s*:?\s*(\d{2}(?:\s?\d{2}){4})',
-            'email': r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-            'adresse': r'(?:adresse)\s*:?\s*([0-9]+[^0-9\n]+(?:\n[^0-9\n]+)*)'
-        }
-        
-        # Extraction avec regex
-        for field, pattern in patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if matches:
-                data[field] = matches[0].strip()
-        
-        return data
+    preview = get_preview_cache().get_or_render(upload.digest, render)
+    thumbnails = preview.thumbnails
+    st.markdown('<div style="border: 1px solid #e0e0e0; border-radius: 8px; padding: 1rem; background: white;">', unsafe_allow_html=True)
+    if len(thumbnails) == 1:
+        caption = "Aperçu du PDF (Page 1)" if upload.is_pdf else "Aperçu du document"
+        st.image(thumbnails[0].data, caption=caption, use_column_width=True)
+    else:
+        for column, thumbnail in zip(st.columns(len(thumbnails)), thumbnails):
+            with column:
+                st.image(thumbnail.data, caption=f"Page {thumbnail.page}", use_column_width=True)
+    if preview.page_count > len(thumbnails):
+        st.caption(f"… et {preview.page_count - len(thumbnails)} autre(s) page(s) ({preview.page_count} au total)")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def get_upload_buffer(uploaded_file) -> Optional[UploadBuffer]:
+    """Tampon du fichier téléversé, lu une fois et conservé entre reruns tant que le fichier ne change pas"""
+    if uploaded_file is None:
+        st.session_state.pop('upload_buffer', None)
+        return None
+    cached = st.session_state.get('upload_buffer')
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = (uploaded_file.file_id, UploadBuffer(uploaded_file, uploaded_file.name))
+        st.session_state.upload_buffer = cached
+    return cached[1]
+
+# Intervalle de rafraîchissement de l'avancement d'un job (secondes)
+JOB_POLL_INTERVAL_S = 0.5
+
+# Origine du texte classé, telle qu'affichée
+ROUTING_SOURCES = {'texte_natif': "texte natif", 'ocr_page_1': "OCR de la page 1", 'texte': "texte", 'defaut': "par défaut"}
+
+def show_routing(document_type: Optional[Dict], template: Optional[str] = None):
+    """Affiche le type de document retenu, le travail évité et le gabarit reconnu"""
+    if document_type:
+        source = ROUTING_SOURCES.get(document_type['source'], document_type['source'])
+        # Coût complet : obtention du texte classé et classement
+        routing_ms = document_type.get('routing_ms', document_type['classify_ms'] + document_type.get('sample_ms', 0.0))
+        caption = (f"🗂️ Type de document : {document_type['label']} ({source}, "
+                   f"aiguillé en {routing_ms:.2f} ms)")
+        if document_type['skipped']:
+            caption += f" — ignoré : {', '.join(document_type['skipped'])}"
+        st.caption(caption)
+    if template:
+        st.caption(f"📐 Formulaire reconnu : {template} (lecture par zones du gabarit)")
+
+def store_result(result: Dict):
+    """Place un résultat de traitement dans la session et affiche ses indicateurs"""
+    confidence = result.get('confidence')
+    st.session_state.extracted_text = result['text']
+    st.session_state.extracted_data = result['data']
+    st.session_state.extraction_confidence = confidence
+    st.session_state.extraction_located = result.get('located')
+    st.session_state.extraction_document_type = result.get('document_type')
+    show_routing(result.get('document_type'), result.get('template'))
+    if confidence and confidence['reocr_regions']:
+        st.caption(f"🔍 {confidence['reocr_regions']} zone(s) peu lisible(s) relue(s) à plus forte résolution")
+    if 'pages_read' in result:
+        st.caption(f"📄 {result['pages_read']} page(s) lue(s) pour l'extraction")
+    if result.get('preprocessing'):
+        steps = [f"{k[:-3]} {v:.0f} ms" for k, v in result['preprocessing'].items() if k.endswith('_ms')]
+        st.caption(f"🧪 Prétraitement : {', '.join(steps)} (inclinaison corrigée : {result['preprocessing'].get('skew_degrees', 0):.2f}°)")
+
+def forget_job():
+    """Oublie le job suivi par la session (et son identifiant dans l'URL)"""
+    st.session_state.pop('ocr_job', None)
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+def show_job_status(job_id: str, has_upload: bool):
+    """Affiche l'avancement d'un job en arrière-plan et récupère son résultat une fois terminé"""
+    from job_queue import FINISHED_STATES, JOB_DONE, JOB_QUEUED
+    
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        st.warning("Traitement introuvable (expiré ou supprimé)")
+        forget_job()
+        return
+    
+    if job['state'] not in FINISHED_STATES:
+        st.progress(int(job['progress'] * 100), text=f"{job['filename']} : {job['message']}")
+        if job.get('stage') in PROGRESS_STATUS_HTML:
+            st.markdown(PROGRESS_STATUS_HTML[job['stage']], unsafe_allow_html=True)
+        if job['state'] == JOB_QUEUED:
+            st.caption(f"⏳ En file d'attente ({job_queue.stats()['queued']} document(s) en attente)")
+        # Le script se relance jusqu'à la fin du job; l'identifiant est dans l'URL en cas de reconnexion
+        time.sleep(JOB_POLL_INTERVAL_S)
+        st.rerun()
+    
+    forget_job()
+    if job['state'] == JOB_DONE:
+        store_result(job['result'])
+        if not has_upload:
+            st.success(f"✅ Résultat de « {job['filename']} » récupéré")
+            st.json(job['result']['data'])
+    else:
+        st.error(job.get('error', "Traitement en échec"))
+        st.session_state.extracted_text = ""
+        st.session_state.extracted_data = get_ocr_processor().field_extractor.empty_result()
+        st.session_state.extraction_confidence = None
+
+# Tailles de page proposées pour la grille d'un lot
+BATCH_PAGE_SIZES = [10, 25, 50, 100]
+
+def show_batch(uploaded_files: List):
+    """Traitement par lot : jobs en parallèle borné, grille des résultats au fil de l'eau, enregistrement groupé"""
+    import pandas as pd
+    from document_batch import (
+        COLUMN_CONFIDENCE, COLUMN_ID, COLUMN_VALIDATED, COLUMNS, EDITABLE_COLUMNS, ITEM_DONE, ITEM_FAILED, ITEM_SAVED,
+        DocumentBatch, page_count, page_rows
+    )
+    
+    st.markdown("""
+    <div style="margin: 2rem 0 1.5rem 0;">
+        <h2 style="color: var(--primary-color);">📦 Traitement par lot</h2>
+        <p style="color: #666;">Une ligne par document : corrigez les valeurs, cochez « Validé » puis enregistrez</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Le lot est gardé entre reruns tant que les mêmes fichiers sont téléversés
+    file_ids = tuple(f.file_id for f in uploaded_files)
+    current = st.session_state.get('document_batch')
+    batch = current[1] if current is not None and current[0] == file_ids else None
+    if batch is None:
+        if not st.button(f"🧠 Traiter les {len(uploaded_files)} documents", type="primary", key="batch_button"):
+            return
+        ocr_processor = get_ocr_processor()
+        result_cache = get_result_cache()
+        job_queue = get_job_queue()
+        # Au plus un job par worker pour ce lot : les autres sessions gardent accès à la file
+        batch = DocumentBatch(max_in_flight=job_queue.workers)
+        for uploaded in uploaded_files:
+            upload = UploadBuffer(uploaded, uploaded.name)
+            cache_key = make_cache_key(upload.digest, ocr_processor.cache_signature, ocr_processor.RULES_VERSION)
+            batch.add(upload, cache_key, result_cache.get(cache_key))
+        st.session_state.document_batch = (file_ids, batch)
+    
+    running = batch.advance(get_job_queue())
+    counts = batch.counts()
+    finished = counts[ITEM_DONE] + counts[ITEM_FAILED] + counts[ITEM_SAVED]
+    st.progress(finished / len(batch.items),
+                text=" · ".join(f"{count} {state}" for state, count in counts.items() if count))
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        sort_by = st.selectbox("Trier par", [None] + COLUMNS[1:-1], key="batch_sort",
+                               format_func=lambda column: "Ordre de téléversement" if column is None else column)
+    with col2:
+        descending = st.checkbox("Ordre décroissant", key="batch_descending")
+    with col3:
+        page_size = st.selectbox("Lignes par page", BATCH_PAGE_SIZES, key="batch_page_size")
+    rows = batch.rows(sort_by, descending)
+    pages = page_count(len(rows), page_size)
+    with col4:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="batch_page")
+    
+    page_items = page_rows(rows, min(page, pages), page_size)
+    frame = pd.DataFrame(page_items, columns=COLUMNS)
+    # La grille garde ses corrections par position de ligne : sa clé change avec les documents
+    # affichés et leur ordre (tri, page, valeur corrigée qui déplace une ligne)
+    shown = tuple(row[COLUMN_ID] for row in page_items)
+    edited = st.data_editor(
+        frame, hide_index=True, use_container_width=True,
+        disabled=[column for column in COLUMNS if column not in EDITABLE_COLUMNS],
+        column_config={
+            COLUMN_CONFIDENCE: st.column_config.NumberColumn(format="%.0f"),
+            COLUMN_VALIDATED: st.column_config.CheckboxColumn(),
+        },
+        key=f"batch_grid_{hash(shown)}",
+    )
+    batch.apply_edits(edited.to_dict("records"))
+    
+    failures = [item for item in batch.items if item.state == ITEM_FAILED]
+    if failures:
+        with st.expander(f"⚠️ {len(failures)} document(s) en échec"):
+            for item in failures:
+                st.write(f"**{item.filename}** : {item.error}")
+    
+    validated = len(batch.validated_items())
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button(f"🗄️ Enregistrer les lignes validées ({validated})", key="batch_save", disabled=not validated):
+            written = batch.save(get_result_store(), get_ocr_processor().cache_signature)
+            st.success(f"{written} document(s) enregistré(s) dans la base")
+    with col2:
+        st.download_button("📥 Télécharger la grille (CSV)",
+                           pd.DataFrame(batch.rows(), columns=COLUMNS).to_csv(index=False),
+                           file_name=f"lot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                           mime="text/csv", key="batch_csv")
+    
+    if running:
+        # Les lignes se remplissent au fil des fins de traitement
+        time.sleep(JOB_POLL_INTERVAL_S)
+        st.rerun()
+
+@st.cache_resource
+def get_profiler():
+    """Profils des documents les plus lents (activé par OCR_PROFILE_SLOWEST=N)"""
+    return create_profiler()
 
+@st.cache_resource
+def start_metrics_endpoint() -> Optional[int]:
+    """Expose /metrics au format Prometheus si OCR_METRICS_PORT est défini (une fois par processus)"""
+    port = os.environ.get("OCR_METRICS_PORT")
+    if not port:
+        return None
+    start_metrics_server(int(port))
+    return int(port)
+
+@st.cache_resource
+def get_result_cache() -> OCRResultCache:
+    """Cache de résultats partagé par toutes les sessions du serveur"""
+    return OCRResultCache()
+
+@st.cache_resource
+def get_result_store() -> ResultStore:
+    """Base des extractions validées, partagée par toutes les sessions du serveur"""
+    return ResultStore()
+
+def show_search():
+    """Recherche dans les extractions enregistrées : texte intégral ou champ indexé"""
+    store = get_result_store()
+    st.markdown(f"""
+    <div style="margin: 3rem 0 1.5rem 0;">
+        <h2 style="color: var(--primary-color);">🔎 Rechercher dans les documents enregistrés</h2>
+        <p style="color: #666;">{store.count()} document(s) en base</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    with st.expander("📦 Export en masse"):
+        today = datetime.now().date()
+        period = st.date_input("Documents enregistrés du … au …", (today.replace(day=1), today), key="export_period")
+        fmt = st.radio("Format", [FORMAT_PARQUET, FORMAT_JSONL], horizontal=True, key="export_format")
+        include_text = st.checkbox("Inclure le texte OCR complet", key="export_text")
+        if st.button("Générer l'export", key="export_run") and len(period) == 2:
+            since, until = (day.isoformat() for day in period)
+            path = os.path.join("data", "exports", f"extractions_{since}_{until}.{fmt}")
+            with st.spinner("Export en cours…"):
+                rows = export_documents(store, path, fmt, since, until, include_text)
+            st.success(f"{rows} document(s) exporté(s) dans `{path}`")
+            with open(path, "rb") as f:
+                st.download_button("📥 Télécharger l'export", f, file_name=os.path.basename(path),
+                                   mime="application/octet-stream", key="export_download")
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        mode = st.selectbox("Critère", ["Texte intégral", "SIRET", "Référence", "Date"], key="search_mode")
+    with col2:
+        placeholder = "JJ/MM/AAAA ou JJ/MM/AAAA - JJ/MM/AAAA" if mode == "Date" else ""
+        query = st.text_input("Recherche", key="search_query", placeholder=placeholder)
+    if not query.strip():
+        return
+
+    if mode == "SIRET":
+        results = store.find_by_siret(query)
+    elif mode == "Référence":
+        results = store.find_by_reference(query)
+    elif mode == "Date":
+        start, _, end = query.partition(" - ")
+        results = store.find_by_date(start.strip(), end.strip() or None)
+    else:
+        results = store.search(query)
+
+    if not results:
+        st.info("Aucun document trouvé")
+        return
+    import pandas as pd
+    columns = ['filename', 'updated_at', 'status', 'nom', 'numero_siret', 'numero_reference', 'date', 'montant']
+    if 'snippet' in results[0]:
+        columns.append('snippet')
+    st.dataframe(pd.DataFrame(results)[columns], use_container_width=True, hide_index=True)
+
+# Statut affiché pour chaque étape réelle du traitement
+PROGRESS_STATUS_HTML = {
+    STAGE_LOAD: """
+        <div style="display: flex; align-items: center;">
+            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
+                <path d="M12 2V6" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M12 18V22" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M4.93 4.93L7.76 7.76" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M16.24 16.24L19.07 19.07" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M2 12H6" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M18 12H22" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M4.93 19.07L7.76 16.24" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M16.24 7.76L19.07 4.93" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+            </svg>
+            <p style="margin: 0;">Analyse du document en cours...</p>
+        </div>
+    """,
+    STAGE_PAGE: """
+        <div style="display: flex; align-items: center;">
+            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
+                <path d="M21 15C21 15.5304 20.7893 16.0391 20.4142 16.4142C20.0391 16.7893 19.5304 17 19 17H7L3 21V5C3 4.46957 3.21071 3.96086 3.58579 3.58579C3.96086 3.21071 4.46957 3 5 3H19C19.5304 3 20.0391 3.21071 20.4142 3.58579C20.7893 3.96086 21 4.46957 21 5V15Z" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+            </svg>
+            <p style="margin: 0;">Extraction du texte...</p>
+        </div>
+    """,
+    STAGE_EXTRACTION: """
+        <div style="display: flex; align-items: center;">
+            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
+                <path d="M19 21L12 16L5 21V5C5 4.46957 5.21071 3.96086 5.58579 3.58579C5.96086 3.21071 6.46957 3 7 3H17C17.5304 3 18.0391 3.21071 18.4142 3.58579C18.7893 3.96086 19 4.46957 19 5V21Z" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+            </svg>
+            <p style="margin: 0;">Identification des données structurées...</p>
+        </div>
+    """,
+    STAGE_DONE: """
+        <div style="display: flex; align-items: center;">
+            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
+                <path d="M22 11.08V12C21.9988 14.1564 21.3005 16.2547 20.0093 17.9818C18.7182 19.709 16.9033 20.9725 14.8354 21.5839C12.7674 22.1953 10.5573 22.1219 8.53447 21.3746C6.51168 20.6273 4.78465 19.2461 3.61096 17.4371C2.43727 15.628 1.87979 13.4881 2.02168 11.3363C2.16356 9.18455 2.99721 7.13631 4.39828 5.49706C5.79935 3.85781 7.69279 2.71537 9.79619 2.24013C11.8996 1.7649 14.1003 1.98232 16.07 2.86" stroke="#4caf50" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+                <path d="M22 4L12 14.01L9 11.01" stroke="#4caf50" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
+            </svg>
+            <p style="margin: 0; color: #4caf50; font-weight: 500;">Traitement terminé avec succès!</p>
+        </div>
+    """,
+}
+PROGRESS_STATUS_HTML[STAGE_PREPROCESSING] = PROGRESS_STATUS_HTML[STAGE_LOAD]
+
+@st.cache_resource
 def create_workflow_visualization():
-    """Crée une visualisation du workflow"""
+    """Crée une visualisation du workflow (construite une seule fois par processus)"""
+    import plotly.graph_objects as go
+    
     fig = go.Figure()
     
     # Étapes du workflow
@@ -334,7 +621,7 @@ def main():
             st.write("""
             - Documents PDF
             - Images (PNG, JPG, JPEG)
-            - Formats haute résolution (TIFF, BMP)
+            - Formats haute résolution (TIFF multipage, BMP)
             """)
         
         with st.expander("🎯 Données extraites"):
@@ -347,6 +634,40 @@ def main():
             - Coordonnées complètes
             """)
         
+        with st.expander("🗄️ Cache OCR"):
+            cache_stats = get_result_cache().stats()
+            st.write(f"**Succès :** {cache_stats['hits']}")
+            st.write(f"**Échecs :** {cache_stats['misses']}")
+            st.write(f"**Taux de succès :** {cache_stats['hit_rate']:.0%}")
+            st.write(f"**Entrées :** {cache_stats['entries']} ({cache_stats['size_bytes'] / 1024:.1f} KB)")
+        
+        with st.expander("⏱️ Mesures du pipeline"):
+            snapshot = METRICS.snapshot()
+            if snapshot:
+                st.table([{
+                    'Étape': stage,
+                    'Appels': stats['count'],
+                    'Erreurs': stats['errors'],
+                    'Moy. (ms)': f"{stats['mean_ms']:.1f}",
+                    'p95 ≤ (ms)': f"{stats['p95_ms']:.0f}",
+                    'Mo': f"{stats['bytes'] / 2 ** 20:.1f}",
+                } for stage, stats in snapshot.items()])
+            else:
+                st.caption("Aucune mesure pour le moment")
+            st.download_button("📥 Exporter (Prometheus)", METRICS.render_prometheus(),
+                               file_name="ocr_metrics.prom", mime="text/plain")
+            metrics_port = start_metrics_endpoint()
+            if metrics_port:
+                st.caption(f"Exposé sur le port {metrics_port} (/metrics)")
+            
+            profiler = get_profiler()
+            profiles = profiler.entries() if profiler else []
+            if profiles:
+                labels = [f"{p['label']} ({p['seconds']:.2f} s)" for p in profiles]
+                selected = st.selectbox("Documents les plus lents", range(len(profiles)),
+                                        format_func=labels.__getitem__)
+                st.code(profiles[selected]['stats'], language=None)
+        
         st.markdown("---")
         st.markdown("""
         <div style="text-align: center; color: #666; font-size: 0.9rem; margin-top: 2rem;">
@@ -356,10 +677,8 @@ def main():
         """, unsafe_allow_html=True)
     
     # Workflow visualization
-    st.plotly_chart(create_workflow_visualization(), use_container_width=True)
-    
-    # Initialisation du processeur OCR
-    ocr_processor = OCRProcessor()
+    with METRICS.time(STAGE_UI_WORKFLOW):
+        st.plotly_chart(create_workflow_visualization(), use_container_width=True)
     
     # Section de téléversement améliorée
     st.markdown("""
@@ -374,12 +693,15 @@ def main():
     with col1:
         with st.container():
             st.markdown('<div class="upload-box">', unsafe_allow_html=True)
-            uploaded_file = st.file_uploader(
-                "Glissez-déposez un fichier ou cliquez pour parcourir",
+            uploaded_files = st.file_uploader(
+                "Glissez-déposez un ou plusieurs fichiers ou cliquez pour parcourir",
                 type=['pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'],
-                help="Formats supportés : PDF, PNG, JPG, JPEG, TIFF, BMP",
+                accept_multiple_files=True,
+                help="Formats supportés : PDF, PNG, JPG, JPEG, TIFF, BMP. Plusieurs fichiers : traitement par lot",
                 label_visibility="collapsed"
-            )
+            ) or []
+            # Un seul fichier : aperçu et validation détaillés; plusieurs : grille du lot
+            uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
             st.markdown('<p style="color: #666; font-size: 0.9rem;">Taille maximale : 10MB</p>', unsafe_allow_html=True)
             st.markdown('</div>', unsafe_allow_html=True)
     
@@ -400,7 +722,22 @@ def main():
             st.write(f"**Type :** {uploaded_file.type.split('/')[-1].upper()}")
             st.write(f"**Taille :** {uploaded_file.size / 1024:.1f} KB")
             st.markdown('</div>', unsafe_allow_html=True)
+        elif uploaded_files:
+            st.markdown('<div class="file-info-card">', unsafe_allow_html=True)
+            st.markdown(f"#### 📦 {len(uploaded_files)} fichiers prêts")
+            st.write(f"**Taille totale :** {sum(f.size for f in uploaded_files) / 1024:.1f} KB")
+            st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Traitement en arrière-plan : suivi conservé entre reruns et, via l'URL, entre reconnexions
+    if 'ocr_job' not in st.session_state and st.query_params.get("job"):
+        st.session_state.ocr_job = st.query_params["job"]
+    if st.session_state.get('ocr_job'):
+        show_job_status(st.session_state.ocr_job, uploaded_file is not None)
     
+    if len(uploaded_files) > 1:
+        show_batch(uploaded_files)
+    
+    upload = get_upload_buffer(uploaded_file)
     if uploaded_file is not None:
         # Étape 1: Aperçu du fichier
         st.markdown("""
@@ -412,31 +749,18 @@ def main():
         
         col1, col2 = st.columns([2, 1])
         
+        preview_start = time.perf_counter()
         with col1:
-            if uploaded_file.type == "application/pdf":
-                try:
-                    # Conversion PDF vers image pour l'aperçu
-                    doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-                    page = doc[0]
-                    pix = page.get_pixmap()
-                    img_data = pix.tobytes("png")
-                    image = Image.open(io.BytesIO(img_data))
-                    
-                    # Aperçu avec cadre
-                    st.markdown('<div style="border: 1px solid #e0e0e0; border-radius: 8px; padding: 1rem; background: white;">', unsafe_allow_html=True)
-                    st.image(image, caption="Aperçu du PDF (Page 1)", use_column_width=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    doc.close()
-                    uploaded_file.seek(0)  # Reset file pointer
-                except Exception as e:
-                    st.error(f"Erreur lors de l'aperçu PDF: {str(e)}")
-            else:
-                image = Image.open(uploaded_file)
-                st.markdown('<div style="border: 1px solid #e0e0e0; border-radius: 8px; padding: 1rem; background: white;">', unsafe_allow_html=True)
-                st.image(image, caption="Aperçu du document", use_column_width=True)
-                st.markdown('</div>', unsafe_allow_html=True)
-                uploaded_file.seek(0)  # Reset file pointer
+            from input_limits import InputRejected
+            
+            # Miniatures en cache par empreinte : ni rendu ni encodage aux reruns
+            try:
+                show_preview(upload)
+            except InputRejected as e:
+                st.error(f"⛔ Document refusé : {e}")
+            except Exception as e:
+                st.error(f"Erreur lors de l'aperçu {'PDF' if upload.is_pdf else 'du document'}: {str(e)}")
+        METRICS.observe(STAGE_UI_PREVIEW, time.perf_counter() - preview_start, uploaded_file.size)
         
         with col2:
             st.markdown("""
@@ -471,83 +795,36 @@ def main():
         
         # Étape 2: OCR et extraction
         if st.button("🧠 Lancer l'OCR et l'extraction", type="primary", key="extract_button"):
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            from job_queue import QueueFullError
             
-            # Zone de statut stylisée
-            status_container = st.container()
-            with status_container:
-                st.markdown('<div class="workflow-step">', unsafe_allow_html=True)
-                
-                # Simulation du traitement
-                for i in range(100):
-                    progress_bar.progress(i + 1)
-                    if i < 30:
-                        status_text.markdown("""
-                        <div style="display: flex; align-items: center;">
-                            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
-                                <path d="M12 2V6" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M12 18V22" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M4.93 4.93L7.76 7.76" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M16.24 16.24L19.07 19.07" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M2 12H6" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M18 12H22" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M4.93 19.07L7.76 16.24" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M16.24 7.76L19.07 4.93" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                            </svg>
-                            <p style="margin: 0;">Analyse du document en cours...</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    elif i < 60:
-                        status_text.markdown("""
-                        <div style="display: flex; align-items: center;">
-                            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
-                                <path d="M21 15C21 15.5304 20.7893 16.0391 20.4142 16.4142C20.0391 16.7893 19.5304 17 19 17H7L3 21V5C3 4.46957 3.21071 3.96086 3.58579 3.58579C3.96086 3.21071 4.46957 3 5 3H19C19.5304 3 20.0391 3.21071 20.4142 3.58579C20.7893 3.96086 21 4.46957 21 5V15Z" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                            </svg>
-                            <p style="margin: 0;">Extraction du texte...</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    elif i < 90:
-                        status_text.markdown("""
-                        <div style="display: flex; align-items: center;">
-                            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
-                                <path d="M19 21L12 16L5 21V5C5 4.46957 5.21071 3.96086 5.58579 3.58579C5.96086 3.21071 6.46957 3 7 3H17C17.5304 3 18.0391 3.21071 18.4142 3.58579C18.7893 3.96086 19 4.46957 19 5V21Z" stroke="#2a5298" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                            </svg>
-                            <p style="margin: 0;">Identification des données structurées...</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    else:
-                        status_text.markdown("""
-                        <div style="display: flex; align-items: center;">
-                            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 0.5rem;">
-                                <path d="M22 11.08V12C21.9988 14.1564 21.3005 16.2547 20.0093 17.9818C18.7182 19.709 16.9033 20.9725 14.8354 21.5839C12.7674 22.1953 10.5573 22.1219 8.53447 21.3746C6.51168 20.6273 4.78465 19.2461 3.61096 17.4371C2.43727 15.628 1.87979 13.4881 2.02168 11.3363C2.16356 9.18455 2.99721 7.13631 4.39828 5.49706C5.79935 3.85781 7.69279 2.71537 9.79619 2.24013C11.8996 1.7649 14.1003 1.98232 16.07 2.86" stroke="#4caf50" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                                <path d="M22 4L12 14.01L9 11.01" stroke="#4caf50" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"/>
-                            </svg>
-                            <p style="margin: 0; color: #4caf50; font-weight: 500;">Traitement terminé avec succès!</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    time.sleep(0.02)
-                
-                st.markdown('</div>', unsafe_allow_html=True)
+            ocr_processor = get_ocr_processor()
+            result_cache = get_result_cache()
+            cache_key = make_cache_key(upload.digest, ocr_processor.cache_signature, ocr_processor.RULES_VERSION)
+            cached = result_cache.get(cache_key)
             
-            # Extraction du texte
-            extracted_text = ""
-            
-            if uploaded_file.type == "application/pdf":
-                file_bytes = uploaded_file.read()
-                extracted_text = ocr_processor.extract_text_from_pdf(file_bytes)
-                uploaded_file.seek(0)
+            if cached is not None:
+                # Document déjà traité : pas de nouvel OCR
+                st.session_state.extracted_text = cached['text']
+                st.session_state.extracted_data = cached['data']
+                st.session_state.extraction_confidence = cached.get('confidence')
+                st.session_state.extraction_located = cached.get('located')
+                st.session_state.extraction_document_type = cached.get('document_type')
+                st.info("⚡ Résultat servi depuis le cache OCR")
+                show_routing(cached.get('document_type'))
             else:
-                image = Image.open(uploaded_file)
-                extracted_text = ocr_processor.extract_text_from_image(image)
-                uploaded_file.seek(0)
-            
-            # Stockage dans session state
-            st.session_state.extracted_text = extracted_text
-            st.session_state.extracted_data = ocr_processor.extract_structured_data(extracted_text)
-            
-            progress_bar.empty()
-            status_text.empty()
+                # OCR confié à la file de traitements : le script de la session n'est pas bloqué
+                try:
+                    # Le job ouvre son propre document : celui de l'aperçu reste à ce thread
+                    job_id = get_job_queue().submit(upload.view, uploaded_file.name, cache_key)
+                except QueueFullError as e:
+                    st.warning(f"⏳ {e}. Réessayez dans quelques instants.")
+                else:
+                    for key in ['extracted_text', 'extracted_data', 'extraction_confidence', 'extraction_located',
+                                'extraction_document_type']:
+                        st.session_state.pop(key, None)
+                    st.session_state.ocr_job = job_id
+                    st.query_params["job"] = job_id
+                    st.rerun()
         
         # Affichage des résultats
         if 'extracted_text' in st.session_state and 'extracted_data' in st.session_state:
@@ -745,6 +1022,8 @@ def main():
                     )
                 
                 if st.button("📊 Sauvegarder CSV", key="save_csv"):
+                    import pandas as pd
+                    
                     df = pd.DataFrame([data])
                     csv_str = df.to_csv(index=False)
                     st.download_button(
@@ -755,8 +1034,21 @@ def main():
                         key="download_csv"
                     )
                 
+                if st.button("🗄️ Enregistrer dans la base", key="save_db"):
+                    record = make_record(
+                        upload.digest, uploaded_file.name,
+                        st.session_state.extracted_text, data,
+                        extracted=st.session_state.extracted_data, validated=True,
+                        confidence=(st.session_state.get('extraction_confidence') or {}).get('document'),
+                        located=st.session_state.get('extraction_located'),
+                        ocr_signature=get_ocr_processor().cache_signature,
+                        document_type=(st.session_state.get('extraction_document_type') or {}).get('type'))
+                    document_id = get_result_store().save(record)
+                    st.success(f"Document enregistré (n° {document_id})")
+                
                 if st.button("🔄 Réinitialiser", key="reset"):
-                    for key in ['extracted_text', 'extracted_data']:
+                    for key in ['extracted_text', 'extracted_data', 'extraction_confidence', 'extraction_located',
+                                'extraction_document_type']:
                         if key in st.session_state:
                             del st.session_state[key]
                     st.experimental_rerun()
@@ -764,6 +1056,9 @@ def main():
                 st.markdown('</div>', unsafe_allow_html=True)
             
             # Analyse de la qualité
+            quality_start = time.perf_counter()
+            import plotly.graph_objects as go
+            
             st.markdown("""
             <div style="margin: 3rem 0 1.5rem 0;">
                 <h2 style="color: var(--primary-color);">📈 Analyse de la qualité</h2>
@@ -773,36 +1068,39 @@ def main():
             
             col1, col2 = st.columns(2)
             
+            confidence = st.session_state.get('extraction_confidence') or {}
+            
             with col1:
-                # Calcul du score de confiance (simulé)
-                confidence_score = min(100, len([v for v in data.values() if v and v != 'Non trouvé']) * 12)
-                
-                fig = go.Figure(go.Indicator(
-                    mode = "gauge+number",
-                    value = confidence_score,
-                    domain = {'x': [0, 1], 'y': [0, 1]},
-                    title = {'text': "Score de confiance OCR", 'font': {'size': 16}},
-                    gauge = {
-                        'axis': {'range': [None, 100]},
-                        'bar': {'color': "darkblue"},
-                        'steps': [
-                            {'range': [0, 50], 'color': "lightgray"},
-                            {'range': [50, 80], 'color': "yellow"},
-                            {'range': [80, 100], 'color': "green"}
-                        ],
-                        'threshold': {
-                            'line': {'color': "red", 'width': 4},
-                            'thickness': 0.75,
-                            'value': 90
+                # Confiance Tesseract moyenne des mots, pondérée par leur longueur
+                if confidence.get('document') is None:
+                    st.info("Score de confiance OCR indisponible pour ce document")
+                else:
+                    fig = go.Figure(go.Indicator(
+                        mode = "gauge+number",
+                        value = confidence['document'],
+                        domain = {'x': [0, 1], 'y': [0, 1]},
+                        title = {'text': "Score de confiance OCR", 'font': {'size': 16}},
+                        gauge = {
+                            'axis': {'range': [None, 100]},
+                            'bar': {'color': "darkblue"},
+                            'steps': [
+                                {'range': [0, 50], 'color': "lightgray"},
+                                {'range': [50, 80], 'color': "yellow"},
+                                {'range': [80, 100], 'color': "green"}
+                            ],
+                            'threshold': {
+                                'line': {'color': "red", 'width': 4},
+                                'thickness': 0.75,
+                                'value': 90
+                            }
                         }
-                    }
-                ))
-                
-                fig.update_layout(
-                    height=300,
-                    margin=dict(l=20, r=20, t=60, b=20)
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                    ))
+                    
+                    fig.update_layout(
+                        height=300,
+                        margin=dict(l=20, r=20, t=60, b=20)
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
             
             with col2:
                 # Graphique des champs extraits
@@ -843,6 +1141,30 @@ def main():
                     )
                 )
                 st.plotly_chart(fig, use_container_width=True)
+            
+            # Confiance de chaque champ : celle du mot le moins sûr de sa valeur
+            field_scores = {k: v for k, v in (confidence.get('fields') or {}).items() if v is not None}
+            if field_scores:
+                fig = go.Figure(go.Bar(
+                    x=list(field_scores.values()),
+                    y=[k.replace('_', ' ').title() for k in field_scores],
+                    orientation='h',
+                    marker_color=['#4caf50' if v >= 80 else '#ff9800' if v >= 50 else '#f44336'
+                                  for v in field_scores.values()],
+                    text=[f"{v:.0f}" for v in field_scores.values()],
+                    textposition='auto'
+                ))
+                fig.update_layout(
+                    title='Confiance OCR par champ',
+                    title_font_size=16,
+                    xaxis=dict(range=[0, 100]),
+                    height=60 + 40 * len(field_scores),
+                    margin=dict(l=20, r=20, t=60, b=20)
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            METRICS.observe(STAGE_UI_QUALITY, time.perf_counter() - quality_start)
+    
+    show_search()
     
     # Footer amélioré
     st.markdown("""
@@ -861,4 +1183,5 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with METRICS.time(STAGE_UI_RUN):
+        main()
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""File de traitements OCR en arrière-plan : pool de workers borné, identifiants de job et état persistant.
+
+Les documents soumis sont traités par un ``ThreadPoolExecutor`` (Tesseract et
+NumPy relâchent le GIL). L'état de chaque job est écrit dans ``data/jobs`` :
+il survit à un rerun Streamlit, à une reconnexion du navigateur et reste
+consultable après la fin du traitement.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+from pipeline_events import ProgressEvent, logger
+
+DEFAULT_JOBS_DIR = os.path.join("data", "jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED)
+
+
+class QueueFullError(Exception):
+    """Levée lorsque la file a atteint sa capacité (contrôle d'admission)"""
+
+
+class JobQueue:
+    """File de jobs OCR avec concurrence et nombre de jobs en attente bornés.
+
+    ``submit`` refuse un document (``QueueFullError``) quand ``workers + max_pending``
+    jobs sont déjà en cours ou en attente, plutôt que de laisser la file grossir
+    sans limite sous la charge. Avec ``admission`` (contrôle d'admission du service
+    HTTP), chaque traitement attend un emplacement d'OCR : les jobs et les requêtes
+    synchrones partagent alors la même borne.
+    """
+
+    def __init__(self, processor, workers: int = 2, max_pending: int = 8,
+                 jobs_dir: str = DEFAULT_JOBS_DIR, result_cache=None,
+                 retention_s: float = 24 * 3600, memory_jobs: int = 256, admission=None):
+        self.processor = processor
+        self.admission = admission
+        self.workers = max(1, workers)
+        self.max_pending = max(0, max_pending)
+        self.jobs_dir = jobs_dir
+        self.result_cache = result_cache
+        self.retention_s = retention_s
+        self.memory_jobs = memory_jobs
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr-job")
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._recover()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: Dict):
+        """Écriture atomique de l'état d'un job"""
+        path = self._path(job['id'])
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _recover(self):
+        """Au démarrage : purge les jobs expirés, marque en échec ceux interrompus par un arrêt"""
+        now = time.time()
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.retention_s:
+                    os.remove(path)
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get('state') not in FINISHED_STATES:
+                job.update(state=JOB_FAILED, error="Traitement interrompu (redémarrage du serveur)",
+                           finished_at=now)
+                self._save(job)
+
+    def submit(self, file_bytes: bytes, filename: str, cache_key: Optional[str] = None) -> str:
+        """Ajoute un document à la file et retourne l'identifiant du job.
+
+        Le worker décode lui-même ``file_bytes`` : un document PyMuPDF ou une image PIL
+        ne se partagent pas entre threads, et l'appelant (l'aperçu) garde les siens.
+        Un document déjà en cache (``cache_key``) donne un job aussitôt terminé, sans worker.
+        """
+        cached = self.result_cache.get(cache_key) if self.result_cache is not None and cache_key else None
+        if cached is not None:
+            now = time.time()
+            job = {
+                'id': uuid.uuid4().hex,
+                'filename': filename,
+                'size_bytes': len(file_bytes),
+                'state': JOB_DONE,
+                'progress': 1.0,
+                'message': "Résultat servi depuis le cache OCR",
+                'submitted_at': now,
+                'finished_at': now,
+                'result': {'text': cached['text'], 'data': cached['data'], 'confidence': cached.get('confidence'),
+                           'document_type': cached.get('document_type'), 'located': cached.get('located'),
+                           'cached': True},
+            }
+            with self._lock:
+                self._remember(job)
+            self._save(job)
+            return job['id']
+        with self._lock:
+            if self._active >= self.workers + self.max_pending:
+                raise QueueFullError(
+                    f"File de traitement pleine ({self._active} document(s) en cours ou en attente)")
+            self._active += 1
+            job = {
+                'id': uuid.uuid4().hex,
+                'filename': filename,
+                'size_bytes': len(file_bytes),
+                'state': JOB_QUEUED,
+                'progress': 0.0,
+                'message': "En attente d'un worker",
+                'submitted_at': time.time(),
+            }
+            self._remember(job)
+        self._save(job)
+        self._executor.submit(self._run, job, file_bytes, cache_key)
+        return job['id']
+
+    def _remember(self, job: Dict):
+        self._jobs[job['id']] = job
+        self._jobs.move_to_end(job['id'])
+        # Les jobs terminés les plus anciens ne sont plus gardés qu'en fichier
+        while len(self._jobs) > self.memory_jobs:
+            oldest = next(iter(self._jobs))
+            if self._jobs[oldest]['state'] not in FINISHED_STATES:
+                break
+            del self._jobs[oldest]
+
+    def _run(self, job: Dict, file_bytes: bytes, cache_key: Optional[str]):
+        stage = None
+
+        def on_progress(event: ProgressEvent):
+            nonlocal stage
+            with self._lock:
+                job['progress'] = event.progress
+                job['message'] = event.message
+                job['stage'] = event.stage
+            # Écriture disque seulement au changement d'étape
+            if event.stage != stage:
+                stage = event.stage
+                self._save(dict(job))
+
+        try:
+            # Le job reste « en attente » tant qu'aucun emplacement d'OCR n'est libre
+            with self.admission.reserve() if self.admission is not None else nullcontext():
+                with self._lock:
+                    job.update(state=JOB_RUNNING, started_at=time.time(), message="Traitement en cours")
+                self._save(dict(job))
+                result = self.processor.process_document(file_bytes, job['filename'], on_progress=on_progress)
+            if self.result_cache is not None and cache_key and result['text']:
+                self.result_cache.put(cache_key, result['text'], result['data'],
+                                      {'confidence': result.get('confidence'),
+                                       'document_type': result.get('document_type'),
+                                       'located': result.get('located')})
+            with self._lock:
+                job.update(state=JOB_DONE, progress=1.0, message="Traitement terminé", result=result)
+        except Exception as e:
+            logger.warning("job %s en échec : %s", job['id'], e)
+            with self._lock:
+                job.update(state=JOB_FAILED, error=str(e))
+        finally:
+            with self._lock:
+                job['finished_at'] = time.time()
+                self._active -= 1
+            self._save(dict(job))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """État courant du job (copie), depuis la mémoire ou le disque; None si inconnu"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        try:
+            with open(self._path(os.path.basename(job_id)), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def stats(self) -> Dict:
+        """Charge de la file : jobs actifs (en cours + en attente) et capacité"""
+        with self._lock:
+            return {
+                'active': self._active,
+                'running': min(self._active, self.workers),
+                'queued': max(0, self._active - self.workers),
+                'capacity': self.workers + self.max_pending,
+                'workers': self.workers,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
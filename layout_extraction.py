@@ -0,0 +1,223 @@
+"""Extraction des champs par la mise en page : boîtes des mots PyMuPDF, index spatial et appariement libellé → valeur.
+
+Le texte d'une page PDF numérique est découpé en segments : les mots d'une même
+ligne, coupée là où l'espace entre deux mots trahit un changement de colonne.
+Pour chaque segment qui commence par un libellé connu (« SIRET », « Montant dû »…),
+la valeur est cherchée dans le reste du segment, puis dans le segment à sa
+droite, puis dans celui en dessous. Elle n'est retenue que si elle a la forme
+attendue pour le champ.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from field_extraction import FIELDS
+
+# Taille (en points) des cases de la grille de l'index spatial
+GRID_CELL = 64.0
+# Un écart entre deux mots supérieur à ce multiple de la hauteur de ligne sépare deux colonnes
+COLUMN_GAP = 2.0
+# Distance maximale d'une valeur sous son libellé, en hauteurs de ligne
+MAX_LINES_BELOW = 2.5
+# Tolérance d'alignement (points)
+ALIGN_TOLERANCE = 3.0
+
+_FLAGS = re.IGNORECASE
+
+# Libellés reconnus en début de segment, suivis éventuellement de « : »
+FIELD_LABELS: Dict[str, Pattern] = {
+    'numero_reference': re.compile(r"(?:n°\s*(?:de\s+)?)?r[ée]f[ée]rence(?:\s+de\s+l'avis)?|r[ée]f\.?|n°", _FLAGS),
+    'nom': re.compile(r"nom(?:\s+de\s+(?:famille|naissance)|\s+d'usage)?\b", _FLAGS),
+    'prenom': re.compile(r"pr[ée]noms?\b", _FLAGS),
+    'date': re.compile(r"date\b(?:\s+(?:d[e'’]\s*|limite\s+de\s+)?[a-zéèêû]+){0,2}", _FLAGS),
+    'montant': re.compile(r"(?:montant|total|somme)\b(?:\s+[a-zéèêûà]+){0,2}|(?:net\s+)?[àa]\s+payer", _FLAGS),
+    'numero_siret': re.compile(r"(?:n°\s*)?sir[ée][tn]\b", _FLAGS),
+    'adresse': re.compile(r"adresse(?:\s+postale)?\b", _FLAGS),
+    'telephone': re.compile(r"t[ée]l[ée]phone\b|t[ée]l\b\.?", _FLAGS),
+    'email': re.compile(r"e-?mail\b|courriel\b|adresse\s+(?:[ée]lectronique|e-?mail|courriel)\b", _FLAGS),
+}
+
+_NAME = r"[A-ZÀ-ÖØ-Þ][A-Za-zÀ-ÖØ-öø-ÿ'’\-]+"
+# Forme attendue de la valeur de chaque champ, cherchée au début du texte candidat
+VALUE_PATTERNS: Dict[str, Pattern] = {
+    'numero_reference': re.compile(r"[A-Z0-9][A-Z0-9\-/]*\d[A-Z0-9\-/]*"),
+    'nom': re.compile(rf"{_NAME}(?:\s+{_NAME})*"),
+    'prenom': re.compile(rf"{_NAME}(?:[\s\-]+{_NAME})*"),
+    'date': re.compile(r"\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}(?!\d)"),
+    'montant': re.compile(r"\d{1,3}(?:[ .  ]\d{3})+(?:,\d{2})?(?![\d/])|\d+(?:[,.]\d{2})?(?![\d/.\-])"),
+    'numero_siret': re.compile(r"\d{14}(?!\d)|\d{3}\s\d{3}\s\d{3}(?:\s\d{5})?(?!\d)|\d{9}(?!\d)"),
+    # Numéro de voie (bis, ter...) puis nom de la voie, ou bâtiment, résidence, boîte postale...
+    'adresse': re.compile(r"\d{1,4}(?:\s?(?:bis|ter|quater|[A-D])\b)?,?\s+[A-Za-zÀ-ÿ][^\n]*"
+                          r"|(?i:b[âa]t(?:iment)?|r[ée]sidence|lieu-dit|bp|cs|zac?|zi)\b\.?[^\n]*\d[^\n]*"),
+    'telephone': re.compile(r"(?:\+33\s?|0)\d(?:[\s.]?\d{2}){4}(?!\d)"),
+    'email': re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"),
+}
+
+_LABEL_END = re.compile(r"\s*[:\-–]?\s*")
+_POSTAL_CODE = re.compile(r"^\d{5}\b")
+
+
+class Segment(NamedTuple):
+    """Suite de mots d'une même ligne et d'une même colonne"""
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    text: str
+
+    @property
+    def height(self) -> float:
+        return self.y1 - self.y0
+
+
+def segments_from_words(words: Iterable[Tuple]) -> List[Segment]:
+    """Segments à partir de ``page.get_text("words")`` : (x0, y0, x1, y1, mot, bloc, ligne, n° du mot)"""
+    lines: Dict[Tuple[int, int], List[Tuple]] = defaultdict(list)
+    for word in words:
+        lines[(word[5], word[6])].append(word)
+
+    segments = []
+    for line_words in lines.values():
+        line_words.sort(key=lambda word: word[0])
+        current = [line_words[0]]
+        for word in line_words[1:]:
+            previous = current[-1]
+            if word[0] - previous[2] > COLUMN_GAP * (previous[3] - previous[1]):
+                segments.append(_segment(current))
+                current = []
+            current.append(word)
+        segments.append(_segment(current))
+    # Ordre de lecture : de haut en bas, puis de gauche à droite
+    segments.sort(key=lambda segment: (round(segment.y0 / ALIGN_TOLERANCE), segment.x0))
+    return segments
+
+
+def _segment(words: List[Tuple]) -> Segment:
+    return Segment(min(w[0] for w in words), min(w[1] for w in words), max(w[2] for w in words),
+                   max(w[3] for w in words), " ".join(w[4] for w in words))
+
+
+class SpatialIndex:
+    """Grille de cases de ``cell`` points : chaque segment est rangé dans les cases qu'il recouvre"""
+
+    def __init__(self, segments: List[Segment], cell: float = GRID_CELL):
+        self.segments = segments
+        self.cell = cell
+        self._grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for index, segment in enumerate(segments):
+            for key in self._cells(segment.x0, segment.y0, segment.x1, segment.y1):
+                self._grid[key].append(index)
+
+    def _cells(self, x0: float, y0: float, x1: float, y1: float) -> Iterable[Tuple[int, int]]:
+        for cx in range(int(x0 // self.cell), int(x1 // self.cell) + 1):
+            for cy in range(int(y0 // self.cell), int(y1 // self.cell) + 1):
+                yield cx, cy
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[Segment]:
+        """Segments dont la boîte coupe le rectangle donné"""
+        found: Set[int] = set()
+        for key in self._cells(x0, y0, x1, y1):
+            found.update(self._grid.get(key, ()))
+        return [self.segments[i] for i in sorted(found)
+                if self.segments[i].x1 >= x0 and self.segments[i].x0 <= x1
+                and self.segments[i].y1 >= y0 and self.segments[i].y0 <= y1]
+
+    def right_of(self, segment: Segment, max_distance: float = 600.0) -> Optional[Segment]:
+        """Segment le plus proche à droite, sur la même ligne"""
+        middle = (segment.y0 + segment.y1) / 2
+        candidates = [
+            other for other in self.query(segment.x1, middle - ALIGN_TOLERANCE,
+                                          segment.x1 + max_distance, middle + ALIGN_TOLERANCE)
+            if other != segment and other.x0 >= segment.x1 - ALIGN_TOLERANCE and other.y0 <= middle <= other.y1
+        ]
+        return min(candidates, key=lambda other: other.x0, default=None)
+
+    def below(self, segment: Segment, max_lines: float = MAX_LINES_BELOW) -> Optional[Segment]:
+        """Segment le plus proche en dessous, qui chevauche horizontalement"""
+        candidates = [
+            other for other in self.query(segment.x0 - ALIGN_TOLERANCE, segment.y1,
+                                          segment.x1 + ALIGN_TOLERANCE, segment.y1 + max_lines * segment.height)
+            if other != segment and other.y0 >= segment.y1 - ALIGN_TOLERANCE
+        ]
+        return min(candidates, key=lambda other: (other.y0, abs(other.x0 - segment.x0)), default=None)
+
+
+def match_label(text: str) -> Optional[Tuple[str, int]]:
+    """Champ dont le libellé ouvre ``text`` et position de fin du libellé; le plus long l'emporte"""
+    best = None
+    for field, pattern in FIELD_LABELS.items():
+        match = pattern.match(text)
+        if match and (best is None or match.end() > best[1]):
+            best = (field, match.end())
+    if best is None:
+        return None
+    return best[0], best[1] + _LABEL_END.match(text, best[1]).end() - best[1]
+
+
+def accepts(field: str, value: Optional[str]) -> bool:
+    """Vrai si ``value`` a entièrement la forme attendue pour ``field`` (première ligne d'une adresse)"""
+    pattern = VALUE_PATTERNS.get(field)
+    return bool(value) and pattern is not None and pattern.fullmatch(value.split("\n", 1)[0]) is not None
+
+
+def field_value(field: str, text: str) -> Optional[str]:
+    """Valeur de ``field`` au début de ``text``, arrêtée avant un éventuel autre libellé"""
+    for position in (m.start() for m in re.finditer(r"\s\S", text)):
+        label = match_label(text[position + 1:])
+        # Un autre libellé suivi de « : » dans le même segment : la valeur s'arrête avant
+        if label and text[position + 1:position + 1 + label[1]].rstrip().endswith(":"):
+            text = text[:position]
+            break
+    match = VALUE_PATTERNS[field].match(text.strip())
+    if not match:
+        return None
+    value = match.group(0).strip()
+    # SIRET ramené à ses chiffres, comme le cherche ResultStore.find_by_siret
+    return re.sub(r"\s", "", value) if field == 'numero_siret' else value
+
+
+class LayoutExtractor:
+    """Appariement libellé → valeur sur les segments d'une page"""
+
+    def extract(self, segments: List[Segment], data: Optional[Dict] = None) -> Dict:
+        """Champs trouvés par la mise en page; les champs déjà renseignés dans ``data`` sont ignorés"""
+        if data is None:
+            data = dict.fromkeys(FIELDS)
+        index = SpatialIndex(segments)
+        labels = {}
+        for segment in segments:
+            label = match_label(segment.text)
+            if label:
+                labels[segment] = label
+        for segment, (field, end) in labels.items():
+            if data.get(field):
+                continue
+            value = field_value(field, segment.text[end:])
+            if value is None:
+                # Valeur dans la colonne voisine, ou sous le libellé (un libellé n'est jamais une valeur)
+                for neighbour in (index.right_of(segment), index.below(segment)):
+                    if neighbour is not None and neighbour not in labels:
+                        value = field_value(field, neighbour.text)
+                        if value is not None:
+                            segment = neighbour
+                            break
+            if value is None:
+                continue
+            if field == 'adresse':
+                value = self._address_lines(index, segment, value, labels)
+            data[field] = value
+        return data
+
+    def _address_lines(self, index: SpatialIndex, segment: Segment, value: str, labels: Dict) -> str:
+        """Ajoute les lignes d'adresse alignées sous la première (jusqu'au code postal exclu)"""
+        lines = [value]
+        x0 = segment.x0 + segment.text.find(value) * (segment.x1 - segment.x0) / max(len(segment.text), 1)
+        while len(lines) < 3:
+            below = index.below(segment, max_lines=1.8)
+            if below is None or below in labels or abs(below.x0 - x0) > 2 * ALIGN_TOLERANCE \
+                    or _POSTAL_CODE.match(below.text):
+                break
+            lines.append(below.text)
+            segment = below
+        return "\n".join(lines)
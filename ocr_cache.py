@@ -0,0 +1,164 @@
+"""Cache de résultats OCR adressé par contenu, persisté sur le volume ./data"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join("data", "ocr_cache")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEMORY_ENTRIES = 128
+
+
+def content_digest(file_bytes: bytes) -> str:
+    """Empreinte SHA-256 du contenu téléversé"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def make_cache_key(digest: str, ocr_config: str, rules_version: str) -> str:
+    """Clé de cache : contenu + configuration OCR + version des patterns d'extraction"""
+    material = "\0".join([digest, ocr_config, rules_version])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class OCRResultCache:
+    """Cache LRU borné en taille pour le texte brut et les données structurées.
+
+    Les entrées sont des fichiers JSON sous ``cache_dir``; les plus récemment
+    utilisées sont aussi gardées en mémoire pour un accès immédiat.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """Reconstruit l'ordre LRU à partir des dates de modification des fichiers"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+        self._evict()
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _forget(self, key: str):
+        self._size -= self._index.pop(key, 0)
+        self._memory.pop(key, None)
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._forget(key)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retourne ``{'text': ..., 'data': ..., ...}`` ou None si absent"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                if key in self._index:
+                    self._index.move_to_end(key)
+                # Date d'accès sur disque : ordre LRU des autres processus et après un redémarrage
+                try:
+                    os.utime(self._path(key), None)
+                except OSError:
+                    pass
+                self.hits += 1
+                return entry
+
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                os.utime(path, None)
+            except (OSError, ValueError):
+                # Entrée absente, supprimée par un autre processus ou corrompue
+                self._forget(key)
+                self.misses += 1
+                return None
+
+            if key not in self._index:
+                size = os.path.getsize(path)
+                self._index[key] = size
+                self._size += size
+            self._index.move_to_end(key)
+            self._remember(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, text: str, data: Dict, extra: Optional[Dict] = None):
+        """Enregistre un résultat (et des métadonnées, ex. confiance OCR) puis applique l'éviction"""
+        entry = {"text": text, "data": data, **(extra or {})}
+        payload = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(key)
+            self._index[key] = len(payload)
+            self._size += len(payload)
+            self._remember(key, entry)
+            self._evict()
+
+    def clear(self):
+        """Vide le cache (mémoire et disque)"""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._memory.clear()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        """Compteurs de succès/échecs et occupation du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._index),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
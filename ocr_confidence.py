@@ -0,0 +1,132 @@
+"""Confiance OCR au niveau du mot : lecture des données Tesseract (TSV), texte reconstruit et scores"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Colonnes du TSV Tesseract (l'API C ne produit pas la ligne d'en-tête)
+TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+               "left", "top", "width", "height", "conf", "text")
+
+# Confiance attribuée au texte natif d'un PDF (aucune reconnaissance nécessaire)
+NATIVE_TEXT_CONFIDENCE = 100.0
+
+
+class OCRWord(NamedTuple):
+    """Mot reconnu, avec sa boîte englobante et sa position dans le texte reconstruit"""
+    text: str
+    confidence: float
+    left: int
+    top: int
+    width: int
+    height: int
+    line: Tuple[int, int, int]
+    start: int = 0
+    end: int = 0
+
+
+def parse_tsv(tsv: str) -> List[OCRWord]:
+    """Lit la sortie TSV de Tesseract et retourne les mots non vides (offsets non calculés)"""
+    words = []
+    lines = tsv.splitlines()
+    header = list(TSV_COLUMNS)
+    if lines and lines[0].startswith("level"):
+        header = lines.pop(0).split("\t")
+    index = {name: i for i, name in enumerate(header)}
+    for row in lines:
+        cells = row.split("\t")
+        if len(cells) < len(header):
+            # Mot vide : Tesseract omet parfois la dernière colonne
+            cells.append("")
+        if len(cells) < len(header) or cells[index["level"]] != "5":
+            continue
+        text = cells[index["text"]].strip()
+        confidence = float(cells[index["conf"]])
+        if not text or confidence < 0:
+            continue
+        words.append(OCRWord(
+            text=text,
+            confidence=confidence,
+            left=int(cells[index["left"]]),
+            top=int(cells[index["top"]]),
+            width=int(cells[index["width"]]),
+            height=int(cells[index["height"]]),
+            line=(int(cells[index["block_num"]]), int(cells[index["par_num"]]), int(cells[index["line_num"]])),
+        ))
+    return words
+
+
+def layout_words(words: List[OCRWord]) -> Tuple[str, List[OCRWord]]:
+    """Reconstruit le texte (espaces, retours à la ligne, paragraphes) et les offsets de chaque mot"""
+    parts = []
+    length = 0
+    placed = []
+    previous_line = None
+    for word in words:
+        if previous_line is not None:
+            if word.line == previous_line:
+                separator = " "
+            elif word.line[:2] == previous_line[:2]:
+                separator = "\n"
+            else:
+                separator = "\n\n"
+            parts.append(separator)
+            length += len(separator)
+        parts.append(word.text)
+        placed.append(word._replace(start=length, end=length + len(word.text)))
+        length += len(word.text)
+        previous_line = word.line
+    if parts:
+        parts.append("\n")
+    return "".join(parts), placed
+
+
+def native_text_word(text: str, offset: int = 0) -> OCRWord:
+    """Pseudo-mot couvrant le texte natif d'une page PDF (confiance maximale)"""
+    return OCRWord(text, NATIVE_TEXT_CONFIDENCE, 0, 0, 0, 0, (0, 0, 0), offset, offset + len(text))
+
+
+def shift_words(words: List[OCRWord], offset: int) -> List[OCRWord]:
+    """Décale les offsets des mots d'une page dans le texte du document"""
+    return [word._replace(start=word.start + offset, end=word.end + offset) for word in words]
+
+
+def low_confidence_groups(words: List[OCRWord], threshold: float) -> List[List[int]]:
+    """Regroupe les indices des mots consécutifs d'une même ligne sous le seuil de confiance"""
+    groups = []
+    current: List[int] = []
+    for i, word in enumerate(words):
+        if word.confidence < threshold and (not current or words[current[-1]].line == word.line):
+            current.append(i)
+            continue
+        if current:
+            groups.append(current)
+            current = []
+        if word.confidence < threshold:
+            current = [i]
+    if current:
+        groups.append(current)
+    return groups
+
+
+def document_confidence(words: List[OCRWord]) -> Optional[float]:
+    """Confiance moyenne du document, pondérée par la longueur des mots"""
+    total = sum(len(word.text) for word in words)
+    if not total:
+        return None
+    return sum(word.confidence * len(word.text) for word in words) / total
+
+
+def field_confidences(text: str, data: Dict, words: List[OCRWord]) -> Dict[str, Optional[float]]:
+    """Confiance de chaque champ extrait : celle du mot le moins sûr qui compose sa valeur"""
+    confidences = {}
+    for field, value in data.items():
+        if not value:
+            confidences[field] = None
+            continue
+        start = text.find(value)
+        if start < 0:
+            confidences[field] = None
+            continue
+        end = start + len(value)
+        overlapping = [word.confidence for word in words if word.start < end and word.end > start]
+        confidences[field] = min(overlapping) if overlapping else None
+    return confidences
@@ -0,0 +1,150 @@
+"""Moteurs OCR : pool de moteurs Tesseract persistants (API C) ou pytesseract en repli"""
+
+import queue
+import threading
+from typing import List, Optional
+
+from PIL import Image
+
+try:
+    # Liaison Python de l'API C de Tesseract : le modèle reste chargé entre deux appels
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+class PytesseractBackend:
+    """Lance un processus ``tesseract`` par image (comportement historique)"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "fra", oem: int = 3, psm: int = 6):
+        # Import différé : pytesseract charge pandas s'il est installé
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.lang = lang
+        self.oem = oem
+        self.psm = psm
+        self.config = f"--oem {oem} --psm {psm} -l {lang}"
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return self._pytesseract.image_to_string(image, config=self.config)
+
+    def image_to_data(self, image: Image.Image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> str:
+        """Mots, boîtes et confiances au format TSV de Tesseract (``whitelist`` : caractères autorisés)"""
+        config = self.config if psm is None else f"--oem {self.oem} --psm {psm} -l {self.lang}"
+        if whitelist:
+            config += f" -c tessedit_char_whitelist={whitelist}"
+        return self._pytesseract.image_to_data(image, config=config)
+
+    def close(self):
+        pass
+
+
+class TesseractEnginePool:
+    """Pool borné de moteurs Tesseract initialisés une seule fois et réutilisés.
+
+    Les moteurs sont créés à la demande, jusqu'à ``size``; au-delà, les appels
+    attendent qu'un moteur se libère. tesserocr relâche le GIL pendant la
+    reconnaissance, le pool peut donc être partagé entre threads.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, size: int = 1, lang: str = "fra", oem: int = 3, psm: int = 6):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr n'est pas installé")
+        self.size = max(1, size)
+        self.lang = lang
+        self.oem = oem
+        self.psm = psm
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_engine(self):
+        return tesserocr.PyTessBaseAPI(lang=self.lang, oem=self.oem, psm=self.psm)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._new_engine()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def _release(self, engine):
+        engine.Clear()
+        self._idle.put(engine)
+
+    def warm_up(self):
+        """Charge tous les moteurs du pool (modèle de langue compris)"""
+        engines = [self._acquire() for _ in range(self.size)]
+        for engine in engines:
+            self._release(engine)
+
+    def image_to_string(self, image: Image.Image) -> str:
+        engine = self._acquire()
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            self._release(engine)
+
+    def image_to_data(self, image: Image.Image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> str:
+        """Mots, boîtes et confiances au format TSV de Tesseract (``whitelist`` : caractères autorisés)"""
+        engine = self._acquire()
+        try:
+            if psm is not None:
+                engine.SetPageSegMode(psm)
+            if whitelist:
+                engine.SetVariable("tessedit_char_whitelist", whitelist)
+            engine.SetImage(image)
+            engine.Recognize()
+            return engine.GetTSVText(0)
+        finally:
+            if psm is not None:
+                engine.SetPageSegMode(self.psm)
+            if whitelist:
+                # Clear() ne réinitialise pas les variables : le moteur revient au jeu complet
+                engine.SetVariable("tessedit_char_whitelist", "")
+            self._release(engine)
+
+    def close(self):
+        """Libère les moteurs inactifs"""
+        while True:
+            try:
+                engine = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            engine.End()
+            with self._lock:
+                self._created -= 1
+
+
+def create_ocr_backend(backend: str = "auto", pool_size: int = 1, lang: str = "fra",
+                       oem: int = 3, psm: int = 6):
+    """Retourne le moteur demandé : ``tesserocr``, ``pytesseract`` ou ``auto``"""
+    if backend not in ("auto", "tesserocr", "pytesseract"):
+        raise ValueError(f"Moteur OCR inconnu : {backend}")
+    if backend == "tesserocr" or (backend == "auto" and tesserocr is not None):
+        return TesseractEnginePool(pool_size, lang=lang, oem=oem, psm=psm)
+    return PytesseractBackend(lang=lang, oem=oem, psm=psm)
+
+
+def available_backends() -> List[str]:
+    """Moteurs utilisables dans l'environnement courant"""
+    backends = ["pytesseract"]
+    if tesserocr is not None:
+        backends.insert(0, "tesserocr")
+    return backends
@@ -0,0 +1,645 @@
+"""Traitement OCR et extraction de données, indépendant de l'interface Streamlit"""
+
+import io
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pymupdf as fitz
+from PIL import Image
+
+from document_types import (
+    SOURCE_FIRST_PAGE_OCR, SOURCE_TEXT, SOURCE_TEXT_LAYER, DocumentClassifier, DocumentPipeline, Routing, default_routing,
+    route
+)
+from field_extraction import RULES_VERSION, FieldExtractor
+from image_preprocessing import create_preprocessor
+from input_limits import DEFAULT_LIMITS, InputLimits, InputRejected, downsample, open_image
+from layout_extraction import LayoutExtractor, accepts, segments_from_words
+from ocr_confidence import (
+    OCRWord, document_confidence, field_confidences, layout_words, low_confidence_groups,
+    native_text_word, parse_tsv, shift_words
+)
+from ocr_engines import create_ocr_backend
+from pipeline_metrics import (
+    METRICS, STAGE_ANCHOR, STAGE_CLASSIFY, STAGE_DECODE, STAGE_DOCUMENT, STAGE_FIELDS, STAGE_LAYOUT, STAGE_OCR, STAGE_PREPROCESS,
+    STAGE_REOCR, STAGE_RENDER, STAGE_ZONES,
+    MetricsRegistry, SlowestProfiles
+)
+from pipeline_events import (
+    STAGE_DONE, STAGE_EXTRACTION, STAGE_LOAD, STAGE_PAGE, STAGE_PREPROCESSING, ProgressCallback, emit_progress
+)
+from zone_templates import FormTemplate, TemplateRegistry, Zone, find_anchor, load_templates, zone_value
+
+
+class OCRError(Exception):
+    """Erreur levée lorsqu'un document ne peut pas être lu ou reconnu"""
+
+
+def image_bytes(image: Image.Image) -> int:
+    """Taille des pixels décodés d'une image (pour les mesures d'octets traités)"""
+    return image.width * image.height * len(image.getbands())
+
+
+class OCRProcessor:
+    """Classe pour traiter l'OCR et l'extraction de données"""
+
+    # Configuration OCR pour le français
+    OCR_LANG = 'fra'
+    OCR_OEM = 3
+    OCR_PSM = 6
+    OCR_CONFIG = f'--oem {OCR_OEM} --psm {OCR_PSM} -l {OCR_LANG}'
+    # Version des patterns d'extraction (voir field_extraction.py)
+    RULES_VERSION = RULES_VERSION
+    # Extensions des fichiers acceptés
+    SUPPORTED_FORMATS = ('.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+
+    # En dessous de ce nombre de caractères, une page PDF est considérée comme scannée
+    MIN_TEXT_LAYER_CHARS = 20
+
+    # Relecture ciblée : les mots sous ce seuil de confiance (0-100) sont relus
+    # sur un recadrage agrandi, en mode « ligne unique »
+    REOCR_CONFIDENCE = 60
+    REOCR_SCALE = 2
+    REOCR_PSM = 7
+    REOCR_PADDING = 8
+    MAX_REOCR_REGIONS = 30
+
+    # Blocs attribués aux mots lus dans les zones d'un gabarit (un bloc par zone)
+    ZONE_BLOCK = 1000
+
+    def __init__(self, ocr_dpi: int = 300, page_workers: Optional[int] = None,
+                 early_stop: bool = True, ocr_backend: str = "auto", preprocessing: str = "all",
+                 reocr_threshold: float = REOCR_CONFIDENCE, metrics: Optional[MetricsRegistry] = None,
+                 profiler: Optional[SlowestProfiles] = None, ocr_pool_size: Optional[int] = None,
+                 templates: Optional[TemplateRegistry] = None, classify: bool = True,
+                 limits: InputLimits = DEFAULT_LIMITS):
+        # Résolution de rendu des pages scannées avant OCR
+        self.ocr_dpi = ocr_dpi
+        # Nombre de pages OCR traitées en parallèle (défaut : nombre de cœurs)
+        self.page_workers = page_workers or os.cpu_count() or 1
+        # Arrête la lecture d'un PDF dès que tous les champs sont renseignés
+        self.early_stop = early_stop
+        self.field_extractor = FieldExtractor()
+        self.layout_extractor = LayoutExtractor()
+        # Étapes de prétraitement avant OCR ("all", "none" ou liste séparée par des virgules)
+        self.preprocessor = create_preprocessor(preprocessing, max_pixels=limits.max_pixels)
+        # Moteurs Tesseract persistants (par défaut un par page traitée en parallèle) ou pytesseract
+        self.ocr_backend = create_ocr_backend(ocr_backend, pool_size=ocr_pool_size or self.page_workers,
+                                              lang=self.OCR_LANG,
+                                              oem=self.OCR_OEM, psm=self.OCR_PSM)
+        # Seuil de relecture des zones peu sûres (0 pour désactiver)
+        self.reocr_threshold = reocr_threshold
+        # Mesures par étape (registre du processus par défaut) et profils des documents lents
+        self.metrics = METRICS if metrics is None else metrics
+        self.profiler = profiler
+        # Gabarits des formulaires connus (form_templates.json par défaut, livré vide)
+        self.templates = load_templates() if templates is None else templates
+        self._zone_executor: Optional[ThreadPoolExecutor] = None
+        self._zone_lock = threading.Lock()
+        # Classement des documents par type, qui choisit champs, patterns et réglages OCR
+        self.classify = classify
+        self.classifier = DocumentClassifier()
+        # Budgets d'octets, de pages et de pixels; les documents hors budget sont refusés avant décodage
+        self.limits = limits
+
+    @property
+    def cache_signature(self) -> str:
+        """Paramètres OCR qui influent sur le texte produit (utilisés dans la clé de cache)"""
+        preprocessing = self.preprocessor.signature if self.preprocessor else "none"
+        return (f"{self.OCR_CONFIG}|{self.ocr_backend.name}|dpi={self.ocr_dpi}"
+                f"|prep={preprocessing}|early_stop={self.early_stop}|reocr={self.reocr_threshold}"
+                f"|templates={self.templates.signature}|classify={self.classify}")
+
+    @classmethod
+    def is_supported(cls, filename: str) -> bool:
+        """Indique si l'extension du fichier fait partie des formats supportés (sans créer de processeur)"""
+        return os.path.splitext(filename)[1].lower() in cls.SUPPORTED_FORMATS
+
+    def has_text_layer(self, page_text: str) -> bool:
+        """Indique si le texte natif d'une page est exploitable sans OCR"""
+        return len(page_text.strip()) >= self.MIN_TEXT_LAYER_CHARS
+
+    def page_dpi(self, rect: "fitz.Rect", dpi: int) -> int:
+        """Résolution de rendu de ``rect``, abaissée si l'image dépasserait le budget de pixels"""
+        return self.limits.fit_dpi(rect.width / 72, rect.height / 72, dpi)
+
+    def render_page(self, page: "fitz.Page") -> Image.Image:
+        """Rend une page PDF en image niveaux de gris à la résolution OCR (moindre pour une page démesurée)"""
+        start = time.perf_counter()
+        dpi = self.page_dpi(page.rect, self.ocr_dpi)
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        self.metrics.observe(STAGE_RENDER, time.perf_counter() - start, len(pix.samples))
+        image.info["dpi"] = (dpi, dpi)
+        return image
+
+    def open_pdf(self, pdf_bytes: bytes) -> "fitz.Document":
+        """Ouvre un PDF; une erreur de lecture devient une ``OCRError``, un PDF trop long est refusé"""
+        try:
+            with self.metrics.time(STAGE_DECODE, len(pdf_bytes)):
+                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception as e:
+            raise OCRError(f"Erreur lors de l'extraction PDF: {str(e)}") from e
+        try:
+            self.limits.check_pages(doc.page_count)
+        except InputRejected:
+            doc.close()
+            raise
+        return doc
+
+    def route_text(self, text: str, source: str = SOURCE_TEXT, sample_seconds: float = 0.0) -> Routing:
+        """Aiguillage d'un document d'après son texte"""
+        if not self.classify:
+            return default_routing()
+        routing = route(self.classifier, text, source, sample_seconds)
+        self.metrics.observe(STAGE_CLASSIFY, routing.seconds + sample_seconds, len(text))
+        return routing
+
+    def route_image(self, image: Image.Image, preprocess: bool = True
+                    ) -> Tuple[Routing, Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]]:
+        """Lit une page scannée avec les réglages génériques et l'aiguille d'après son texte.
+
+        Retourne la décision et la lecture de la page (voir ``recognize_page``) : le texte
+        classé est celui de l'OCR de la page, sans lecture supplémentaire. Les réglages OCR
+        du type retenu ne s'appliquent donc qu'aux pages suivantes.
+        """
+        page = self.recognize_page(image, preprocess)
+        if not self.classify:
+            return default_routing(), page
+        return self.route_text(page[0], SOURCE_FIRST_PAGE_OCR), page
+
+    def route_pdf(self, doc: "fitz.Document"
+                  ) -> Tuple[Routing, Optional[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]]]:
+        """Aiguillage d'un PDF d'après la couche texte de sa première page, ou d'après l'OCR de
+        cette page si elle est scannée; la lecture de la page OCR est alors retournée (None sinon)"""
+        if not self.classify or not doc.page_count:
+            return default_routing(), None
+        start = time.perf_counter()
+        page = doc[0]
+        text = page.get_text()
+        if self.has_text_layer(text):
+            return self.route_text(text, SOURCE_TEXT_LAYER, time.perf_counter() - start), None
+        try:
+            return self.route_image(self.render_page(page))
+        except OCRError:
+            raise
+        except Exception as e:
+            raise OCRError(f"Erreur lors de l'extraction PDF: {str(e)}") from e
+
+    def iter_pdf_pages(self, pdf_bytes: bytes, on_progress: Optional[ProgressCallback] = None,
+                       document: Optional["fitz.Document"] = None) -> Iterator[str]:
+        """Produit le texte des pages d'un PDF dans l'ordre, au fur et à mesure"""
+        pages = self.iter_pdf_page_words(pdf_bytes, on_progress, document)
+        try:
+            for page_text, *_ in pages:
+                yield page_text
+        finally:
+            pages.close()
+
+    def layout_fields(self, page: "fitz.Page") -> Dict:
+        """Champs d'une page à couche texte, appariés par position (libellé → valeur voisine)"""
+        with self.metrics.time(STAGE_LAYOUT):
+            return self.layout_extractor.extract(segments_from_words(page.get_text("words")))
+
+    def iter_pdf_page_words(self, pdf_bytes: bytes, on_progress: Optional[ProgressCallback] = None,
+                            document: Optional["fitz.Document"] = None, pipeline: Optional[DocumentPipeline] = None,
+                            first_page: Optional[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]] = None
+                            ) -> Iterator[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]]:
+        """Produit, pour chaque page dans l'ordre : texte, mots reconnus, nombre de zones relues,
+        champs trouvés par la mise en page ou les zones d'un gabarit (None sinon) et nom du gabarit reconnu.
+
+        Les pages scannées sont OCR en parallèle dans une fenêtre bornée; fermer
+        le générateur annule les pages restantes. ``document``, s'il est fourni,
+        est le PDF déjà ouvert (il n'est alors ni relu ni fermé); ``pipeline`` fixe les
+        réglages OCR du type de document. ``first_page`` est la première page déjà lue
+        (par ``route_pdf``), qui n'est pas relue.
+        """
+        doc = document if document is not None else self.open_pdf(pdf_bytes)
+
+        page_count = doc.page_count
+        emit_progress(on_progress, STAGE_LOAD, 0.05, f"PDF chargé ({page_count} page(s))", page_count=page_count)
+        window = self.page_workers * 2
+        executor = None
+        pending = deque()
+        delivered = 0
+
+        def deliver(item) -> Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]:
+            nonlocal delivered
+            page = item if isinstance(item, tuple) else item.result()
+            delivered += 1
+            emit_progress(on_progress, STAGE_PAGE, 0.05 + 0.85 * delivered / max(page_count, 1),
+                  f"Page {delivered}/{page_count} lue", delivered, page_count)
+            return page
+
+        try:
+            for page in doc:
+                if first_page is not None and page.number == 0:
+                    pending.append(first_page)
+                    continue
+                page_text = page.get_text()
+                if self.has_text_layer(page_text):
+                    # Texte natif : aucune reconnaissance, confiance maximale, champs lus par la mise en page
+                    pending.append((page_text, [native_text_word(page_text)], 0, self.layout_fields(page), None))
+                else:
+                    if executor is None:
+                        executor = ThreadPoolExecutor(max_workers=self.page_workers)
+                    # Le rendu reste dans ce thread (PyMuPDF), seul l'OCR est parallélisé
+                    pending.append(executor.submit(self.recognize_page, self.render_page(page), True, pipeline))
+                # Les pages prêtes sont livrées dans l'ordre; on bloque si la fenêtre est pleine
+                while pending and (isinstance(pending[0], tuple) or pending[0].done() or len(pending) > window):
+                    yield deliver(pending.popleft())
+            while pending:
+                yield deliver(pending.popleft())
+        except OCRError:
+            raise
+        except Exception as e:
+            raise OCRError(f"Erreur lors de l'extraction PDF: {str(e)}") from e
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if document is None:
+                doc.close()
+
+    def decode_frame(self, image: Image.Image, number: int) -> Image.Image:
+        """Trame ``number`` d'une image multipage, décodée seule, copiée (l'image source peut
+        ensuite passer à la trame suivante) et ramenée à la résolution OCR"""
+        start = time.perf_counter()
+        try:
+            image.seek(number)
+        except Exception as e:
+            raise OCRError(f"Page {number + 1} illisible: {str(e)}") from e
+        # Dimensions lues dans l'en-tête de la trame, avant son décodage
+        self.limits.check_pixels(image.size, number + 1)
+        try:
+            frame = downsample(image.copy(), self.ocr_dpi)
+        except Exception as e:
+            raise OCRError(f"Page {number + 1} illisible: {str(e)}") from e
+        self.metrics.observe(STAGE_DECODE, time.perf_counter() - start, image_bytes(frame))
+        return frame
+
+    def iter_image_page_words(self, image: Image.Image, on_progress: Optional[ProgressCallback] = None,
+                              pipeline: Optional[DocumentPipeline] = None,
+                              first_page: Optional[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]] = None
+                              ) -> Iterator[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]]:
+        """Produit, pour chaque trame d'une image multipage (TIFF) dans l'ordre, les mêmes
+        éléments que ``iter_pdf_page_words``.
+
+        Les trames sont décodées une à une dans ce thread, au moment d'être soumises,
+        puis prétraitées et OCR en parallèle dans la même fenêtre bornée que les pages
+        d'un PDF : la mémoire occupée ne dépend pas du nombre de pages. ``first_page``
+        est la première trame déjà lue (par ``route_image``), qui n'est ni décodée ni relue.
+        """
+        page_count = getattr(image, "n_frames", 1)
+        emit_progress(on_progress, STAGE_LOAD, 0.05, f"Image chargée ({page_count} page(s))", page_count=page_count)
+        window = self.page_workers * 2
+        executor = ThreadPoolExecutor(max_workers=self.page_workers)
+        pending = deque()
+        delivered = 0
+
+        def deliver(item) -> Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]:
+            nonlocal delivered
+            page = item if isinstance(item, tuple) else item.result()
+            delivered += 1
+            emit_progress(on_progress, STAGE_PAGE, 0.05 + 0.85 * delivered / page_count,
+                          f"Page {delivered}/{page_count} lue", delivered, page_count)
+            return page
+
+        try:
+            if first_page is not None:
+                pending.append(first_page)
+            for number in range(0 if first_page is None else 1, page_count):
+                pending.append(executor.submit(self.recognize_page, self.decode_frame(image, number), True, pipeline))
+                while pending and (isinstance(pending[0], tuple) or pending[0].done() or len(pending) > window):
+                    yield deliver(pending.popleft())
+            while pending:
+                yield deliver(pending.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Comme pour l'aperçu, l'image est rendue positionnée sur sa première trame
+            image.seek(0)
+
+    def extract_text_from_pdf(self, pdf_bytes: bytes) -> str:
+        """Extrait le texte d'un PDF, avec OCR parallèle des pages scannées"""
+        return "".join(self.iter_pdf_pages(pdf_bytes))
+
+    def extract_from_pdf_streaming(self, pdf_bytes: bytes, stop_when_complete: bool = True,
+                                   on_progress: Optional[ProgressCallback] = None,
+                                   document: Optional["fitz.Document"] = None,
+                                   pipeline: Optional[DocumentPipeline] = None,
+                                   first_page: Optional[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]] = None
+                                   ) -> Dict:
+        """Extrait les champs page par page et s'arrête dès qu'ils sont tous trouvés
+        (ceux du type de document ``pipeline``, tous par défaut)"""
+        return self._extract_pages(self.iter_pdf_page_words(pdf_bytes, on_progress, document, pipeline, first_page),
+                                   stop_when_complete, pipeline)
+
+    def extract_from_frames_streaming(self, image: Image.Image, stop_when_complete: bool = True,
+                                      on_progress: Optional[ProgressCallback] = None,
+                                      pipeline: Optional[DocumentPipeline] = None,
+                                      first_page: Optional[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]] = None
+                                      ) -> Dict:
+        """Comme ``extract_from_pdf_streaming``, pour les trames d'une image multipage (TIFF)"""
+        return self._extract_pages(self.iter_image_page_words(image, on_progress, pipeline, first_page),
+                                   stop_when_complete, pipeline)
+
+    def _extract_pages(self, page_iter: Iterator[Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]],
+                       stop_when_complete: bool, pipeline: Optional[DocumentPipeline]) -> Dict:
+        """Assemble les pages produites par ``page_iter``; le générateur est fermé à la sortie"""
+        extractor = pipeline.extractor if pipeline else self.field_extractor
+        extraction = extractor.incremental()
+        pages = []
+        words = []
+        offset = 0
+        reocr_regions = 0
+        extraction_s = 0.0
+        templates = []
+        located = {}
+        try:
+            for page_text, page_words, page_reocr, page_fields, page_template in page_iter:
+                pages.append(page_text)
+                if page_template and page_template not in templates:
+                    templates.append(page_template)
+                page_fields = self.positional_fields(page_fields)
+                for field, value in page_fields.items():
+                    if field not in located:
+                        located[field] = value
+                words.extend(shift_words(page_words, offset))
+                offset += len(page_text)
+                reocr_regions += page_reocr
+                start = time.perf_counter()
+                extraction.feed(page_text, page_fields)
+                elapsed = time.perf_counter() - start
+                extraction_s += elapsed
+                self.metrics.observe(STAGE_FIELDS, elapsed, len(page_text))
+                if stop_when_complete and extraction.complete:
+                    break
+        finally:
+            page_iter.close()
+
+        return {
+            'text': "".join(pages),
+            'data': extraction.data,
+            'pages_read': len(pages),
+            'complete': extraction.complete,
+            'extraction_s': extraction_s,
+            'words': words,
+            'reocr_regions': reocr_regions,
+            'templates': templates,
+            'located': located,
+        }
+
+    def extract_text_from_image(self, image: Image.Image, preprocess: bool = True) -> str:
+        """Extrait le texte d'une image avec Tesseract"""
+        return self.recognize_image(image, preprocess)[0]
+
+    def recognize_image(self, image: Image.Image, preprocess: bool = True,
+                        pipeline: Optional[DocumentPipeline] = None) -> Tuple[str, List[OCRWord], int]:
+        """OCR mot à mot : texte reconstruit, mots (confiance, boîte, offsets) et nombre de zones relues"""
+        psm = pipeline.psm if pipeline and pipeline.psm != self.OCR_PSM else None
+        try:
+            if preprocess and self.preprocessor:
+                with self.metrics.time(STAGE_PREPROCESS, image_bytes(image)):
+                    image, _ = self.preprocessor.process(image)
+            with self.metrics.time(STAGE_OCR, image_bytes(image)):
+                words = parse_tsv(self.ocr_backend.image_to_data(image, psm=psm))
+            reocr_regions = 0
+            if pipeline is None or pipeline.reocr:
+                words, reocr_regions = self.reocr_low_confidence(image, words)
+        except Exception as e:
+            raise OCRError(f"Erreur OCR: {str(e)}") from e
+        text, words = layout_words(words)
+        return text, words, reocr_regions
+
+    def recognize_page(self, image: Image.Image, preprocess: bool = True, pipeline: Optional[DocumentPipeline] = None
+                       ) -> Tuple[str, List[OCRWord], int, Optional[Dict], Optional[str]]:
+        """OCR d'une page : zones du gabarit si la page est un formulaire connu, page entière sinon.
+
+        Retourne le texte, les mots, le nombre de zones relues, les champs lus dans les
+        zones (None sans gabarit) et le nom du gabarit. Si une zone ne donne pas de
+        valeur valide, la page entière est lue et les patterns complètent les champs manquants.
+        Les gabarits ne sont pas cherchés si le type de document (``pipeline``) n'en a pas.
+        """
+        try:
+            if preprocess and self.preprocessor:
+                with self.metrics.time(STAGE_PREPROCESS, image_bytes(image)):
+                    image, _ = self.preprocessor.process(image)
+            reading = self.read_template(image) if pipeline is None or pipeline.templates else None
+        except Exception as e:
+            raise OCRError(f"Erreur OCR: {str(e)}") from e
+        if reading is None:
+            return self.recognize_image(image, False, pipeline) + (None, None)
+        template, fields, words = reading
+        if all(fields.get(zone.field) for zone in template.zones):
+            text, words = layout_words(words)
+            return text, words, 0, fields, template.name
+        return self.recognize_image(image, False, pipeline) + (fields, template.name)
+
+    def match_template(self, image: Image.Image) -> Optional[Tuple[FormTemplate, Tuple[int, int], List[OCRWord]]]:
+        """Gabarit dont l'ancre figure dans sa bande de recherche : gabarit, position de l'ancre
+        et mots lus dans la bande (coordonnées de la page)"""
+        for band, templates in self.templates.by_search_band().items():
+            left, top, right, bottom = templates[0].search_box(image.size)
+            if right <= left or bottom <= top:
+                continue
+            crop = image.crop((left, top, right, bottom))
+            with self.metrics.time(STAGE_ANCHOR, image_bytes(crop)):
+                words = [word._replace(left=word.left + left, top=word.top + top)
+                         for word in parse_tsv(self.ocr_backend.image_to_data(crop))]
+            for template in templates:
+                origin = find_anchor(words, template.anchor)
+                if origin is not None:
+                    return template, origin, words
+        return None
+
+    def read_template(self, image: Image.Image) -> Optional[Tuple[FormTemplate, Dict, List[OCRWord]]]:
+        """Lit en parallèle les zones du gabarit reconnu : gabarit, champs valides et mots lus;
+        None si la page ne correspond à aucun gabarit"""
+        if not len(self.templates):
+            return None
+        match = self.match_template(image)
+        if match is None:
+            return None
+        template, origin, words = match
+        dpi = float(image.info.get("dpi", (template.dpi,))[0] or template.dpi)
+        jobs = []
+        for index, zone in enumerate(template.zones):
+            box = template.zone_box(zone, origin, dpi, image.size)
+            if box is not None:
+                jobs.append((index, zone, box))
+        readings = list(self._zones().map(lambda job: self.read_zone(image, *job), jobs))
+
+        # Un champ peut couvrir plusieurs zones (adresse sur deux lignes) : valeurs jointes dans l'ordre
+        values: Dict[str, List[str]] = {}
+        for (_, zone, _), zone_words in zip(jobs, readings):
+            words.extend(zone_words)
+            value = zone_value(zone.field, " ".join(word.text for word in zone_words))
+            if value:
+                values.setdefault(zone.field, []).append(value)
+        return template, {field: "\n".join(parts) for field, parts in values.items()}, words
+
+    def read_zone(self, image: Image.Image, index: int, zone: Zone, box: Tuple[int, int, int, int]) -> List[OCRWord]:
+        """OCR d'une zone avec ses réglages; mots ramenés aux coordonnées de la page"""
+        crop = image.crop(box)
+        with self.metrics.time(STAGE_ZONES, image_bytes(crop)):
+            words = parse_tsv(self.ocr_backend.image_to_data(crop, psm=zone.psm, whitelist=zone.whitelist))
+        # Une zone forme une ligne (un bloc) du texte reconstruit
+        return [word._replace(left=word.left + box[0], top=word.top + box[1],
+                              line=(self.ZONE_BLOCK + index, 0, 0)) for word in words]
+
+    def _zones(self) -> ThreadPoolExecutor:
+        """Pool des lectures de zones, partagé par les pages (le pool de moteurs borne la concurrence)"""
+        with self._zone_lock:
+            if self._zone_executor is None:
+                self._zone_executor = ThreadPoolExecutor(max_workers=self.page_workers,
+                                                         thread_name_prefix="ocr-zone")
+            return self._zone_executor
+
+    def reocr_low_confidence(self, image: Image.Image, words: List[OCRWord]) -> Tuple[List[OCRWord], int]:
+        """Relit les groupes de mots peu sûrs sur un recadrage agrandi; garde la lecture la plus sûre"""
+        if not self.reocr_threshold:
+            return words, 0
+        groups = low_confidence_groups(words, self.reocr_threshold)[:self.MAX_REOCR_REGIONS]
+        replacements = {}
+        for group in groups:
+            members = [words[i] for i in group]
+            pad = self.REOCR_PADDING
+            left = max(0, min(w.left for w in members) - pad)
+            top = max(0, min(w.top for w in members) - pad)
+            right = min(image.width, max(w.left + w.width for w in members) + pad)
+            bottom = min(image.height, max(w.top + w.height for w in members) + pad)
+            if right <= left or bottom <= top:
+                continue
+            crop = image.crop((left, top, right, bottom))
+            crop = crop.resize(((right - left) * self.REOCR_SCALE, (bottom - top) * self.REOCR_SCALE),
+                               Image.LANCZOS)
+            with self.metrics.time(STAGE_REOCR, image_bytes(crop)):
+                candidates = parse_tsv(self.ocr_backend.image_to_data(crop, psm=self.REOCR_PSM))
+            if not candidates or document_confidence(candidates) <= document_confidence(members):
+                continue
+            # Retour aux coordonnées de la page, sur la ligne d'origine
+            replacements[group[0]] = [
+                word._replace(left=left + word.left // self.REOCR_SCALE, top=top + word.top // self.REOCR_SCALE,
+                              width=word.width // self.REOCR_SCALE, height=word.height // self.REOCR_SCALE,
+                              line=members[0].line)
+                for word in candidates
+            ]
+            for i in group[1:]:
+                replacements[i] = []
+        if not replacements:
+            return words, 0
+        merged = []
+        for i, word in enumerate(words):
+            merged.extend(replacements.get(i, [word]))
+        return merged, sum(1 for group in groups if group[0] in replacements)
+
+    def positional_fields(self, fields: Optional[Dict]) -> Dict:
+        """Champs trouvés par position (mise en page, zones d'un gabarit) qui ont la forme attendue :
+        seuls ceux-là priment sur les patterns, les autres laissent la place au résultat des patterns"""
+        return {field: value for field, value in (fields or {}).items() if accepts(field, value)}
+
+    def extract_structured_data(self, text: str, data: Optional[Dict] = None,
+                                pipeline: Optional[DocumentPipeline] = None) -> Dict:
+        """Extrait les données structurées du texte (patterns du type ``pipeline``, génériques par défaut);
+        les champs déjà renseignés dans ``data`` sont gardés"""
+        extractor = pipeline.extractor if pipeline else self.field_extractor
+        with self.metrics.time(STAGE_FIELDS, len(text)):
+            if data is not None:
+                data = dict(extractor.empty_result(), **data)
+            return extractor.extract(text, data)
+
+    def process_document(self, file_bytes: bytes, filename: str,
+                         on_progress: Optional[ProgressCallback] = None, document=None) -> Dict:
+        """Extrait le texte et les données structurées d'un fichier, avec mesures de temps.
+
+        ``on_progress`` reçoit un ``ProgressEvent`` à chaque étape réellement franchie
+        (chargement, prétraitement, pages, extraction, fin). ``document`` est le
+        document déjà décodé (``fitz.Document`` ou image PIL), réutilisé au lieu
+        de redécoder ``file_bytes``; il a été ouvert dans les budgets ``limits``
+        (``UploadBuffer.document``), qui ne sont pas recontrôlés.
+        """
+        profile = self.profiler.profile(filename) if self.profiler else nullcontext()
+        with profile, self.metrics.time(STAGE_DOCUMENT, len(file_bytes)):
+            return self._process_document(file_bytes, filename, on_progress, document)
+
+    def _process_document(self, file_bytes: bytes, filename: str,
+                          on_progress: Optional[ProgressCallback], document=None) -> Dict:
+        start = time.perf_counter()
+        result = {}
+        streamed = None
+        self.limits.check_bytes(len(file_bytes))
+        if os.path.splitext(filename)[1].lower() == '.pdf':
+            doc = document if document is not None else self.open_pdf(file_bytes)
+            try:
+                routing, first_page = self.route_pdf(doc)
+                streamed = self.extract_from_pdf_streaming(file_bytes, stop_when_complete=self.early_stop,
+                                                           on_progress=on_progress, document=doc,
+                                                           pipeline=routing.pipeline, first_page=first_page)
+            finally:
+                if document is None:
+                    doc.close()
+        else:
+            image = document
+            if image is None:
+                try:
+                    with self.metrics.time(STAGE_DECODE, len(file_bytes)):
+                        image = open_image(io.BytesIO(file_bytes), self.limits, self.ocr_dpi)
+                except InputRejected:
+                    raise
+                except Exception as e:
+                    raise OCRError(f"Image illisible: {str(e)}") from e
+            if getattr(image, "n_frames", 1) > 1:
+                # TIFF multipage : les trames sont lues une à une, comme les pages d'un PDF
+                routing, first_page = self.route_image(self.decode_frame(image, 0))
+                streamed = self.extract_from_frames_streaming(image, stop_when_complete=self.early_stop,
+                                                              on_progress=on_progress, pipeline=routing.pipeline,
+                                                              first_page=first_page)
+            else:
+                emit_progress(on_progress, STAGE_LOAD, 0.05, f"Image chargée ({image.width}x{image.height})")
+                if self.preprocessor:
+                    try:
+                        with self.metrics.time(STAGE_PREPROCESS, image_bytes(image)):
+                            image, result['preprocessing'] = self.preprocessor.process(image)
+                    except Exception as e:
+                        raise OCRError(f"Erreur de prétraitement: {str(e)}") from e
+                    emit_progress(on_progress, STAGE_PREPROCESSING, 0.25, "Image prétraitée")
+                routing, (text, words, reocr_regions, fields, result['template']) = self.route_image(image, False)
+                emit_progress(on_progress, STAGE_PAGE, 0.9, "Texte reconnu", 1, 1)
+                text_done = time.perf_counter()
+                located = self.positional_fields(fields)
+                data = self.extract_structured_data(text, located, routing.pipeline)
+                extraction_s = time.perf_counter() - text_done
+        if streamed is not None:
+            text, data = streamed['text'], streamed['data']
+            extraction_s = streamed['extraction_s']
+            words, reocr_regions = streamed['words'], streamed['reocr_regions']
+            result['pages_read'] = streamed['pages_read']
+            result['template'] = streamed['templates'][0] if streamed['templates'] else None
+            located = streamed['located']
+        emit_progress(on_progress, STAGE_EXTRACTION, 0.95, "Données structurées identifiées")
+        total_s = time.perf_counter() - start
+
+        confidence = document_confidence(words)
+        result.update({
+            'text': text,
+            'data': data,
+            'document_type': routing.report(),
+            # Champs trouvés par position, conservés avec le texte pour les ré-extractions
+            'located': located,
+            'confidence': {
+                'document': round(confidence, 1) if confidence is not None else None,
+                'fields': {field: round(value, 1) if value is not None else None
+                           for field, value in field_confidences(text, data, words).items()},
+                'reocr_regions': reocr_regions,
+            },
+            'timings': {
+                'text_ms': round((total_s - extraction_s) * 1000, 3),
+                'extraction_ms': round(extraction_s * 1000, 3),
+            }
+        })
+        emit_progress(on_progress, STAGE_DONE, 1.0, "Traitement terminé")
+        return result
@@ -0,0 +1,367 @@
+"""Service HTTP local d'extraction (bibliothèque standard, sans Streamlit).
+
+Routes :
+    POST /v1/extract?filename=doc.pdf   corps = octets du document -> texte, champs, confiance
+    POST /v1/fields                     corps = texte UTF-8 -> type de document et champs structurés
+    POST /v1/jobs?filename=doc.pdf      traitement asynchrone -> 202 + identifiant
+    GET  /v1/jobs/<id>                  état / résultat d'un job
+    GET  /healthz, GET /metrics         santé, mesures au format Prometheus
+
+Le nombre d'OCR simultanés est borné : au-delà, les requêtes attendent dans une
+file courte, puis sont refusées (429 si la file est pleine, 503 si l'attente
+dépasse le délai). Les jobs asynchrones prennent leurs emplacements sous la
+même borne, sans délai (leur file a sa propre capacité). Le processeur et ses moteurs Tesseract sont créés une seule
+fois au démarrage et réutilisés par toutes les requêtes.
+
+Exemple :
+    python ocr_service.py --port 8000 --max-inflight 4
+    curl --data-binary @scan.pdf "http://localhost:8000/v1/extract?filename=scan.pdf"
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Les OCR sont parallélisés par requête : on évite la sursouscription OpenMP de Tesseract.
+# Avant l'import d'ocr_processor, qui charge Tesseract (OpenMP lit la variable au chargement)
+if "OMP_THREAD_LIMIT" not in os.environ:
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+from input_limits import InputRejected
+from job_queue import JobQueue, QueueFullError
+from ocr_cache import DEFAULT_CACHE_DIR, OCRResultCache, content_digest, make_cache_key
+from ocr_processor import OCRError, OCRProcessor
+from pipeline_events import logger
+from pipeline_metrics import METRICS
+
+# Lecture du corps de requête par blocs
+READ_CHUNK_BYTES = 64 * 1024
+DEFAULT_MAX_BODY_BYTES = 50 * 1024 * 1024
+# Un corps refusé sans avoir été lu est vidé s'il est petit (sinon le client reçoit un reset)
+DRAIN_MAX_BYTES = 1024 * 1024
+
+
+class ServiceBusy(Exception):
+    """Requête refusée par le contrôle d'admission"""
+
+    def __init__(self, status: int, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RequestError(Exception):
+    """Requête invalide (statut HTTP 4xx)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AdmissionControl:
+    """Borne le nombre d'OCR simultanés et la longueur de la file d'attente"""
+
+    def __init__(self, max_inflight: int, max_queued: int, queue_timeout_s: float):
+        self.max_inflight = max(1, max_inflight)
+        self.max_queued = max(0, max_queued)
+        self.queue_timeout_s = queue_timeout_s
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._waiting = 0
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Réserve un emplacement d'OCR ou lève ``ServiceBusy``"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queued:
+                    raise ServiceBusy(429, "Trop de requêtes en attente")
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout_s)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise ServiceBusy(503, "Service saturé : délai d'attente dépassé")
+        with self._held():
+            yield
+
+    @contextmanager
+    def reserve(self) -> Iterator[None]:
+        """Attend un emplacement d'OCR sans délai ni refus (jobs, déjà bornés par leur propre file)"""
+        self._slots.acquire()
+        with self._held():
+            yield
+
+    @contextmanager
+    def _held(self) -> Iterator[None]:
+        """Emplacement acquis : compté en cours, puis rendu"""
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'inflight': self._inflight, 'waiting': self._waiting,
+                    'max_inflight': self.max_inflight, 'max_queued': self.max_queued}
+
+
+class ExtractionService:
+    """État partagé du service : processeur chaud, cache, admission et file de jobs"""
+
+    def __init__(self, processor: OCRProcessor, admission: AdmissionControl,
+                 cache: Optional[OCRResultCache] = None, jobs: Optional[JobQueue] = None,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES):
+        self.processor = processor
+        self.admission = admission
+        self.cache = cache
+        self.jobs = jobs
+        self.max_body_bytes = max_body_bytes
+
+    def extract(self, file_bytes: bytes, filename: str, include_text: bool = True) -> Dict:
+        """Texte et champs d'un document (cache consulté avant l'OCR)"""
+        if not self.processor.is_supported(filename):
+            raise RequestError(415, f"Format non supporté : {filename}")
+        cache_key = make_cache_key(content_digest(file_bytes), self.processor.cache_signature,
+                                   self.processor.RULES_VERSION)
+        cached = self.cache.get(cache_key) if self.cache else None
+        if cached is not None:
+            result = {'text': cached['text'], 'data': cached['data'], 'confidence': cached.get('confidence'),
+                      'document_type': cached.get('document_type'), 'cached': True}
+        else:
+            with self.admission.admit():
+                result = self.processor.process_document(file_bytes, filename)
+            result['cached'] = False
+            if self.cache and result['text']:
+                self.cache.put(cache_key, result['text'], result['data'],
+                               {'confidence': result['confidence'], 'document_type': result['document_type'],
+                                'located': result['located']})
+        if not include_text:
+            result.pop('text', None)
+        return result
+
+    def submit_job(self, file_bytes: bytes, filename: str) -> str:
+        """Traitement asynchrone d'un document; le cache est consulté et alimenté comme par ``extract``"""
+        if not self.processor.is_supported(filename):
+            raise RequestError(415, f"Format non supporté : {filename}")
+        cache_key = make_cache_key(content_digest(file_bytes), self.processor.cache_signature,
+                                   self.processor.RULES_VERSION)
+        return self.jobs.submit(file_bytes, filename, cache_key)
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    server_version = "ocr-service/1.0"
+    protocol_version = "HTTP/1.1"
+    service: ExtractionService = None
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        length = self.headers.get("Content-Length")
+        if not self._body_read and length and length.isdigit() and int(length) <= DRAIN_MAX_BYTES:
+            self.rfile.read(int(length))
+            self._body_read = True
+        if not self._body_read:
+            # Corps non lu : la connexion ne peut pas être réutilisée
+            self.close_connection = True
+            headers = dict(headers or {}, Connection="close")
+        self._send_json(status, {'error': message}, headers)
+
+    def _read_body(self) -> bytes:
+        """Lit le corps par blocs (Content-Length ou Transfer-Encoding: chunked) dans la limite autorisée"""
+        limit = self.service.max_body_bytes
+        body = bytearray()
+        self._body_read = True
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                size_line = self.rfile.readline(1024).split(b";")[0].strip()
+                try:
+                    size = int(size_line, 16)
+                except ValueError:
+                    raise RequestError(400, "Encodage chunked invalide")
+                if size == 0:
+                    # Fin du corps : en-têtes de fin éventuels jusqu'à la ligne vide
+                    while self.rfile.readline(1024) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                if len(body) + size > limit:
+                    raise RequestError(413, f"Document trop volumineux (limite : {limit} octets)")
+                body += self.rfile.read(size)
+                self.rfile.readline(1024)
+            return bytes(body)
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise RequestError(411, "Content-Length ou Transfer-Encoding: chunked requis")
+        remaining = int(length)
+        if remaining > limit:
+            raise RequestError(413, f"Document trop volumineux (limite : {limit} octets)")
+        while remaining:
+            chunk = self.rfile.read(min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                raise RequestError(400, "Corps de requête incomplet")
+            body += chunk
+            remaining -= len(chunk)
+        return bytes(body)
+
+    def _filename(self, query: Dict) -> str:
+        filename = (query.get("filename") or [self.headers.get("X-Filename", "")])[0]
+        if not filename:
+            raise RequestError(400, "Paramètre filename requis (ex. ?filename=scan.pdf)")
+        return os.path.basename(filename)
+
+    def do_GET(self):
+        self._body_read = True
+        url = urlparse(self.path)
+        if url.path == "/healthz":
+            self._send_json(200, {'status': 'ok', 'admission': self.service.admission.stats(),
+                                  'jobs': self.service.jobs.stats() if self.service.jobs else None})
+        elif url.path == "/metrics":
+            body = METRICS.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path.startswith("/v1/jobs/") and self.service.jobs:
+            job = self.service.jobs.get(url.path.rsplit("/", 1)[-1])
+            if job is None:
+                self._send_error_json(404, "Job inconnu")
+            else:
+                self._send_json(200, job)
+        else:
+            self._send_error_json(404, "Route inconnue")
+
+    def do_POST(self):
+        self._body_read = False
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path == "/v1/extract":
+                filename = self._filename(query)
+                include_text = query.get("text", ["1"])[0] not in ("0", "false")
+                # Refus immédiat, avant la lecture du corps, si même la file d'attente est pleine
+                admission = self.service.admission.stats()
+                if admission['inflight'] >= admission['max_inflight'] and admission['waiting'] >= admission['max_queued']:
+                    raise ServiceBusy(429, "Trop de requêtes en attente")
+                file_bytes = self._read_body()
+                self._send_json(200, self.service.extract(file_bytes, filename, include_text))
+            elif url.path == "/v1/fields":
+                text = self._read_body().decode("utf-8", errors="replace")
+                processor = self.service.processor
+                routing = processor.route_text(text)
+                self._send_json(200, {'data': processor.extract_structured_data(text, pipeline=routing.pipeline),
+                                      'document_type': routing.report()})
+            elif url.path == "/v1/jobs" and self.service.jobs:
+                job_id = self.service.submit_job(self._read_body(), self._filename(query))
+                self._send_json(202, {'id': job_id, 'status_url': f"/v1/jobs/{job_id}"},
+                                {'Location': f"/v1/jobs/{job_id}"})
+            else:
+                self._send_error_json(404, "Route inconnue")
+        except ServiceBusy as e:
+            self._send_error_json(e.status, str(e), {'Retry-After': str(e.retry_after)})
+        except QueueFullError as e:
+            self._send_error_json(429, str(e), {'Retry-After': "5"})
+        except RequestError as e:
+            self._send_error_json(e.status, str(e))
+        except InputRejected as e:
+            self._send_error_json(413, str(e))
+        except OCRError as e:
+            self._send_error_json(422, str(e))
+        except Exception as e:
+            logger.exception("erreur inattendue sur %s", url.path)
+            self._send_error_json(500, f"Erreur interne : {e}")
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    """Serveur multi-thread (un thread par connexion)"""
+    daemon_threads = True
+    # File d'attente TCP : la valeur par défaut (5) fait attendre les clients en rafale
+    request_queue_size = 128
+
+
+def create_server(host: str, port: int, service: ExtractionService) -> ExtractionServer:
+    """Serveur lié au service"""
+    handler = type("BoundExtractionHandler", (ExtractionHandler,), {'service': service})
+    return ExtractionServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-inflight', type=int, default=os.cpu_count() or 1,
+                        help="Documents OCR traités simultanément")
+    parser.add_argument('--max-queued', type=int, default=16,
+                        help="Requêtes en attente d'un emplacement avant refus (429)")
+    parser.add_argument('--queue-timeout', type=float, default=30.0,
+                        help="Attente maximale d'un emplacement, en secondes, avant refus (503)")
+    parser.add_argument('--max-body-mb', type=float, default=DEFAULT_MAX_BODY_BYTES / 2 ** 20,
+                        help="Taille maximale d'un document")
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help="Pages OCR en parallèle par document (la concurrence vient des requêtes)")
+    parser.add_argument('--ocr-backend', default="auto", choices=["auto", "tesserocr", "pytesseract"])
+    parser.add_argument('--job-workers', type=int, default=2, help="Workers des traitements asynchrones")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Dossier du cache de résultats")
+    parser.add_argument('--no-cache', action='store_true', help="Désactive le cache de résultats")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Journalise chaque requête")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    # Un moteur Tesseract par page OCR simultanée, tous chargés dès le démarrage
+    page_workers = max(1, args.page_workers)
+    processor = OCRProcessor(page_workers=page_workers, ocr_backend=args.ocr_backend,
+                             ocr_pool_size=args.max_inflight * page_workers)
+    warm_up = getattr(processor.ocr_backend, "warm_up", None)
+    if warm_up:
+        warm_up()
+    cache = None if args.no_cache else OCRResultCache(args.cache_dir)
+    # Requêtes synchrones et jobs partagent les emplacements : au plus max_inflight OCR, un moteur chacun
+    admission = AdmissionControl(args.max_inflight, args.max_queued, args.queue_timeout)
+    service = ExtractionService(
+        processor,
+        admission,
+        cache=cache,
+        jobs=JobQueue(processor, workers=args.job_workers, result_cache=cache, admission=admission),
+        max_body_bytes=int(args.max_body_mb * 2 ** 20),
+    )
+    server = create_server(args.host, args.port, service)
+    print(f"Service d'extraction sur http://{args.host}:{args.port} "
+          f"({args.max_inflight} OCR simultanés, file de {args.max_queued})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.jobs.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
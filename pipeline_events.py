@@ -0,0 +1,38 @@
+"""Événements d'avancement du pipeline OCR (module léger, sans dépendance lourde)"""
+
+import logging
+from typing import Callable, NamedTuple, Optional
+
+logger = logging.getLogger("ocr_processor")
+
+
+# Étapes du traitement, dans l'ordre où elles sont signalées
+STAGE_LOAD = "load"
+STAGE_PREPROCESSING = "preprocessing"
+STAGE_PAGE = "page"
+STAGE_EXTRACTION = "extraction"
+STAGE_DONE = "done"
+
+
+class ProgressEvent(NamedTuple):
+    """Avancement réel du traitement d'un document"""
+    stage: str
+    progress: float
+    message: str
+    page: Optional[int] = None
+    page_count: Optional[int] = None
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+def log_progress(event: ProgressEvent):
+    """Callback d'avancement qui journalise les événements"""
+    logger.debug("%s %.0f%% %s", event.stage, event.progress * 100, event.message)
+
+
+def emit_progress(on_progress: Optional[ProgressCallback], stage: str, progress: float, message: str,
+                  page: Optional[int] = None, page_count: Optional[int] = None):
+    """Transmet un événement au callback, s'il y en a un"""
+    if on_progress is not None:
+        on_progress(ProgressEvent(stage, progress, message, page, page_count))
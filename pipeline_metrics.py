@@ -0,0 +1,243 @@
+"""Instrumentation du pipeline : compteurs, histogrammes de latence et octets traités par étape.
+
+Module léger (bibliothèque standard uniquement). Les mesures sont exportables au
+format texte Prometheus, et un profileur optionnel conserve les profils cProfile
+des documents les plus lents.
+"""
+
+import bisect
+import cProfile
+import heapq
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Bornes supérieures des histogrammes, en secondes
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Étapes instrumentées par OCRProcessor
+STAGE_DECODE = "decode"
+STAGE_RENDER = "render"
+STAGE_PREPROCESS = "preprocess"
+STAGE_OCR = "ocr"
+STAGE_REOCR = "reocr"
+STAGE_FIELDS = "extraction"
+STAGE_LAYOUT = "layout"
+STAGE_ANCHOR = "anchor"
+STAGE_ZONES = "zones"
+STAGE_CLASSIFY = "classify"
+STAGE_DOCUMENT = "document"
+
+# Phases de rendu de l'interface Streamlit
+STAGE_UI_RUN = "ui_run"
+STAGE_UI_WORKFLOW = "ui_workflow"
+STAGE_UI_PREVIEW = "ui_preview"
+STAGE_UI_QUALITY = "ui_quality"
+
+
+class StageMetrics:
+    """Compteurs et histogramme d'une étape"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.bytes = 0
+
+    def observe(self, seconds: float, nbytes: int = 0, error: bool = False):
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.errors += error
+        self.total_seconds += seconds
+        self.bytes += nbytes
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile estimé (borne supérieure du seau qui le contient), en secondes"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Mesures par étape, partagées entre threads"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._stages: Dict[str, StageMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, nbytes: int = 0, error: bool = False):
+        """Enregistre une exécution d'étape"""
+        with self._lock:
+            metrics = self._stages.get(stage)
+            if metrics is None:
+                metrics = self._stages[stage] = StageMetrics(self.buckets)
+            metrics.observe(seconds, nbytes, error)
+
+    @contextmanager
+    def time(self, stage: str, nbytes: int = 0) -> Iterator[None]:
+        """Chronomètre le bloc; une exception (hors arrêt/rerun Streamlit) est comptée comme erreur puis propagée"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, nbytes, error)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Résumé par étape : nombre, erreurs, latences (ms) et octets"""
+        with self._lock:
+            summary = {}
+            for stage, metrics in sorted(self._stages.items()):
+                p50, p95 = metrics.quantile(0.5), metrics.quantile(0.95)
+                summary[stage] = {
+                    'count': metrics.count,
+                    'errors': metrics.errors,
+                    'mean_ms': round(metrics.total_seconds / metrics.count * 1000, 3),
+                    'p50_ms': None if p50 is None else p50 * 1000,
+                    'p95_ms': None if p95 is None else p95 * 1000,
+                    'bytes': metrics.bytes,
+                }
+            return summary
+
+    def render_prometheus(self, prefix: str = "ocr") -> str:
+        """Mesures au format d'exposition texte Prometheus"""
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Durée des étapes du pipeline OCR",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for stage, metrics in stages:
+                cumulative = 0
+                for bound, count in zip(self.buckets, metrics.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {metrics.count}')
+                lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {metrics.total_seconds:.6f}')
+                lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {metrics.count}')
+            lines.append(f"# HELP {prefix}_stage_errors_total Exécutions d'étape terminées en erreur")
+            lines.append(f"# TYPE {prefix}_stage_errors_total counter")
+            lines.extend(f'{prefix}_stage_errors_total{{stage="{stage}"}} {m.errors}' for stage, m in stages)
+            lines.append(f"# HELP {prefix}_stage_bytes_total Octets traités par étape")
+            lines.append(f"# TYPE {prefix}_stage_bytes_total counter")
+            lines.extend(f'{prefix}_stage_bytes_total{{stage="{stage}"}} {m.bytes}' for stage, m in stages)
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+# Registre du processus, utilisé par défaut par OCRProcessor et l'application
+METRICS = MetricsRegistry()
+
+
+class SlowestProfiles:
+    """Conserve les profils cProfile des ``keep`` documents les plus lents.
+
+    cProfile n'observe que le thread appelant : l'OCR des pages, fait dans le
+    pool de threads, apparaît comme de l'attente. Un seul document est profilé
+    à la fois; les autres sont traités normalement pendant ce temps.
+    """
+
+    def __init__(self, keep: int = 5, output_dir: Optional[str] = None, top_functions: int = 25):
+        self.keep = keep
+        self.output_dir = output_dir
+        self.top_functions = top_functions
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[None]:
+        """Profile le bloc et le garde s'il fait partie des plus lents"""
+        if not self._active.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            self._record(label, time.perf_counter() - start, profiler)
+        finally:
+            self._active.release()
+
+    def _record(self, label: str, seconds: float, profiler: cProfile.Profile):
+        with self._lock:
+            if len(self._heap) >= self.keep and seconds <= self._heap[0][0]:
+                return
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(self.top_functions)
+        order = next(self._counter)
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.output_dir, f"{order:05d}_{seconds:.3f}s.prof"))
+        with self._lock:
+            entry = (seconds, order, label, output.getvalue())
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heappushpop(self._heap, entry)
+
+    def entries(self) -> List[Dict]:
+        """Profils conservés, du plus lent au plus rapide"""
+        with self._lock:
+            ordered = sorted(self._heap, reverse=True)
+        return [{'label': label, 'seconds': seconds, 'stats': stats} for seconds, _, label, stats in ordered]
+
+
+def create_profiler(keep: Optional[int] = None, output_dir: Optional[str] = None) -> Optional[SlowestProfiles]:
+    """Profileur des N documents les plus lents (``OCR_PROFILE_SLOWEST`` par défaut); None si désactivé"""
+    if keep is None:
+        keep = int(os.environ.get("OCR_PROFILE_SLOWEST", "0") or 0)
+    if keep <= 0:
+        return None
+    return SlowestProfiles(keep, output_dir or os.environ.get("OCR_PROFILE_DIR") or None)
+
+
+def start_metrics_server(port: int, registry: MetricsRegistry = METRICS,
+                         host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Expose ``/metrics`` (format Prometheus) dans un thread en arrière-plan"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,152 @@
+"""Ré-extraction des champs enregistrés à partir du texte OCR conservé, sans nouvel OCR.
+
+Après une modification des patterns (``RULES_VERSION`` incrémentée), seuls les
+documents dont les champs viennent d'une autre version sont repris. Ils sont lus
+dans la base par lots, ré-extraits en parallèle par un pool de processus, et chaque
+lot est écrit dans sa propre transaction : une ré-extraction interrompue reprend
+là où elle s'était arrêtée. Les documents validés ne sont jamais modifiés.
+
+Exemples :
+    python reextract.py --db data/results.sqlite3 --workers 8
+    python reextract.py --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from document_types import PIPELINES, SOURCE_TEXT, DocumentClassifier, route
+from field_extraction import FIELDS, RULES_VERSION
+from result_store import DEFAULT_DB_PATH, ResultStore, normalize_date
+
+# Classement des documents, créé une fois par processus
+_classifier: Optional[DocumentClassifier] = None
+
+
+def reextract_text(text: str, located: Optional[Dict] = None, document_type: Optional[str] = None) -> Tuple[Dict, str]:
+    """Champs d'un texte enregistré et type de document retenu.
+
+    Comme lors du traitement d'origine, les champs trouvés par position (``located``)
+    sont prioritaires; les patterns du type de document complètent les autres. Le type
+    retenu à l'origine (``document_type``) est repris tel quel : il a été classé sur la
+    première page, pas sur le texte complet. Un document enregistré sans son type est
+    classé sur son texte.
+    """
+    global _classifier
+    pipeline = PIPELINES.get(document_type)
+    if pipeline is None:
+        if _classifier is None:
+            _classifier = DocumentClassifier()
+        pipeline = route(_classifier, text, SOURCE_TEXT).pipeline
+    data = dict(pipeline.extractor.empty_result(), **(located or {}))
+    return pipeline.extractor.extract(text, data), pipeline.name
+
+
+def reextract_rows(rows: List[Dict]) -> List[Dict]:
+    """Mises à jour d'un lot de documents (voir ``ResultStore.update_extractions``)"""
+    updates = []
+    for row in rows:
+        located = json.loads(row['located_json']) if row['located_json'] is not None else None
+        data, document_type = reextract_text(row['extracted_text'], located, row['document_type'])
+        if located is None:
+            # Document enregistré avant la conservation des champs trouvés par position :
+            # ses valeurs actuelles sont gardées là où les nouvelles règles ne trouvent rien
+            data = {field: data.get(field) or row[field] for field in FIELDS}
+        values = {field: data.get(field) or None for field in FIELDS}
+        updates.append({
+            'id': row['id'],
+            'previous_version': row['rules_version'],
+            **values,
+            'date_iso': normalize_date(values['date']),
+            'extracted_json': json.dumps(data, ensure_ascii=False),
+            'rules_version': RULES_VERSION,
+            'document_type': document_type,
+            'changed': any(values[field] != row[field] for field in FIELDS),
+        })
+    return updates
+
+
+def reextract(store: ResultStore, workers: int = 1, chunk_size: int = 1000, limit: Optional[int] = None,
+              on_chunk: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Ré-extrait les documents périmés de ``store``; retourne les statistiques.
+
+    ``workers`` processus traitent les lots (1 : dans le processus courant); au plus
+    deux lots par processus sont en attente d'écriture. ``on_chunk`` reçoit les
+    statistiques après chaque lot écrit.
+    """
+    stats = {'documents': 0, 'updated': 0, 'changed': 0, 'skipped': 0}
+    start = time.perf_counter()
+
+    def write(updates: List[Dict]):
+        # Les documents aux champs modifiés sont écrits à part, pour ne compter que ceux réellement mis à jour
+        changed = store.update_extractions([update for update in updates if update['changed']])
+        written = changed + store.update_extractions([update for update in updates if not update['changed']])
+        stats['documents'] += len(updates)
+        stats['updated'] += written
+        # Validé ou modifié entre la lecture et l'écriture : laissé tel quel
+        stats['skipped'] += len(updates) - written
+        stats['changed'] += changed
+        if on_chunk:
+            on_chunk(dict(stats))
+
+    def chunks():
+        remaining = limit
+        for rows in store.iter_stale(RULES_VERSION, chunk_size):
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            if rows:
+                yield rows
+            if remaining is not None and remaining <= 0:
+                return
+
+    if workers <= 1:
+        for rows in chunks():
+            write(reextract_rows(rows))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for rows in chunks():
+                pending.append(executor.submit(reextract_rows, rows))
+                # Lots écrits dans l'ordre de lecture; fenêtre bornée de lots en vol
+                while pending and (pending[0].done() or len(pending) >= workers * 2):
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    stats['elapsed_s'] = round(elapsed, 3)
+    stats['docs_per_s'] = round(stats['documents'] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Base des extractions")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Documents lus et écrits par lot")
+    parser.add_argument('--limit', type=int, help="Nombre maximal de documents repris")
+    parser.add_argument('--dry-run', action='store_true', help="Compte les documents à reprendre sans les modifier")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.db)
+    try:
+        if args.dry_run:
+            stats = {'stale': store.count_stale(RULES_VERSION), 'rules_version': RULES_VERSION}
+        else:
+            stats = reextract(store, max(1, args.workers), max(1, args.chunk_size), args.limit)
+            stats['rules_version'] = RULES_VERSION
+    finally:
+        store.close()
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
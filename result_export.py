@@ -0,0 +1,132 @@
+"""Export en masse des extractions enregistrées, en JSONL ou en Parquet, par lots.
+
+Les documents sont lus dans la base par lots de ``chunk_size`` et écrits au fur
+et à mesure (une ligne JSON par document, ou un row group Parquet par lot) :
+la mémoire utilisée reste constante quel que soit le nombre de documents.
+
+Exemples :
+    python result_export.py -o data/exports/2023-03.parquet --since 2023-03-01 --until 2023-03-31
+    python result_export.py -o data/exports/jour.jsonl --since 2023-03-15 --until 2023-03-15 --text
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from field_extraction import FIELDS
+from result_store import DEFAULT_DB_PATH, ResultStore
+
+FORMAT_JSONL = "jsonl"
+FORMAT_PARQUET = "parquet"
+
+
+def _pyarrow():
+    """Import à la demande : pyarrow n'est chargé que pour un export Parquet"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow n'est pas installé (pip install pyarrow)")
+    return pyarrow
+
+
+def parquet_schema(include_text: bool = False):
+    """Schéma fixe des exports Parquet : il ne dépend pas des valeurs rencontrées"""
+    pa = _pyarrow()
+    columns = [
+        ("id", pa.int64()),
+        ("sha256", pa.string()),
+        ("filename", pa.string()),
+        ("created_at", pa.timestamp("s")),
+        ("updated_at", pa.timestamp("s")),
+        ("status", pa.string()),
+        ("rules_version", pa.string()),
+        *((field, pa.string()) for field in FIELDS),
+        ("date_iso", pa.date32()),
+        ("confidence", pa.float64()),
+    ]
+    if include_text:
+        columns.append(("extracted_text", pa.string()))
+    return pa.schema(columns)
+
+
+def _typed(row: Dict) -> Dict:
+    """Convertit les dates texte de la base en types Arrow"""
+    return dict(
+        row,
+        created_at=datetime.datetime.fromisoformat(row['created_at']),
+        updated_at=datetime.datetime.fromisoformat(row['updated_at']),
+        date_iso=datetime.date.fromisoformat(row['date_iso']) if row['date_iso'] else None,
+    )
+
+
+def export_jsonl(chunks: Iterable[List[Dict]], out) -> int:
+    """Écrit un document JSON par ligne dans ``out``; retourne le nombre de documents"""
+    rows = 0
+    for chunk in chunks:
+        out.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk))
+        rows += len(chunk)
+    return rows
+
+
+def export_parquet(chunks: Iterable[List[Dict]], path: str, include_text: bool = False,
+                   compression: str = "zstd") -> int:
+    """Écrit un fichier Parquet, un row group par lot; retourne le nombre de documents"""
+    pa = _pyarrow()
+    schema = parquet_schema(include_text)
+    rows = 0
+    with pa.parquet.ParquetWriter(path, schema, compression=compression) as writer:
+        for chunk in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist([_typed(row) for row in chunk], schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def export_documents(store: ResultStore, path: str, fmt: Optional[str] = None, since: Optional[str] = None,
+                     until: Optional[str] = None, include_text: bool = False, chunk_size: int = 1000) -> int:
+    """Exporte les documents de la période vers ``path`` (format déduit de l'extension par défaut)"""
+    fmt = fmt or (FORMAT_PARQUET if path.endswith(".parquet") else FORMAT_JSONL)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    chunks = store.iter_documents(since, until, include_text, chunk_size)
+    # Écriture dans un fichier temporaire : un export interrompu ne laisse pas de fichier tronqué
+    tmp_path = f"{path}.tmp"
+    try:
+        if fmt == FORMAT_PARQUET:
+            rows = export_parquet(chunks, tmp_path, include_text)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                rows = export_jsonl(chunks, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', required=True, help="Fichier de sortie (.jsonl ou .parquet)")
+    parser.add_argument('--format', choices=[FORMAT_JSONL, FORMAT_PARQUET],
+                        help="Format de sortie (défaut : selon l'extension)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Base des extractions")
+    parser.add_argument('--since', help="Documents enregistrés à partir de cette date (AAAA-MM-JJ)")
+    parser.add_argument('--until', help="Documents enregistrés jusqu'à cette date incluse (AAAA-MM-JJ)")
+    parser.add_argument('--text', action='store_true', help="Inclut le texte OCR complet")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Documents lus et écrits par lot")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.db)
+    try:
+        rows = export_documents(store, args.output, args.format, args.since, args.until, args.text,
+                                max(1, args.chunk_size))
+    finally:
+        store.close()
+    print(json.dumps({'documents': rows, 'output': args.output}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""Base SQLite des extractions : champs indexés (SIRET, référence, date) et recherche plein texte (FTS5).
+
+Un document est identifié par l'empreinte SHA-256 de son contenu; l'enregistrer
+à nouveau met à jour la ligne existante, sauf si elle a été validée et que la
+nouvelle version ne l'est pas. Les écritures groupées (``save_many``)
+sont faites par transactions de ``batch_size`` lignes.
+
+Le texte OCR est conservé avec la configuration OCR qui l'a produit
+(``ocr_signature``), et les champs avec la version des règles d'extraction
+(``rules_version``) : après une modification des patterns, les champs sont
+recalculés à partir du texte enregistré (voir ``reextract.py``), sans nouvel OCR.
+"""
+
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from field_extraction import FIELDS, RULES_VERSION
+
+DEFAULT_DB_PATH = os.path.join("data", "results.sqlite3")
+
+STATUS_EXTRACTED = "extracted"
+STATUS_VALIDATED = "validated"
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    filename TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rules_version TEXT,
+    {", ".join(f"{field} TEXT" for field in FIELDS)},
+    date_iso TEXT,
+    confidence REAL,
+    extracted_json TEXT,
+    extracted_text TEXT NOT NULL DEFAULT '',
+    ocr_signature TEXT,
+    located_json TEXT,
+    document_type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_siret ON documents(numero_siret);
+CREATE INDEX IF NOT EXISTS idx_documents_reference ON documents(numero_reference);
+CREATE INDEX IF NOT EXISTS idx_documents_date ON documents(date_iso);
+"""
+
+# Colonnes ajoutées depuis la création du schéma (bases existantes mises à niveau à l'ouverture)
+_ADDED_COLUMNS = (("ocr_signature", "TEXT"), ("located_json", "TEXT"), ("document_type", "TEXT"))
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_documents_rules ON documents(rules_version);
+"""
+
+# Index plein texte externe (le texte n'est pas dupliqué), tenu à jour par triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    extracted_text, content='documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF extracted_text ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text);
+    INSERT INTO documents_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text);
+END;
+"""
+
+# Colonnes renvoyées par les recherches (le texte intégral n'est lu que par ``get``)
+SUMMARY_COLUMNS = ("id", "sha256", "filename", "updated_at", "status") + FIELDS + ("confidence",)
+
+# Colonnes des exports en masse : métadonnées puis champs extraits
+EXPORT_COLUMNS = ("id", "sha256", "filename", "created_at", "updated_at", "status", "rules_version") + FIELDS + (
+    "date_iso", "confidence")
+
+_DATE = re.compile(r"^\s*(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{2,4})\s*$")
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """Date JJ/MM/AAAA (ou variantes) au format ISO, pour l'index et les recherches par période"""
+    match = _DATE.match(value or "")
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def make_record(sha256: str, filename: str, text: str, data: Dict, extracted: Optional[Dict] = None,
+                validated: bool = False, confidence: Optional[float] = None,
+                rules_version: str = RULES_VERSION, located: Optional[Dict] = None,
+                ocr_signature: Optional[str] = None, document_type: Optional[str] = None) -> Dict:
+    """Ligne à enregistrer : ``data`` sont les valeurs retenues, ``extracted`` celles de l'OCR.
+
+    ``located`` : champs trouvés par position (mise en page, zones d'un gabarit), que le
+    texte seul ne permet pas de retrouver; ils sont gardés pour les ré-extractions, comme
+    ``document_type`` (type retenu par l'aiguillage d'origine, voir ``document_types``).
+    """
+    return {
+        'sha256': sha256,
+        'filename': filename,
+        'status': STATUS_VALIDATED if validated else STATUS_EXTRACTED,
+        'rules_version': rules_version,
+        **{field: data.get(field) or None for field in FIELDS},
+        'date_iso': normalize_date(data.get('date')),
+        'confidence': confidence,
+        'extracted_json': json.dumps(extracted if extracted is not None else data, ensure_ascii=False),
+        'extracted_text': text or "",
+        'ocr_signature': ocr_signature,
+        'located_json': json.dumps(located or {}, ensure_ascii=False),
+        'document_type': document_type,
+    }
+
+
+def fts_query(terms: str) -> str:
+    """Requête FTS5 à partir d'une saisie libre : chaque mot entre guillemets, tous requis"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in terms.split())
+
+
+class ResultStore:
+    """Accès à la base; une connexion partagée entre threads, protégée par un verrou"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            for column, kind in _ADDED_COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {kind}")
+            self._conn.executescript(_INDEXES)
+            try:
+                self._conn.executescript(_FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError:
+                # SQLite compilé sans FTS5 : recherche par LIKE (lente sur de gros volumes)
+                self.full_text = False
+
+        columns = ("sha256", "filename", "status", "rules_version") + FIELDS + (
+            "date_iso", "confidence", "extracted_json", "extracted_text", "ocr_signature", "located_json",
+            "document_type")
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "sha256")
+        self._upsert = (
+            f"INSERT INTO documents ({', '.join(columns)}, created_at, updated_at) "
+            f"VALUES ({', '.join(':' + column for column in columns)}, :now, :now) "
+            f"ON CONFLICT(sha256) DO UPDATE SET {updates}, updated_at = excluded.updated_at "
+            # Une extraction automatique ne remplace jamais un document validé
+            f"WHERE documents.status != '{STATUS_VALIDATED}' OR excluded.status = '{STATUS_VALIDATED}'"
+        )
+
+    def save(self, record: Dict) -> int:
+        """Enregistre (ou met à jour) un document; retourne son identifiant"""
+        self.save_many([record])
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE sha256 = ?", (record['sha256'],)).fetchone()
+        return row['id']
+
+    def save_many(self, records: Iterable[Dict]) -> int:
+        """Enregistre des documents par transactions de ``batch_size`` lignes; retourne le nombre écrit
+        (sans les documents validés, qu'un résultat automatique ne remplace pas)"""
+        written = 0
+        batch: List[Dict] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                written += self._write(batch)
+                batch = []
+        if batch:
+            written += self._write(batch)
+        return written
+
+    def _write(self, batch: List[Dict]) -> int:
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            # rowcount ne compte ni les lignes écartées par le WHERE de l'upsert, ni celles des déclencheurs FTS
+            return self._conn.executemany(self._upsert, [dict(record, now=now) for record in batch]).rowcount
+
+    def _summaries(self, where: str, params: tuple, limit: int, order: str = "updated_at DESC") -> List[Dict]:
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM documents WHERE {where} ORDER BY {order} LIMIT ?"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params + (limit,))]
+
+    def find_by_siret(self, siret: str, limit: int = 100) -> List[Dict]:
+        """Documents d'un SIRET (espaces ignorés)"""
+        return self._summaries("numero_siret = ?", (re.sub(r"\s", "", siret),), limit)
+
+    def find_by_reference(self, reference: str, limit: int = 100) -> List[Dict]:
+        return self._summaries("numero_reference = ?", (reference.strip(),), limit)
+
+    def find_by_date(self, start: str, end: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Documents datés entre ``start`` et ``end`` inclus (JJ/MM/AAAA ou AAAA-MM-JJ)"""
+        start_iso = normalize_date(start) or start
+        end_iso = normalize_date(end) or end or start_iso
+        return self._summaries("date_iso BETWEEN ? AND ?", (start_iso, end_iso), limit, "date_iso, id")
+
+    def search(self, terms: str, limit: int = 50) -> List[Dict]:
+        """Recherche plein texte; chaque résultat porte un extrait (``snippet``) du texte"""
+        if not terms.strip():
+            return []
+        columns = ", ".join(f"d.{column}" for column in SUMMARY_COLUMNS)
+        with self._lock:
+            if self.full_text:
+                rows = self._conn.execute(
+                    f"SELECT {columns}, snippet(documents_fts, 0, '[', ']', '…', 12) AS snippet "
+                    f"FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+                    f"WHERE documents_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (fts_query(terms), limit))
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {columns}, substr(d.extracted_text, 1, 120) AS snippet FROM documents d "
+                    f"WHERE d.extracted_text LIKE ? ORDER BY d.updated_at DESC LIMIT ?",
+                    (f"%{terms.strip()}%", limit))
+            return [dict(row) for row in rows]
+
+    def get(self, document_id: int) -> Optional[Dict]:
+        """Document complet (texte et extraction d'origine compris)"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE id = ?", (document_id,)).fetchone()
+        if row is None:
+            return None
+        document = dict(row)
+        document['extracted'] = json.loads(document.pop('extracted_json') or "{}")
+        document['located'] = json.loads(document.pop('located_json') or "{}")
+        return document
+
+    def get_by_hash(self, sha256: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+        return self.get(row['id']) if row else None
+
+    def iter_documents(self, since: Optional[str] = None, until: Optional[str] = None,
+                       include_text: bool = False, chunk_size: int = 1000) -> Iterator[List[Dict]]:
+        """Documents enregistrés (ou mis à jour) entre ``since`` et ``until`` inclus (AAAA-MM-JJ), par lots.
+
+        Parcours par identifiant croissant, une requête par lot : la mémoire
+        utilisée ne dépend pas du nombre total de documents.
+        """
+        columns = EXPORT_COLUMNS + (("extracted_text",) if include_text else ())
+        where, params = ["id > ?"], []
+        if since:
+            where.append("updated_at >= ?")
+            params.append(since)
+        if until:
+            where.append("updated_at < ?")
+            params.append((datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat())
+        sql = f"SELECT {', '.join(columns)} FROM documents WHERE {' AND '.join(where)} ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = [dict(row) for row in self._conn.execute(sql, [last_id] + params + [chunk_size])]
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]['id']
+
+    def count_stale(self, rules_version: str = RULES_VERSION) -> int:
+        """Documents non validés dont les champs viennent d'une autre version des règles"""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM documents WHERE rules_version IS NOT ? AND status != '{STATUS_VALIDATED}'",
+                (rules_version,)).fetchone()[0]
+
+    def iter_stale(self, rules_version: str = RULES_VERSION, chunk_size: int = 1000) -> Iterator[List[Dict]]:
+        """Documents à ré-extraire (texte, champs par position, type...), par lots d'identifiants croissants"""
+        sql = (f"SELECT id, rules_version, {', '.join(FIELDS)}, extracted_text, located_json, document_type "
+               f"FROM documents "
+               f"WHERE id > ? AND rules_version IS NOT ? AND status != '{STATUS_VALIDATED}' ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = [dict(row) for row in self._conn.execute(sql, (last_id, rules_version, chunk_size))]
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]['id']
+
+    def update_extractions(self, updates: List[Dict]) -> int:
+        """Remplace les champs de documents ré-extraits, en une transaction; retourne le nombre mis à jour.
+
+        Chaque mise à jour porte ``id``, ``previous_version`` (version lue) et les colonnes
+        de ``make_record`` liées aux champs. Un document validé ou modifié entre-temps
+        (autre version) n'est pas touché.
+        """
+        if not updates:
+            return 0
+        columns = FIELDS + ("date_iso", "extracted_json", "rules_version", "document_type")
+        sql = (f"UPDATE documents SET {', '.join(f'{column} = :{column}' for column in columns)}, "
+               f"updated_at = :now WHERE id = :id AND rules_version IS :previous_version "
+               f"AND status != '{STATUS_VALIDATED}'")
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(sql, [dict(update, now=now) for update in updates])
+            return self._conn.total_changes - before
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,76 @@
+"""Lot de documents de l'interface (document_batch.py)"""
+
+from types import SimpleNamespace
+
+from document_batch import (
+    COLUMN_ID, COLUMN_VALIDATED, FIELD_COLUMNS, ITEM_DONE, ITEM_SAVED, ITEM_WAITING, DocumentBatch
+)
+from field_extraction import FIELDS
+from result_store import ResultStore
+
+NOM = FIELD_COLUMNS['nom']
+
+
+def upload(name):
+    return SimpleNamespace(filename=name, digest=name[0] * 64, view=memoryview(b""))
+
+
+def result(nom):
+    return {'text': f"Nom : {nom}", 'data': dict(dict.fromkeys(FIELDS), nom=nom)}
+
+
+def make_batch():
+    batch = DocumentBatch()
+    batch.add(upload("a.pdf"), "ka", result("Moreau"))
+    batch.add(upload("b.pdf"), "kb", result("Bernard"))
+    batch.add(upload("c.pdf"), "kc")
+    batch.add(upload("d.pdf"), "kd", result("Dupont"))
+    return batch
+
+
+def test_edits_follow_the_document_number_not_the_row_position():
+    batch = make_batch()
+    rows = batch.rows(NOM)
+    assert [row[COLUMN_ID] for row in rows] == [2, 4, 1, 3]
+    # Grille triée par nom : la première ligne affichée est le document n° 2
+    rows[0][NOM] = "  Bertrand "
+    rows[0][COLUMN_VALIDATED] = True
+    batch.apply_edits(reversed(rows))
+
+    assert batch.items[1].data['nom'] == "Bertrand"
+    assert batch.items[1].extracted['nom'] == "Bernard"
+    assert [item.validated for item in batch.items] == [False, True, False, False]
+    assert batch.items[0].data['nom'] == "Moreau"
+
+
+def test_edits_of_unfinished_documents_are_ignored():
+    batch = make_batch()
+    row = batch.items[2].row()
+    row[NOM] = "Martin"
+    row[COLUMN_VALIDATED] = True
+    batch.apply_edits([row])
+    assert batch.items[2].state == ITEM_WAITING
+    assert batch.items[2].data['nom'] is None and not batch.items[2].validated
+
+
+def test_emptied_cell_clears_the_field():
+    batch = make_batch()
+    row = batch.items[0].row()
+    row[NOM] = "   "
+    batch.apply_edits([row])
+    assert batch.items[0].data['nom'] is None
+
+
+def test_save_writes_validated_documents_once():
+    batch = make_batch()
+    rows = batch.rows()
+    for row in rows[:2]:
+        row[COLUMN_VALIDATED] = True
+    batch.apply_edits(rows)
+
+    store = ResultStore(":memory:")
+    assert batch.save(store) == 2
+    assert [item.state for item in batch.items] == [ITEM_SAVED, ITEM_SAVED, ITEM_WAITING, ITEM_DONE]
+    assert batch.validated_items() == []
+    assert store.get_by_hash("b" * 64)['nom'] == "Bernard"
+    store.close()
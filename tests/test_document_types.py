@@ -0,0 +1,60 @@
+"""Classement des documents et aiguillage (document_types.py)"""
+
+import pytest
+
+from document_types import (
+    GENERIC, PIPELINES, SOURCE_FIRST_PAGE_OCR, SOURCE_TEXT_LAYER, DocumentClassifier, default_routing, route
+)
+
+FACTURE = ("FACTURE N° F-2023-118\nDate d'échéance : 30/04/2023\n"
+           "Total HT : 100,00 €\nTVA 20 % : 20,00 €\nTotal TTC : 120,00 €")
+AVIS = "DIRECTION GÉNÉRALE DES FINANCES PUBLIQUES\nAVIS DE SITUATION\nNom : Dupont\nMontant dû : 120,00 €"
+COURRIER = "Madame, Monsieur,\nNous accusons réception de votre courrier du 12 mars.\nCordialement"
+
+
+@pytest.mark.parametrize("text, expected", [(FACTURE, 'facture'), (AVIS, 'avis'), (COURRIER, GENERIC)])
+def test_sample_texts_are_classified(text, expected):
+    assert DocumentClassifier().classify(text).type == expected
+
+
+def test_keywords_match_without_accents_or_case():
+    classification = DocumentClassifier().classify("carte nationale d’IDENTITÉ — Né le 01/02/1990")
+    assert classification.type == 'identite'
+    assert classification.score == 4 + 1
+
+
+def test_weak_evidence_falls_back_to_generic():
+    # « TVA » seule (poids 2) reste sous le score minimal
+    classification = DocumentClassifier().classify("Numéro de TVA intracommunautaire : FR12345678901")
+    assert (classification.type, classification.score) == (GENERIC, 0)
+    assert classification.scores['facture'] == 2
+
+
+def test_only_the_beginning_of_the_text_is_classified():
+    assert DocumentClassifier().classify(COURRIER + "x" * 2000 + FACTURE).type == GENERIC
+    assert DocumentClassifier(max_chars=5000).classify(COURRIER + "x" * 2000 + FACTURE).type == 'facture'
+
+
+def test_routing_from_the_text_layer():
+    routing = route(DocumentClassifier(), FACTURE, SOURCE_TEXT_LAYER, sample_seconds=0.002)
+    assert routing.pipeline is PIPELINES['facture']
+    report = routing.report()
+    assert (report['type'], report['source'], report['psm']) == ('facture', SOURCE_TEXT_LAYER, 4)
+    assert "gabarits" in report['skipped'] and "champ nom" in report['skipped']
+    assert report['sample_ms'] == 2.0
+    assert report['routing_ms'] == pytest.approx(report['classify_ms'] + 2.0, abs=0.01)
+
+
+def test_routing_from_the_first_page_ocr():
+    routing = route(DocumentClassifier(), FACTURE, SOURCE_FIRST_PAGE_OCR)
+    report = routing.report()
+    assert report['source'] == SOURCE_FIRST_PAGE_OCR
+    assert report['sample_ms'] == 0.0
+    # La page 1 a été lue avec les réglages génériques : seules les pages suivantes en profitent
+    assert "gabarits (pages suivantes)" in report['skipped']
+
+
+def test_default_routing_is_generic():
+    routing = default_routing()
+    assert routing.pipeline is PIPELINES[GENERIC]
+    assert routing.report()['skipped'] == []
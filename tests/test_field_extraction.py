@@ -0,0 +1,61 @@
+"""Extraction des champs par patterns (field_extraction.py)"""
+
+import os
+import random
+
+import pymupdf as fitz
+import pytest
+
+from benchmarks.corpus import form_lines, make_document, make_record
+from field_extraction import FIELD_PATTERNS, FIELDS, FieldExtractor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def baseline(text):
+    """Extraction d'origine : chaque pattern appliqué au texte entier, sans préfiltre de libellés"""
+    data = dict.fromkeys(FIELDS)
+    for field, pattern in FIELD_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            data[field] = match.group(1).strip()
+    return data
+
+
+def corpus_texts():
+    rng = random.Random(0)
+    for _ in range(20):
+        record = make_record(rng)
+        yield "\n".join(form_lines(record, rng))
+        with fitz.open(stream=make_document("digital_columns", record, rng), filetype="pdf") as doc:
+            yield doc[0].get_text()
+
+
+def sample_texts():
+    with fitz.open(os.path.join(ROOT, "Rapport_entretien_Levi.pdf")) as doc:
+        yield "".join(page.get_text() for page in doc)
+    yield "RÉFÉRENCE : AV-2023-004512\nNOM : DUPONT\nTÉL : 01 23 45 67 89\nSIREN : 12345678901234"
+    yield "Contact : jean.dupont@example.fr, 12/03/2024, total 1 250,00 €"
+    yield "Aucun libellé ici, seulement du texte."
+    yield ""
+
+
+@pytest.mark.parametrize("text", [*corpus_texts(), *sample_texts()])
+def test_same_fields_as_baseline_patterns(text):
+    assert FieldExtractor().extract(text) == baseline(text)
+
+
+def test_fields_already_found_are_kept():
+    data = dict.fromkeys(FIELDS)
+    data['nom'] = "Martin"
+    result = FieldExtractor().extract("Nom : Dupont\nPrénom : Marie", data)
+    assert result['nom'] == "Martin"
+    assert result['prenom'] == "Marie"
+
+
+def test_incremental_extraction_completes_across_pages():
+    extraction = FieldExtractor().incremental()
+    extraction.feed("Référence : AV-1\nNom : Dupont")
+    data = extraction.feed("Prénom : Marie\nSIRET : 12345678900012")
+    assert (data['numero_reference'], data['nom'], data['prenom'], data['numero_siret']) == \
+        ("AV-1", "Dupont", "Marie", "12345678900012")
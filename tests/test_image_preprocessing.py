@@ -0,0 +1,28 @@
+"""Prétraitement des images (image_preprocessing.py)"""
+
+from PIL import Image, ImageDraw
+
+from image_preprocessing import ImagePreprocessor
+
+
+def skewed_page():
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 1600, 40):
+        draw.line((100, y, 1100, y + 60), fill=(200, 0, 0), width=6)
+    image.info["dpi"] = (150, 150)
+    return image
+
+
+def test_without_grayscale_the_image_keeps_its_colours():
+    output, timings = ImagePreprocessor(grayscale=False, binarize=False).process(skewed_page())
+    assert output.mode == "RGB"
+    assert 'grayscale_ms' not in timings
+    assert timings['skew_degrees'] != 0
+    assert output.info["dpi"] == (300, 300)
+
+
+def test_binarization_implies_grayscale_in_output_and_signature():
+    with_gray, without_gray = ImagePreprocessor(), ImagePreprocessor(grayscale=False)
+    assert with_gray.signature == without_gray.signature
+    assert without_gray.process(skewed_page())[0].mode == "L"
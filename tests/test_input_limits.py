@@ -0,0 +1,69 @@
+"""Budgets des documents reçus (input_limits.py) : pixels, résolution de rendu et décodage en brouillon"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from input_limits import InputLimits, InputRejected, open_image
+
+
+def encode(image, fmt, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **params)
+    buffer.seek(0)
+    return buffer
+
+
+def test_pixels_above_the_budget_are_rejected():
+    limits = InputLimits(max_pixels=1_000_000)
+    limits.check_pixels((1000, 1000))
+    with pytest.raises(InputRejected, match=r"page 3.*1001 x 1000"):
+        limits.check_pixels((1001, 1000), page=3)
+
+
+def test_open_image_rejects_an_image_above_the_budget():
+    source = encode(Image.new("L", (400, 300), 255), "PNG", dpi=(300, 300))
+    with pytest.raises(InputRejected, match="Image trop grande"):
+        open_image(source, InputLimits(max_pixels=100_000))
+
+
+def test_open_image_checks_every_tiff_frame_before_decoding():
+    frames = [Image.new("L", size, 255) for size in ((100, 100), (100, 100), (400, 300))]
+    source = encode(frames[0], "TIFF", save_all=True, append_images=frames[1:])
+    with pytest.raises(InputRejected, match=r"page 3"):
+        open_image(source, InputLimits(max_pixels=50_000))
+    with pytest.raises(InputRejected, match="Document trop long"):
+        open_image(source, InputLimits(max_pages=2))
+
+
+def test_fit_dpi_lowers_the_resolution_to_the_pixel_budget():
+    limits = InputLimits(max_pixels=40_000_000)
+    # A4 à 300 DPI : environ 8,7 Mpx, dans le budget
+    assert limits.fit_dpi(8.27, 11.69, 300) == 300
+    # Affiche A0 (33,1 x 46,8 pouces) : la résolution est abaissée
+    dpi = limits.fit_dpi(33.1, 46.8, 300)
+    assert dpi < 300
+    assert 33.1 * 46.8 * dpi * dpi <= limits.max_pixels
+    assert 33.1 * 46.8 * (dpi + 1) ** 2 > limits.max_pixels
+
+
+def test_600_dpi_jpeg_is_draft_decoded_to_300_dpi():
+    source = encode(Image.new("RGB", (1200, 1600), "white"), "JPEG", dpi=(600, 600))
+    # Décodée en pleine résolution, l'image (1,92 Mpx) dépasserait ce budget
+    image = open_image(source, InputLimits(max_pixels=600_000), target_dpi=300)
+    assert image.size == (600, 800)
+    assert image.info["dpi"] == pytest.approx((300, 300))
+
+
+def test_high_resolution_png_is_downsampled_to_the_target():
+    source = encode(Image.new("L", (1200, 1600), 255), "PNG", dpi=(600, 600))
+    image = open_image(source, InputLimits(), target_dpi=300)
+    assert image.size == (600, 800)
+    assert image.info["dpi"] == (300, 300)
+
+
+def test_image_at_the_target_resolution_is_kept():
+    source = encode(Image.new("L", (620, 877), 255), "PNG", dpi=(300, 300))
+    image = open_image(source, InputLimits(), target_dpi=300)
+    assert image.size == (620, 877)
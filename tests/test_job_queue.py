@@ -0,0 +1,106 @@
+"""File de traitements en arrière-plan (job_queue.py) : admission et reprise après redémarrage"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from job_queue import JOB_DONE, JOB_FAILED, JOB_RUNNING, JobQueue, QueueFullError
+
+
+class BlockingProcessor:
+    """Processeur qui ne termine un document qu'à ``release.set()``"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def process_document(self, file_bytes, filename, on_progress=None):
+        self.started.set()
+        self.release.wait(5)
+        return {'text': file_bytes.decode(), 'data': {}}
+
+
+def wait_for(queue, job_id, state, timeout=5):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id)['state'] != state and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def write_job(jobs_dir, job_id, state, age_s=0.0):
+    path = os.path.join(jobs_dir, f"{job_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({'id': job_id, 'filename': "scan.pdf", 'state': state}, f)
+    if age_s:
+        stamp = time.time() - age_s
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_full_queue_raises_queue_full_error(tmp_path):
+    processor = BlockingProcessor()
+    queue = JobQueue(processor, workers=1, max_pending=1, jobs_dir=str(tmp_path))
+    try:
+        running = queue.submit(b"un", "un.txt")
+        assert processor.started.wait(5)
+        pending = queue.submit(b"deux", "deux.txt")
+        with pytest.raises(QueueFullError):
+            queue.submit(b"trois", "trois.txt")
+        assert queue.stats() == {'active': 2, 'running': 1, 'queued': 1, 'capacity': 2, 'workers': 1}
+    finally:
+        processor.release.set()
+        queue.shutdown()
+    assert queue.get(running)['state'] == JOB_DONE
+    assert queue.get(pending)['result']['text'] == "deux"
+    assert queue.stats()['active'] == 0
+
+
+def test_slot_is_freed_once_a_job_finishes(tmp_path):
+    processor = BlockingProcessor()
+    queue = JobQueue(processor, workers=1, max_pending=0, jobs_dir=str(tmp_path))
+    try:
+        first = queue.submit(b"un", "un.txt")
+        with pytest.raises(QueueFullError):
+            queue.submit(b"deux", "deux.txt")
+        processor.release.set()
+        assert wait_for(queue, first, JOB_DONE)['state'] == JOB_DONE
+        second = queue.submit(b"deux", "deux.txt")
+        assert wait_for(queue, second, JOB_DONE)['result']['text'] == "deux"
+    finally:
+        processor.release.set()
+        queue.shutdown()
+
+
+def test_restart_fails_interrupted_jobs_and_purges_expired_ones(tmp_path):
+    jobs_dir = str(tmp_path)
+    write_job(jobs_dir, "interrompu", JOB_RUNNING)
+    write_job(jobs_dir, "en_attente", "queued")
+    write_job(jobs_dir, "termine", JOB_DONE)
+    expired = write_job(jobs_dir, "expire", JOB_RUNNING, age_s=7200)
+
+    queue = JobQueue(BlockingProcessor(), jobs_dir=jobs_dir, retention_s=3600)
+    try:
+        for job_id in ("interrompu", "en_attente"):
+            job = queue.get(job_id)
+            assert job['state'] == JOB_FAILED
+            assert job['error'] == "Traitement interrompu (redémarrage du serveur)"
+            assert 'finished_at' in job
+        assert queue.get("termine") == {'id': "termine", 'filename': "scan.pdf", 'state': JOB_DONE}
+        assert not os.path.exists(expired)
+        assert queue.get("expire") is None
+    finally:
+        queue.shutdown()
+
+
+def test_unreadable_job_files_are_left_alone(tmp_path):
+    broken = tmp_path / "casse.json"
+    broken.write_text("{pas du json", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("ignoré", encoding="utf-8")
+
+    queue = JobQueue(BlockingProcessor(), jobs_dir=str(tmp_path))
+    queue.shutdown()
+    assert broken.read_text(encoding="utf-8") == "{pas du json"
+    assert queue.get("casse") is None
@@ -0,0 +1,59 @@
+"""Extraction par la mise en page (layout_extraction.py)"""
+
+import os
+import random
+
+import pymupdf as fitz
+import pytest
+
+from benchmarks import corpus
+from layout_extraction import LayoutExtractor, accepts, segments_from_words
+from result_store import ResultStore, make_record
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def page_segments(lines):
+    """Segments d'une page PDF numérique portant ``lines`` (texte, x, y)"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    for text, x, y in lines:
+        page.insert_text((x, y), text, fontsize=11)
+    return segments_from_words(page.get_text("words"))
+
+
+def test_spaced_siret_is_stored_as_digits_and_found():
+    data = LayoutExtractor().extract(page_segments([("SIRET : 123 456 789 00012", 58, 100)]))
+    assert data['numero_siret'] == "12345678900012"
+
+    store = ResultStore(":memory:")
+    store.save(make_record("a" * 64, "avis.pdf", "", data))
+    for query in ("12345678900012", "123 456 789 00012"):
+        assert [row['filename'] for row in store.find_by_siret(query)] == ["avis.pdf"]
+    store.close()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_corpus_columns_page_pairs_every_label_with_its_value(seed):
+    # Libellés et valeurs écrits colonne par colonne; montant sous son libellé, ville sous l'adresse
+    rng = random.Random(seed)
+    record = corpus.make_record(rng)
+    with fitz.open(stream=corpus.make_document("digital_columns", record, rng), filetype="pdf") as doc:
+        data = LayoutExtractor().extract(segments_from_words(doc[0].get_text("words")))
+    assert data == record
+
+
+def test_address_value_must_look_like_an_address():
+    assert accepts('adresse', "12 rue de la Paix\n75002 Paris")
+    assert accepts('adresse', "3 bis, avenue Victor Hugo")
+    assert not accepts('adresse', "4. Interface utilisateur accessible")
+    assert not accepts('adresse', None)
+
+
+def test_sample_report_yields_no_layout_fields():
+    # Tableau du compte rendu : « Adresse email » est un libellé d'email, pas d'adresse
+    with fitz.open(os.path.join(ROOT, "Rapport_entretien_Levi.pdf")) as doc:
+        for page in doc:
+            data = LayoutExtractor().extract(segments_from_words(page.get_text("words")))
+            assert not data['adresse'], page.number
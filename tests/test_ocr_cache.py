@@ -0,0 +1,83 @@
+"""Cache LRU des résultats OCR (ocr_cache.py)"""
+
+import json
+import os
+
+from ocr_cache import OCRResultCache
+
+
+def entry_size(text):
+    return len(json.dumps({"text": text, "data": {}}, ensure_ascii=False).encode("utf-8"))
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    size = entry_size("x" * 100)
+    cache = OCRResultCache(str(tmp_path), max_bytes=2 * size)
+    cache.put("aa01", "x" * 100, {})
+    cache.put("bb02", "x" * 100, {})
+    # Lecture : aa01 devient la plus récente, bb02 la plus ancienne
+    assert cache.get("aa01")["text"] == "x" * 100
+    cache.put("cc03", "x" * 100, {})
+
+    assert cache.get("bb02") is None
+    assert not os.path.exists(cache._path("bb02"))
+    assert cache.get("aa01") is not None and cache.get("cc03") is not None
+    assert cache.stats()["size_bytes"] == 2 * size
+
+
+def test_entry_larger_than_the_budget_is_not_kept(tmp_path):
+    cache = OCRResultCache(str(tmp_path), max_bytes=entry_size("x" * 10))
+    cache.put("aa01", "x" * 100, {})
+    assert cache.get("aa01") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_entries_outlive_the_memory_tier_and_the_process(tmp_path):
+    cache = OCRResultCache(str(tmp_path), memory_entries=1)
+    cache.put("aa01", "premier", {'nom': "Dupont"}, {'confidence': {'document': 91.0}})
+    cache.put("bb02", "second", {})
+    assert list(cache._memory) == ["bb02"]
+    assert cache.get("aa01")["data"] == {'nom': "Dupont"}
+
+    reopened = OCRResultCache(str(tmp_path))
+    assert reopened.stats()["entries"] == 2
+    assert reopened.get("aa01")["confidence"] == {'document': 91.0}
+
+
+def test_eviction_on_reopen_follows_last_use(tmp_path):
+    size = entry_size("x" * 100)
+    cache = OCRResultCache(str(tmp_path), max_bytes=3 * size)
+    for key in ("aa01", "bb02", "cc03"):
+        cache.put(key, "x" * 100, {})
+    os.utime(cache._path("aa01"), (1, 1))
+    os.utime(cache._path("bb02"), (3, 3))
+    os.utime(cache._path("cc03"), (2, 2))
+
+    reopened = OCRResultCache(str(tmp_path), max_bytes=size)
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get("bb02") is not None
+
+
+def test_memory_hit_refreshes_the_file_for_other_processes(tmp_path):
+    size = entry_size("x" * 100)
+    cache = OCRResultCache(str(tmp_path), max_bytes=2 * size)
+    cache.put("aa01", "x" * 100, {})
+    cache.put("bb02", "x" * 100, {})
+    os.utime(cache._path("aa01"), (1, 1))
+    os.utime(cache._path("bb02"), (2, 2))
+    # Servie par la mémoire : aa01 devient la plus récente sur disque aussi
+    assert "aa01" in cache._memory and cache.get("aa01") is not None
+
+    other = OCRResultCache(str(tmp_path), max_bytes=2 * size)
+    other.put("cc03", "x" * 100, {})
+    assert other.get("bb02") is None
+    assert other.get("aa01") is not None
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = OCRResultCache(str(tmp_path))
+    assert cache.get("aa01") is None
+    cache.put("aa01", "texte", {})
+    cache.get("aa01")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
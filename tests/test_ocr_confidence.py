@@ -0,0 +1,64 @@
+"""Lecture du TSV Tesseract et confiance au niveau du mot (ocr_confidence.py)"""
+
+from ocr_confidence import OCRWord, layout_words, low_confidence_groups, parse_tsv
+
+HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"
+
+# Sortie de pytesseract.image_to_data : lignes de page, bloc, paragraphe et ligne (conf -1), puis les mots
+TSV = "\n".join([
+    HEADER,
+    "1\t1\t0\t0\t0\t0\t0\t0\t2480\t3508\t-1\t",
+    "2\t1\t1\t0\t0\t0\t120\t200\t900\t60\t-1\t",
+    "3\t1\t1\t1\t0\t0\t120\t200\t900\t60\t-1\t",
+    "4\t1\t1\t1\t1\t0\t120\t200\t900\t60\t-1\t",
+    "5\t1\t1\t1\t1\t1\t120\t200\t180\t40\t96.5\tFacture",
+    "5\t1\t1\t1\t1\t2\t320\t200\t60\t40\t91\tn°",
+    "5\t1\t1\t1\t1\t3\t400\t200\t220\t40\t-1\t ",
+    "5\t1\t1\t1\t1\t4\t640\t200\t300\t40\t42.25\tF-2023-118",
+    "",
+    "5\t1\t1\t1\t2\t1\t120\t260\t200\t40\t88",
+])
+
+
+def word(text, confidence, line=(1, 1, 1)):
+    return OCRWord(text, confidence, 0, 0, 10, 10, line)
+
+
+def test_parse_tsv_keeps_only_non_empty_words():
+    words = parse_tsv(TSV)
+    assert [w.text for w in words] == ["Facture", "n°", "F-2023-118"]
+    first = words[0]
+    assert (first.confidence, first.left, first.top, first.width, first.height) == (96.5, 120, 200, 180, 40)
+    assert first.line == (1, 1, 1)
+    assert words[2].confidence == 42.25
+    # Offsets calculés plus tard par layout_words
+    assert (first.start, first.end) == (0, 0)
+
+
+def test_parse_tsv_without_header_uses_tesseract_column_order():
+    rows = TSV.split("\n", 1)[1]
+    assert parse_tsv(rows) == parse_tsv(TSV)
+
+
+def test_parse_tsv_of_an_empty_page():
+    assert parse_tsv("") == []
+    assert parse_tsv(HEADER + "\n1\t1\t0\t0\t0\t0\t0\t0\t2480\t3508\t-1\t\n") == []
+
+
+def test_layout_words_places_parsed_words():
+    text, words = layout_words(parse_tsv(TSV))
+    assert text == "Facture n° F-2023-118\n"
+    assert [text[w.start:w.end] for w in words] == ["Facture", "n°", "F-2023-118"]
+
+
+def test_adjacent_low_confidence_words_of_a_line_are_grouped():
+    words = [word("Total", 95), word("TTC", 40), word("l20,0O", 30), word("€", 20, line=(1, 1, 2)),
+             word("Payé", 90, line=(1, 1, 2)), word("le", 50, line=(1, 1, 2)), word("l5/03", 10, line=(1, 1, 2))]
+    assert low_confidence_groups(words, 60) == [[1, 2], [3], [5, 6]]
+
+
+def test_low_confidence_groups_threshold_is_strict():
+    words = [word("a", 60), word("b", 59.9), word("c", 60)]
+    assert low_confidence_groups(words, 60) == [[1]]
+    assert low_confidence_groups(words, 0) == []
+    assert low_confidence_groups([], 60) == []
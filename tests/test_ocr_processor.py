@@ -0,0 +1,104 @@
+"""Lecture en flux des trames d'une image multipage (OCRProcessor.iter_image_page_words)"""
+
+import io
+import threading
+import time
+
+from PIL import Image
+
+from ocr_processor import OCRProcessor
+from pipeline_events import STAGE_LOAD, STAGE_PAGE
+from pipeline_metrics import MetricsRegistry
+from zone_templates import TemplateRegistry
+
+
+class FakeBackend:
+    """Moteur OCR factice : lit le numéro de page dans le niveau de gris de la trame"""
+    name = "fake"
+
+    def __init__(self, delay_s=0.0):
+        self.delay_s = delay_s
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def image_to_data(self, image, psm=None, whitelist=None):
+        page = image.getpixel((0, 0)) // 10
+        with self._lock:
+            self.calls.append(page)
+        # Les premières pages lues sont les plus lentes : elles finissent après les suivantes
+        time.sleep(self.delay_s / page)
+        return f"5\t1\t1\t1\t1\t1\t10\t10\t50\t20\t95\tpage{page}"
+
+
+def make_processor(backend, page_workers=2):
+    processor = OCRProcessor(page_workers=page_workers, preprocessing="none", reocr_threshold=0,
+                             metrics=MetricsRegistry(), templates=TemplateRegistry())
+    processor.ocr_backend = backend
+    return processor
+
+
+def make_tiff(pages):
+    """TIFF dont la trame n est unie, au niveau de gris 10 * n"""
+    frames = [Image.new("L", (200, 280), 10 * number) for number in range(1, pages + 1)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, "TIFF", save_all=True, append_images=frames[1:], dpi=(300, 300))
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+def test_frames_are_delivered_in_page_order_with_progress():
+    image = make_tiff(3)
+    backend = FakeBackend(delay_s=0.05)
+    events = []
+
+    pages = list(make_processor(backend).iter_image_page_words(image, events.append))
+
+    assert [text.strip() for text, *_ in pages] == ["page1", "page2", "page3"]
+    assert sorted(backend.calls) == [1, 2, 3]
+    assert events[0].stage == STAGE_LOAD and events[0].page_count == 3
+    page_events = [event for event in events if event.stage == STAGE_PAGE]
+    assert [(event.page, event.page_count) for event in page_events] == [(1, 3), (2, 3), (3, 3)]
+    progress = [event.progress for event in events]
+    assert progress == sorted(progress) and progress[-1] <= 0.9
+    # L'image est rendue positionnée sur sa première trame
+    assert image.tell() == 0
+
+
+def test_first_page_already_read_is_not_decoded_again():
+    image = make_tiff(3)
+    backend = FakeBackend()
+    first_page = ("déjà lue", [], 0, None, None)
+
+    pages = list(make_processor(backend).iter_image_page_words(image, first_page=first_page))
+
+    assert [text.strip() for text, *_ in pages] == ["déjà lue", "page2", "page3"]
+    assert sorted(backend.calls) == [2, 3]
+
+
+def test_decoded_frames_stay_within_the_worker_window():
+    image = make_tiff(8)
+    processor = make_processor(FakeBackend(delay_s=0.02), page_workers=1)
+    window = processor.page_workers * 2
+    decoded, delivered, ahead = [], [], []
+    decode_frame = processor.decode_frame
+
+    def spy(frame_image, number):
+        decoded.append(number)
+        ahead.append(len(decoded) - len(delivered))
+        return decode_frame(frame_image, number)
+
+    processor.decode_frame = spy
+    for text, *_ in processor.iter_image_page_words(image):
+        delivered.append(text.strip())
+
+    assert delivered == [f"page{number}" for number in range(1, 9)]
+    # Au plus ``window`` trames en attente, plus celle en cours de décodage
+    assert max(ahead) <= window + 1
+
+
+def test_frames_streaming_assembles_every_page():
+    image = make_tiff(3)
+    backend = FakeBackend()
+    result = make_processor(backend).extract_from_frames_streaming(image, stop_when_complete=False)
+    assert result['pages_read'] == 3
+    assert result['text'].split() == ["page1", "page2", "page3"]
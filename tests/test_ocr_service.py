@@ -0,0 +1,108 @@
+"""Service HTTP d'extraction (ocr_service.py) : admission et traitements asynchrones"""
+
+import threading
+import time
+
+import pytest
+
+from job_queue import JOB_DONE, JobQueue
+from ocr_cache import OCRResultCache
+from ocr_processor import OCRProcessor
+from ocr_service import AdmissionControl, ExtractionService, RequestError, ServiceBusy
+
+
+def hold_slot(admission):
+    """Occupe un emplacement jusqu'à ``release.set()``"""
+    held, release = threading.Event(), threading.Event()
+
+    def run():
+        with admission.admit():
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    held.wait(5)
+    return release, thread
+
+
+def test_full_queue_is_refused_with_429():
+    admission = AdmissionControl(max_inflight=1, max_queued=0, queue_timeout_s=5)
+    release, thread = hold_slot(admission)
+    try:
+        with pytest.raises(ServiceBusy) as busy:
+            with admission.admit():
+                pass
+        assert busy.value.status == 429
+    finally:
+        release.set()
+        thread.join()
+    assert admission.stats()['inflight'] == 0
+
+
+def test_wait_beyond_the_timeout_is_refused_with_503():
+    admission = AdmissionControl(max_inflight=1, max_queued=1, queue_timeout_s=0.05)
+    release, thread = hold_slot(admission)
+    try:
+        start = time.perf_counter()
+        with pytest.raises(ServiceBusy) as busy:
+            with admission.admit():
+                pass
+        assert busy.value.status == 503
+        assert time.perf_counter() - start >= 0.05
+        assert admission.stats()['waiting'] == 0
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_slot_is_released_after_an_error():
+    admission = AdmissionControl(max_inflight=1, max_queued=0, queue_timeout_s=1)
+    with pytest.raises(ValueError):
+        with admission.admit():
+            raise ValueError
+    with admission.admit():
+        assert admission.stats()['inflight'] == 1
+
+
+class FakeProcessor:
+    cache_signature = "fake"
+    RULES_VERSION = "test"
+    is_supported = staticmethod(OCRProcessor.is_supported)
+
+    def __init__(self):
+        self.calls = 0
+
+    def process_document(self, file_bytes, filename, on_progress=None):
+        self.calls += 1
+        return {'text': "Nom : Dupont", 'data': {'nom': "Dupont"}, 'confidence': None,
+                'document_type': None, 'located': {}}
+
+
+def wait_done(jobs, job_id):
+    for _ in range(500):
+        job = jobs.get(job_id)
+        if job['state'] == JOB_DONE:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(job)
+
+
+def test_async_jobs_read_and_fill_the_result_cache(tmp_path):
+    processor = FakeProcessor()
+    cache = OCRResultCache(str(tmp_path / "cache"))
+    jobs = JobQueue(processor, workers=1, jobs_dir=str(tmp_path / "jobs"), result_cache=cache)
+    service = ExtractionService(processor, AdmissionControl(1, 1, 1), cache=cache, jobs=jobs)
+    try:
+        first = wait_done(jobs, service.submit_job(b"%PDF", "scan.pdf"))
+        second = wait_done(jobs, service.submit_job(b"%PDF", "scan.pdf"))
+        assert processor.calls == 1
+        assert first['result']['data'] == second['result']['data'] == {'nom': "Dupont"}
+        assert second['result']['cached']
+        # Le cache alimenté par un job sert aussi l'extraction synchrone
+        assert service.extract(b"%PDF", "scan.pdf")['cached']
+        with pytest.raises(RequestError) as error:
+            service.submit_job(b"", "notes.docx")
+        assert error.value.status == 415
+    finally:
+        jobs.shutdown(wait=True)
@@ -0,0 +1,67 @@
+"""Ré-extraction des champs enregistrés (reextract.py)"""
+
+import pytest
+
+from field_extraction import RULES_VERSION
+from reextract import reextract
+from result_store import ResultStore, make_record
+
+TEXT = "Nom : Dupont\nRéférence : AV-2023-004512\nSIRET : 12345678900012"
+
+
+@pytest.fixture
+def store():
+    store = ResultStore(":memory:")
+    yield store
+    store.close()
+
+
+def save(store, digest, rules_version="0", validated=False, text=TEXT, data=None, **kwargs):
+    return store.save(make_record(digest * 64, f"{digest}.pdf", text, data or {}, validated=validated,
+                                  rules_version=rules_version, **kwargs))
+
+
+def test_only_documents_from_other_rules_are_reextracted(store):
+    stale = save(store, "a")
+    current = save(store, "b", rules_version=RULES_VERSION, data={'nom': "Martin"})
+    stats = reextract(store)
+
+    assert (stats['documents'], stats['updated'], stats['changed'], stats['skipped']) == (1, 1, 1, 0)
+    document = store.get(stale)
+    assert (document['rules_version'], document['nom'], document['numero_siret']) == \
+        (RULES_VERSION, "Dupont", "12345678900012")
+    assert store.get(current)['nom'] == "Martin"
+    assert reextract(store)['documents'] == 0
+
+
+def test_validated_documents_are_left_unchanged(store):
+    validated = save(store, "a", validated=True, data={'nom': "Durand"})
+    assert reextract(store)['documents'] == 0
+    document = store.get(validated)
+    assert (document['rules_version'], document['nom']) == ("0", "Durand")
+
+
+def test_fields_found_by_position_take_precedence_over_patterns(store):
+    document_id = save(store, "a", located={'nom': "Durand", 'montant': "120,00"})
+    reextract(store)
+    document = store.get(document_id)
+    assert (document['nom'], document['montant'], document['numero_reference']) == \
+        ("Durand", "120,00", "AV-2023-004512")
+
+
+def test_stored_document_type_is_reused(store):
+    # Le texte complet évoque une facture, mais le document a été aiguillé comme avis à l'origine
+    text = "Nom : Dupont\n" + "x" * 2100 + "\nFacture n° F-1, total TTC : 99,00"
+    kept = save(store, "a", text=text, document_type="avis")
+    reclassified = save(store, "b", text=text)
+    reextract(store)
+    assert (store.get(kept)['document_type'], store.get(kept)['nom']) == ("avis", "Dupont")
+    assert store.get(reclassified)['document_type'] != "avis"
+
+
+def test_parallel_reextraction_gives_the_same_result(store):
+    for digest in "abcd":
+        save(store, digest)
+    stats = reextract(store, workers=2, chunk_size=1)
+    assert (stats['documents'], stats['updated']) == (4, 4)
+    assert {store.get(i)['nom'] for i in range(1, 5)} == {"Dupont"}
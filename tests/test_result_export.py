@@ -0,0 +1,65 @@
+"""Export en masse des extractions (result_export.py) : JSONL et Parquet par lots"""
+
+import io
+import json
+
+import pytest
+
+from result_export import export_documents, export_jsonl, export_parquet
+from result_store import EXPORT_COLUMNS, ResultStore, make_record
+
+
+@pytest.fixture
+def store():
+    store = ResultStore(":memory:")
+    for number in range(5):
+        store.save(make_record(f"{number}" * 64, f"scan{number}.pdf", f"Texte du document {number}",
+                               {'nom': f"Nom{number}", 'date': "15/03/2023"}, confidence=90.0 + number))
+    yield store
+    store.close()
+
+
+def test_jsonl_round_trip_over_chunks(store):
+    chunks = list(store.iter_documents(chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    out = io.StringIO()
+    assert export_jsonl(iter(chunks), out) == 5
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 5
+    assert [json.loads(line) for line in lines] == [row for chunk in chunks for row in chunk]
+    first = json.loads(lines[0])
+    assert tuple(first) == EXPORT_COLUMNS
+    assert (first['nom'], first['date_iso'], first['confidence']) == ("Nom0", "2023-03-15", 90.0)
+
+
+def test_jsonl_keeps_accents_and_empty_export():
+    out = io.StringIO()
+    assert export_jsonl([[{'nom': "Hélène"}]], out) == 1
+    assert out.getvalue() == '{"nom": "Hélène"}\n'
+    assert export_jsonl([], io.StringIO()) == 0
+
+
+def test_export_documents_writes_jsonl_with_text(store, tmp_path):
+    path = str(tmp_path / "exports" / "jour.jsonl")
+    assert export_documents(store, path, include_text=True, chunk_size=2) == 5
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [row['extracted_text'] for row in rows] == [f"Texte du document {number}" for number in range(5)]
+    assert not (tmp_path / "exports" / "jour.jsonl.tmp").exists()
+
+
+def test_parquet_without_text_drops_the_text_column(store, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "export.parquet")
+
+    assert export_parquet(store.iter_documents(chunk_size=2), path, include_text=False) == 5
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert table.column('nom').to_pylist() == [f"Nom{number}" for number in range(5)]
+
+    with_text = str(tmp_path / "export_texte.parquet")
+    export_parquet(store.iter_documents(include_text=True), with_text, include_text=True)
+    assert pq.read_table(with_text).column_names == list(EXPORT_COLUMNS) + ["extracted_text"]
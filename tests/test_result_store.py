@@ -0,0 +1,74 @@
+"""Base des extractions (result_store.py)"""
+
+import pytest
+
+from result_store import STATUS_EXTRACTED, STATUS_VALIDATED, ResultStore, make_record
+
+
+@pytest.fixture
+def store():
+    store = ResultStore(":memory:")
+    yield store
+    store.close()
+
+
+def record(digest, text="", validated=False, **data):
+    return make_record(digest * 64, f"{digest}.pdf", text, data, validated=validated)
+
+
+def test_saving_the_same_content_again_updates_its_row(store):
+    first = store.save(record("a", nom="Dupont"))
+    second = store.save(record("a", nom="Durand"))
+    assert first == second
+    assert store.count() == 1
+    assert store.get(first)['nom'] == "Durand"
+
+
+def test_automatic_result_never_replaces_a_validated_document(store):
+    assert store.save_many([record("a", validated=True, nom="Dupont")]) == 1
+    assert store.save_many([record("a", nom="Dupond"), record("b", nom="Martin")]) == 1
+    document = store.get_by_hash("a" * 64)
+    assert (document['status'], document['nom']) == (STATUS_VALIDATED, "Dupont")
+    # Une nouvelle validation le met à jour
+    assert store.save_many([record("a", validated=True, nom="Dupond")]) == 1
+    assert store.get_by_hash("a" * 64)['nom'] == "Dupond"
+    assert store.get_by_hash("b" * 64)['status'] == STATUS_EXTRACTED
+
+
+def test_save_many_writes_in_batches(store):
+    store.batch_size = 3
+    assert store.save_many(record(f"{i:x}") for i in range(10)) == 10
+    assert store.count() == 10
+
+
+def test_lookups_by_siret_reference_and_date(store):
+    store.save(record("a", numero_siret="12345678900012", numero_reference="AV-2023-1", date="05/03/2023"))
+    store.save(record("b", numero_siret="98765432100034", numero_reference="AV-2023-2", date="20/03/2023"))
+    store.save(record("c", date="02/04/2023"))
+
+    assert [row['filename'] for row in store.find_by_siret("123 456 789 00012")] == ["a.pdf"]
+    assert [row['filename'] for row in store.find_by_reference(" AV-2023-2 ")] == ["b.pdf"]
+    assert [row['filename'] for row in store.find_by_date("01/03/2023", "31/03/2023")] == ["a.pdf", "b.pdf"]
+    assert [row['filename'] for row in store.find_by_date("2023-04-02")] == ["c.pdf"]
+    assert store.find_by_siret("00000000000000") == []
+
+
+def test_full_text_search_ignores_accents(store):
+    if not store.full_text:
+        pytest.skip("SQLite sans FTS5")
+    store.save(record("a", text="Avis de résiliation du contrat"))
+    store.save(record("b", text="Facture du mois de mars"))
+    results = store.search("resiliation")
+    assert [row['filename'] for row in results] == ["a.pdf"]
+    assert store.search("   ") == []
+
+
+def test_document_keeps_original_extraction_and_located_fields(store):
+    document_id = store.save(make_record("a" * 64, "a.pdf", "texte", {'nom': "Durand"},
+                                         extracted={'nom': "Dupont"}, located={'numero_siret': "12345678900012"},
+                                         document_type="avis"))
+    document = store.get(document_id)
+    assert document['extracted'] == {'nom': "Dupont"}
+    assert document['located'] == {'numero_siret': "12345678900012"}
+    assert document['document_type'] == "avis"
+    assert store.get(document_id + 1) is None
@@ -0,0 +1,64 @@
+"""Gabarits de formulaires (zone_templates.py) : zones relatives à l'ancre et recherche de l'ancre"""
+
+import pytest
+
+from ocr_confidence import OCRWord
+from zone_templates import FormTemplate, Zone, find_anchor
+
+ZONE = Zone('nom', (100, 50, 700, 110))
+TEMPLATE = FormTemplate("avis", "Avis de situation", "AVIS DE SITUATION", (ZONE,), dpi=300)
+PAGE_300 = (2480, 3508)
+
+
+def word(text, left, top, line=(1, 1, 1), width=100, height=40):
+    return OCRWord(text, 90.0, left, top, width, height, line)
+
+
+@pytest.mark.parametrize("dpi, origin, expected", [
+    (300, (200, 150), (300, 200, 900, 260)),
+    (150, (100, 75), (150, 100, 450, 130)),
+    (600, (400, 300), (600, 400, 1800, 520)),
+])
+def test_zone_box_scales_anchor_relative_zones_to_the_page_dpi(dpi, origin, expected):
+    size = (round(PAGE_300[0] * dpi / 300), round(PAGE_300[1] * dpi / 300))
+    assert TEMPLATE.zone_box(ZONE, origin, dpi, size) == expected
+
+
+def test_zone_box_is_clipped_to_the_image():
+    assert TEMPLATE.zone_box(ZONE, (2000, 150), 300, PAGE_300) == (2100, 200, 2480, 260)
+    assert TEMPLATE.zone_box(Zone('nom', (-300, -200, 100, 60)), (200, 150), 300, PAGE_300) == (0, 0, 300, 210)
+
+
+def test_zone_box_outside_the_image_is_none():
+    assert TEMPLATE.zone_box(ZONE, (2400, 150), 300, PAGE_300) is None
+    assert TEMPLATE.zone_box(ZONE, (200, 3480), 300, PAGE_300) is None
+
+
+def test_search_box_in_pixels():
+    assert TEMPLATE.search_box(PAGE_300) == (0, 0, 2480, 526)
+
+
+def test_find_anchor_returns_the_top_left_corner_of_the_words():
+    words = [word("République", 900, 40, line=(1, 1, 1)),
+             word("AVIS", 310, 152, line=(2, 1, 1)), word("DE", 420, 150, line=(2, 1, 1)),
+             word("SITUATION", 480, 151, line=(2, 1, 1)), word("Nom", 410, 210, line=(3, 1, 1))]
+    assert find_anchor(words, TEMPLATE.anchor) == (310, 150)
+
+
+def test_find_anchor_tolerates_ocr_errors_accents_and_punctuation():
+    words = [word("Avis", 300, 150), word("de", 400, 150), word("situati0n", 450, 150)]
+    assert find_anchor(words, "AVIS DE SITUATION") == (300, 150)
+    assert find_anchor([word("Récépissé", 80, 60), word("n°:", 300, 60)], "RECEPISSE N") == (80, 60)
+
+
+def test_find_anchor_requires_the_words_on_one_line():
+    words = [word("AVIS", 300, 150, line=(1, 1, 1)), word("DE", 400, 150, line=(1, 1, 1)),
+             word("SITUATION", 300, 200, line=(1, 1, 2))]
+    assert find_anchor(words, "AVIS DE SITUATION") is None
+
+
+def test_find_anchor_rejects_dissimilar_words():
+    words = [word("AVIS", 300, 150), word("DE", 400, 150), word("PAIEMENT", 450, 150)]
+    assert find_anchor(words, "AVIS DE SITUATION") is None
+    assert find_anchor([], "AVIS DE SITUATION") is None
+    assert find_anchor(words, "AVIS DE SITUATION", similarity=0.0) == (300, 150)
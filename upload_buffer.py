@@ -0,0 +1,114 @@
+"""Tampon unique d'un fichier téléversé, partagé par l'aperçu, l'OCR et l'enregistrement.
+
+Le fichier est lu une seule fois. Au-delà de ``spill_threshold`` octets, il est
+recopié par blocs dans un fichier temporaire de ``./uploads`` et projeté en
+mémoire (mmap) : les consommateurs reçoivent des vues (``memoryview``) sur ce
+tampon, sans copie. Le document PyMuPDF ou l'image décodée et l'empreinte
+sont calculés à la première demande puis réutilisés.
+"""
+
+import io
+import mmap
+import os
+import tempfile
+import weakref
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
+
+from ocr_cache import content_digest
+
+if TYPE_CHECKING:
+    from input_limits import InputLimits
+
+DEFAULT_UPLOAD_DIR = "uploads"
+# Taille au-delà de laquelle le fichier est projeté depuis le disque plutôt que gardé en mémoire
+SPILL_THRESHOLD = int(os.environ.get("OCR_UPLOAD_SPILL_BYTES", str(8 * 1024 * 1024)))
+COPY_CHUNK = 1024 * 1024
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class UploadBuffer:
+    """Contenu d'un fichier téléversé, lu une fois, avec son document décodé"""
+
+    def __init__(self, source: Union[bytes, BinaryIO], filename: str, spill_threshold: int = SPILL_THRESHOLD,
+                 upload_dir: str = DEFAULT_UPLOAD_DIR):
+        self.filename = filename
+        self.spill_path: Optional[str] = None
+        self._document = None
+        self._digest: Optional[str] = None
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = source if isinstance(source, bytes) else bytes(source)
+            self.size = len(data)
+            self.view = memoryview(data)
+            return
+        source.seek(0, io.SEEK_END)
+        self.size = source.tell()
+        source.seek(0)
+        if self.size <= spill_threshold:
+            # getvalue() d'un BytesIO partage ses octets (pas de copie)
+            data = source.getvalue() if isinstance(source, io.BytesIO) else source.read()
+            self.view = memoryview(data)
+            return
+
+        os.makedirs(upload_dir, exist_ok=True)
+        fd, self.spill_path = tempfile.mkstemp(prefix="upload_", suffix=os.path.splitext(filename)[1],
+                                               dir=upload_dir)
+        # Le fichier est supprimé quand le tampon est libéré; la projection reste valide
+        # tant qu'une vue (par exemple celle d'un job en cours) l'utilise encore
+        weakref.finalize(self, _remove, self.spill_path)
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = source.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                f.write(chunk)
+        with open(self.spill_path, "rb") as f:
+            self.view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def is_pdf(self) -> bool:
+        return os.path.splitext(self.filename)[1].lower() == ".pdf"
+
+    @property
+    def digest(self) -> str:
+        """Empreinte SHA-256 du contenu (calculée une fois)"""
+        if self._digest is None:
+            self._digest = content_digest(self.view)
+        return self._digest
+
+    def open(self) -> BinaryIO:
+        """Nouveau flux de lecture indépendant sur le contenu"""
+        if self.spill_path:
+            return open(self.spill_path, "rb")
+        # BytesIO construit sur des bytes les partage jusqu'à la première écriture
+        return io.BytesIO(self.view.obj)
+
+    def document(self, limits: "InputLimits", target_dpi: float):
+        """Document décodé au premier appel puis réutilisé : ``fitz.Document`` pour un PDF, image PIL sinon.
+
+        ``limits`` et ``target_dpi`` sont les budgets et la résolution OCR du processeur
+        (``OCRProcessor.limits``, ``OCRProcessor.ocr_dpi``) : le document est accepté et
+        réduit comme par ``process_document``. Hors budget, ``InputRejected`` est levée
+        avant le décodage. Un même document ne doit pas être utilisé par deux threads à la fois.
+        """
+        if self._document is None:
+            from input_limits import open_image
+            limits.check_bytes(self.size)
+            if self.is_pdf:
+                import pymupdf as fitz
+                document = fitz.open(stream=self.view, filetype="pdf")
+                try:
+                    limits.check_pages(document.page_count)
+                except Exception:
+                    document.close()
+                    raise
+                self._document = document
+            else:
+                self._document = open_image(self.spill_path or self.open(), limits, target_dpi)
+        return self._document
@@ -0,0 +1,163 @@
+"""Gabarits de formulaires à mise en page fixe : seules les zones des champs sont lues par l'OCR.
+
+Un gabarit décrit un type de formulaire : une ancre (un titre, cherché dans une
+bande de la page) et des zones rectangulaires associées chacune à un champ, lues
+avec leurs propres réglages Tesseract (mode de segmentation, caractères
+autorisés). Les coordonnées des zones sont en pixels à la résolution du gabarit,
+relatives au coin haut gauche de l'ancre : le décalage d'un scan est ainsi
+compensé. Une valeur lue n'est retenue que si elle a la forme attendue pour son champ.
+
+Les gabarits sont chargés depuis ``form_templates.json`` (ou le fichier désigné
+par la variable d'environnement ``OCR_FORM_TEMPLATES``). Le fichier livré est
+vide : les gabarits des formulaires traités sont à y décrire. Celui du formulaire
+du corpus de benchmark est dans ``benchmarks/form_templates.json``.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from field_extraction import FIELDS
+from layout_extraction import field_value, match_label
+from ocr_confidence import OCRWord
+
+DEFAULT_TEMPLATES_PATH = os.environ.get(
+    "OCR_FORM_TEMPLATES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "form_templates.json"))
+
+# Mode de segmentation par défaut d'une zone : une seule ligne de texte
+ZONE_PSM = 7
+# Bande de la page où chercher l'ancre (fractions de la largeur et de la hauteur)
+DEFAULT_SEARCH_BAND = (0.0, 0.0, 1.0, 0.15)
+# Similarité minimale entre un mot lu et un mot de l'ancre (erreurs OCR tolérées)
+ANCHOR_SIMILARITY = 0.8
+
+
+class Zone(NamedTuple):
+    """Rectangle (x0, y0, x1, y1) lu pour un champ, relatif à l'ancre"""
+    field: str
+    box: Tuple[int, int, int, int]
+    psm: int = ZONE_PSM
+    whitelist: Optional[str] = None
+
+
+class FormTemplate(NamedTuple):
+    """Type de formulaire : ancre, zones des champs et résolution de référence"""
+    name: str
+    label: str
+    anchor: str
+    zones: Tuple[Zone, ...]
+    search: Tuple[float, float, float, float] = DEFAULT_SEARCH_BAND
+    dpi: int = 300
+
+    def search_box(self, size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Bande de recherche de l'ancre, en pixels de l'image"""
+        width, height = size
+        x0, y0, x1, y1 = self.search
+        return round(x0 * width), round(y0 * height), round(x1 * width), round(y1 * height)
+
+    def zone_box(self, zone: Zone, origin: Tuple[int, int], dpi: float,
+                 size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """Rectangle d'une zone dans l'image (ancre en ``origin``, résolution ``dpi``); None s'il sort de l'image"""
+        scale = dpi / self.dpi
+        x0, y0, x1, y1 = zone.box
+        box = (max(0, round(origin[0] + x0 * scale)), max(0, round(origin[1] + y0 * scale)),
+               min(size[0], round(origin[0] + x1 * scale)), min(size[1], round(origin[1] + y1 * scale)))
+        return box if box[2] > box[0] and box[3] > box[1] else None
+
+
+def _token(text: str) -> str:
+    """Mot comparable : sans accents ni ponctuation, en majuscules"""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if c.isalnum() and not unicodedata.combining(c)).upper()
+
+
+def find_anchor(words: List[OCRWord], anchor: str,
+                similarity: float = ANCHOR_SIMILARITY) -> Optional[Tuple[int, int]]:
+    """Coin haut gauche de la suite de mots d'une même ligne qui forme ``anchor``"""
+    expected = [_token(part) for part in anchor.split()]
+    tokens = [_token(word.text) for word in words]
+    for i in range(len(words) - len(expected) + 1):
+        members = words[i:i + len(expected)]
+        if any(word.line != members[0].line for word in members):
+            continue
+        if all(difflib.SequenceMatcher(None, token, wanted).ratio() >= similarity
+               for token, wanted in zip(tokens[i:i + len(expected)], expected)):
+            return min(word.left for word in members), min(word.top for word in members)
+    return None
+
+
+def zone_value(field: str, text: str) -> Optional[str]:
+    """Valeur d'un champ lue dans une zone; le libellé éventuellement inclus dans la zone est ignoré"""
+    text = " ".join(text.split())
+    label = match_label(text)
+    if label and label[0] == field:
+        text = text[label[1]:]
+    return field_value(field, text)
+
+
+def _zone(field: str, spec: Dict) -> Zone:
+    if field not in FIELDS:
+        raise ValueError(f"Champ inconnu dans un gabarit : {field}")
+    return Zone(field, tuple(spec['box']), spec.get('psm', ZONE_PSM), spec.get('whitelist'))
+
+
+class TemplateRegistry:
+    """Gabarits connus, par nom"""
+
+    def __init__(self, templates: Iterable[FormTemplate] = ()):
+        self._templates: Dict[str, FormTemplate] = {}
+        for template in templates:
+            self.register(template)
+
+    def register(self, template: FormTemplate):
+        self._templates[template.name] = template
+
+    def get(self, name: str) -> Optional[FormTemplate]:
+        return self._templates.get(name)
+
+    def __iter__(self) -> Iterator[FormTemplate]:
+        return iter(self._templates.values())
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def by_search_band(self) -> Dict[Tuple[float, float, float, float], List[FormTemplate]]:
+        """Gabarits regroupés par bande de recherche : chaque bande n'est lue qu'une fois"""
+        bands: Dict[Tuple[float, float, float, float], List[FormTemplate]] = {}
+        for template in self._templates.values():
+            bands.setdefault(template.search, []).append(template)
+        return bands
+
+    @property
+    def signature(self) -> str:
+        """Empreinte des gabarits (utilisée dans la clé de cache OCR)"""
+        if not self._templates:
+            return "none"
+        encoded = json.dumps(sorted(self._templates.values()), ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:12]
+
+    @classmethod
+    def from_dict(cls, specs: Dict[str, Dict]) -> "TemplateRegistry":
+        """Gabarits décrits comme dans ``form_templates.json``"""
+        return cls(
+            FormTemplate(
+                name=name,
+                label=spec.get('label', name),
+                anchor=spec['anchor']['text'],
+                zones=tuple(_zone(zone['field'], zone) for zone in spec['zones']),
+                search=tuple(spec['anchor'].get('search', DEFAULT_SEARCH_BAND)),
+                dpi=spec.get('dpi', 300),
+            )
+            for name, spec in specs.items()
+        )
+
+
+def load_templates(path: str = DEFAULT_TEMPLATES_PATH) -> TemplateRegistry:
+    """Gabarits du fichier JSON; registre vide si le fichier n'existe pas"""
+    if not path or not os.path.exists(path):
+        return TemplateRegistry()
+    with open(path, encoding="utf-8") as f:
+        return TemplateRegistry.from_dict(json.load(f))